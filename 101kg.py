@@ -10,12 +10,51 @@ import sys
 import time
 import os
 import json
-from getpass import getpass
-from video_downloader import VideoDownloader
+import re
+from contextlib import contextmanager
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import the logger module
 import logger
 
+# Imported on first use in main(); Selenium and friends make --help slow otherwise
+VideoDownloader = None
+
+# Command line log level names mapped to logging levels
+_LOG_LEVELS = MappingProxyType({
+    'debug': logger.DEBUG,
+    'info': logger.INFO,
+    'warning': logger.WARNING,
+    'error': logger.ERROR
+})
+_CHOICES = tuple(_LOG_LEVELS)
+
+# Extracted video URLs are cached here so reruns can skip the browser
+URL_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'url_cache.json')
+# Fallback lifetime for cached URLs that carry no exp= token
+URL_CACHE_TTL = 3600
+# Treat signed URLs as expired this many seconds early
+URL_CACHE_MARGIN = 300
+# Expiry timestamps of the exp= tokens in signed CDN URLs
+URL_EXPIRY_RE = re.compile(r'exp=(\d+)')
+# The course's lesson list, so reruns can skip scraping the navigation menu
+LESSON_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', '101kg', 'lessons.json')
+# Scrape the lesson list again after this many seconds, in case lessons were added
+LESSON_CACHE_TTL = 7 * 24 * 3600
+
+
+def getpass(prompt):
+    """Prompt for a password without echo, importing getpass only when needed."""
+    from getpass import getpass as _getpass
+    return _getpass(prompt)
+
 
 def load_config(config_path=None):
     """Load configuration from a JSON file or create one if it doesn't exist."""
@@ -27,8 +66,8 @@ def load_config(config_path=None):
     # Try to load existing config
     if os.path.exists(config_path):
         try:
-            with open(config_path, 'r') as f:
-                config = json.load(f)
+            data = Path(config_path).read_bytes()
+            config = orjson.loads(data) if orjson else json.loads(data)
             logger.info(f"Loaded configuration from {config_path}")
         except Exception as e:
             logger.error(f"Error loading config: {str(e)}")
@@ -43,9 +82,19 @@ def load_config(config_path=None):
         
         # Save config if it was modified
         try:
-            with open(config_path, 'w') as f:
-                json.dump(config, f)
-            os.chmod(config_path, 0o600)  # Make the file readable only by the owner
+            data = orjson.dumps(config) if orjson else json.dumps(config).encode()
+            # Write to a temp file readable only by the owner, then swap it in atomically
+            tmp_path = f"{config_path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                # os.write may write only part of the buffer
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, config_path)
             logger.info(f"Configuration saved to {config_path}")
         except Exception as e:
             logger.error(f"Error saving config: {str(e)}")
@@ -53,21 +102,332 @@ def load_config(config_path=None):
     return config
 
 
-def main():
-    """Main entry point for the script."""
-    # Parse command line arguments
+def load_url_cache(cache_path=None):
+    """
+    Load the extracted video URL cache, dropping expired entries.
+
+    Args:
+        cache_path (str, optional): Path to the cache file
+
+    Returns:
+        dict: Mapping of lesson hash to cache entry
+    """
+    if cache_path is None:
+        cache_path = URL_CACHE_PATH
+
+    if not os.path.exists(cache_path):
+        return {}
+
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable URL cache: {str(e)}")
+        return {}
+
+    now = time.time()
+    return {
+        lesson_hash: entry for lesson_hash, entry in cache.items()
+        if isinstance(entry, dict) and entry.get('expires_at', 0) > now
+    }
+
+
+def save_url_cache(cache, cache_path=None):
+    """
+    Atomically write the extracted video URL cache.
+
+    Args:
+        cache (dict): Mapping of lesson hash to cache entry
+        cache_path (str, optional): Path to the cache file
+    """
+    if cache_path is None:
+        cache_path = URL_CACHE_PATH
+
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+        logger.debug(f"Saved {len(cache)} cached lesson URLs to {cache_path}")
+    except Exception as e:
+        logger.error(f"Error saving URL cache: {str(e)}")
+
+
+def load_lesson_cache(base_url, cache_path=None):
+    """
+    Load the cached lesson list for a site if it is still fresh.
+
+    Args:
+        base_url (str): Site the lessons belong to
+        cache_path (str, optional): Path to the cache file
+
+    Returns:
+        list: Lessons as returned by get_all_lessons(), or None if not cached
+    """
+    if cache_path is None:
+        cache_path = LESSON_CACHE_PATH
+
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        with open(cache_path, 'r') as f:
+            entry = json.load(f).get(base_url)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable lesson cache: {str(e)}")
+        return None
+
+    if not isinstance(entry, dict) or entry.get('saved_at', 0) + LESSON_CACHE_TTL <= time.time():
+        return None
+    return entry.get('lessons') or None
+
+
+def save_lesson_cache(base_url, lessons, cache_path=None):
+    """
+    Atomically write the lesson list for a site to the cache.
+
+    Args:
+        base_url (str): Site the lessons belong to
+        lessons (list): Lessons returned by get_all_lessons()
+        cache_path (str, optional): Path to the cache file
+    """
+    if cache_path is None:
+        cache_path = LESSON_CACHE_PATH
+
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+    except Exception:
+        cache = {}
+    cache[base_url] = {'saved_at': time.time(), 'lessons': lessons}
+
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+        logger.debug(f"Saved {len(lessons)} lessons to {cache_path}")
+    except Exception as e:
+        logger.error(f"Error saving lesson cache: {str(e)}")
+
+
+def _get_lessons(downloader, refresh=False):
+    """
+    Get the lesson list from the cache, scraping the navigation menu on a miss.
+
+    Args:
+        downloader (VideoDownloader): Logged-in downloader
+        refresh (bool): Ignore the cache and scrape the lesson list again
+
+    Returns:
+        list: Lessons as returned by get_all_lessons()
+    """
+    if not refresh:
+        lessons = load_lesson_cache(downloader.base_url)
+        if lessons:
+            logger.info(f"Using {len(lessons)} cached lessons (--refresh-catalog to fetch them again)")
+            return lessons
+
+    lessons = downloader.get_all_lessons()
+    if lessons:
+        save_lesson_cache(downloader.base_url, lessons)
+    return lessons
+
+
+def _url_cache_expiry(video_urls):
+    """
+    Work out when a set of extracted video URLs stops being usable.
+
+    Signed Hotmart URLs carry an exp=<epoch> token; the earliest one wins.
+
+    Args:
+        video_urls (list): List of (part_suffix, video_url) tuples
+
+    Returns:
+        float: Expiry time as a Unix timestamp
+    """
+    expiries = [int(exp) for _, url in video_urls for exp in URL_EXPIRY_RE.findall(url)]
+    if expiries:
+        return min(expiries) - URL_CACHE_MARGIN
+    return time.time() + URL_CACHE_TTL
+
+
+def _extract_lesson(downloader, lesson, url_cache=None):
+    """
+    Get the video URLs and description for a lesson, using the URL cache when possible.
+
+    Args:
+        downloader (VideoDownloader): Logged-in downloader
+        lesson (dict): Lesson returned by get_all_lessons()
+        url_cache (dict, optional): Cache loaded by load_url_cache()
+
+    Returns:
+        tuple: (video_urls, description_text)
+    """
+    entry = url_cache.get(lesson['hash']) if url_cache is not None else None
+    if entry and entry.get('expires_at', 0) > time.time():
+        logger.info(f"Using cached video URLs for {lesson['title']}")
+        video_urls = [tuple(part) for part in entry['video_urls']]
+        return video_urls, entry.get('description')
+
+    lesson_url = f"{downloader.base_url}/lesson/{lesson['hash']}"
+    video_urls = downloader.extract_video_url(lesson_url)
+    if not video_urls:
+        return video_urls, None
+
+    # Extract lesson description text first
+    description_text = downloader.extract_lesson_description(lesson_url)
+
+    # Recording placeholders need the live lesson page, so only real URLs are cached
+    if url_cache is not None and not any(url.startswith('direct-recording://') for _, url in video_urls):
+        url_cache[lesson['hash']] = {
+            'video_urls': [list(part) for part in video_urls],
+            'description': description_text,
+            'expires_at': _url_cache_expiry(video_urls),
+        }
+
+    return video_urls, description_text
+
+
+def _prefetch(downloaders, lessons, url_cache):
+    """
+    Extract video URLs for the given lessons into the URL cache.
+
+    Lessons are spread round-robin over the downloaders, whose browsers
+    extract in parallel.
+
+    Args:
+        downloaders (list): Logged-in downloaders
+        lessons (list): Lessons to prefetch
+        url_cache (dict): Cache loaded by load_url_cache()
+    """
+    logger.info(f"Prefetching video URLs for {len(lessons)} lessons with {len(downloaders)} browsers")
+
+    def prefetch_one(n, lesson):
+        downloader = downloaders[n % len(downloaders)]
+        try:
+            with downloader.browser_lock:
+                _extract_lesson(downloader, lesson, url_cache)
+        except Exception as e:
+            logger.warning(f"Failed to prefetch {lesson['title']}: {str(e)}")
+
+    with ThreadPoolExecutor(max_workers=len(downloaders)) as executor:
+        list(executor.map(prefetch_one, range(len(lessons)), lessons))
+
+
+def _save_description(filename, part_suffix, description_text):
+    """
+    Save a lesson's description text next to its first downloaded part.
+
+    Args:
+        filename (str): Filename the part was downloaded as
+        part_suffix (str): Part suffix appended to the filename, if any
+        description_text (str): Lesson description text
+    """
+    base_filename = filename.rsplit('_', 1)[0] if part_suffix else filename
+    description_path = os.path.join('videos', f"{base_filename}.txt")
+    try:
+        with open(description_path, "w", encoding="utf-8") as desc_file:
+            desc_file.write(description_text)
+        logger.info(f"Saved lesson description to: {description_path}")
+    except Exception as e:
+        logger.error(f"Failed to save description text: {str(e)}")
+
+
+def _download_parts(downloader, video_urls, description_text, base_name):
+    """
+    Download every part of a lesson and save its description.
+
+    Args:
+        downloader (VideoDownloader): Logged-in downloader
+        video_urls (list): List of (part_suffix, video_url) tuples
+        description_text (str): Lesson description text, if any
+        base_name (str): Filename to use before any part suffix
+
+    Returns:
+        tuple: (success_count, fail_count)
+    """
+    success_count = 0
+    fail_count = 0
+
+    for part_idx, (part_suffix, video_url) in enumerate(video_urls, 1):
+        filename = base_name
+        if part_suffix:
+            filename = f"{filename}_{part_suffix}"
+
+        if downloader.download_video(video_url, filename):
+            logger.info(f"Successfully downloaded: {filename}")
+            success_count += 1
+
+            # Save description text (only for the first part to avoid duplication)
+            if part_idx == 1 and description_text:
+                _save_description(filename, part_suffix, description_text)
+        else:
+            logger.error(f"Failed to download: {filename}")
+            fail_count += 1
+
+    return success_count, fail_count
+
+
+def _fetch_one(downloader, lessons, idx, url_cache=None):
+    """
+    Extract and download every part of the lesson at the given 1-based index.
+
+    URL extraction drives the shared browser, so it runs under the downloader's
+    browser lock; the downloads themselves may overlap with other lessons.
+
+    Args:
+        downloader (VideoDownloader): Logged-in downloader
+        lessons (list): Lessons returned by get_all_lessons()
+        idx (int): 1-based lesson index
+        url_cache (dict, optional): Cache loaded by load_url_cache()
+
+    Returns:
+        tuple: (idx, success_count, fail_count)
+    """
+    if not 1 <= idx <= len(lessons):
+        logger.error(f"Invalid index: {idx}")
+        return idx, 0, 1
+
+    lesson = lessons[idx-1]
+    logger.info(f"Downloading {lesson['title']}...")
+
+    with downloader.browser_lock:
+        video_urls, description_text = _extract_lesson(downloader, lesson, url_cache)
+    if not video_urls:
+        logger.error(f"No videos found for {lesson['title']}")
+        return idx, 0, 1
+
+    success_count, fail_count = _download_parts(
+        downloader, video_urls, description_text, f"{idx:03d}_{lesson['title']}"
+    )
+    return idx, success_count, fail_count
+
+
+def _quality(value):
+    """Validate the --quality argument."""
+    value = value.lower()
+    if value in ('best', 'worst') or re.fullmatch(r'\d+p', value):
+        return value
+    raise argparse.ArgumentTypeError(f"invalid quality '{value}', expected best, worst or e.g. 720p")
+
+
+def build_parser():
+    """Build the command line argument parser."""
     parser = argparse.ArgumentParser(description='Download videos from 101 Karate Games')
     parser.add_argument('--email', help='Your Hotmart email/username')
     parser.add_argument('--password', help='Your Hotmart password')
     parser.add_argument('--config', help='Path to config file with credentials')
-    parser.add_argument('--log-level', choices=['debug', 'info', 'warning', 'error'], 
+    parser.add_argument('--log-level', choices=_CHOICES, 
                         default='info', help='Logging level (for file logging)')
     parser.add_argument('--no-log-file', action='store_true', 
                         help='Disable logging to file')
     parser.add_argument('--verbose', action='store_true',
                         help='Use the same log level for console as for the log file')
-    parser.add_argument('--headless', action='store_true',
-                        help='Run browser in headless mode')
+    parser.add_argument('--headless', action=argparse.BooleanOptionalAction, default=True,
+                        help='Run browser in headless mode; use --no-headless to watch it for debugging '
+                             '(default: headless)')
     
     # Add browser options
     parser.add_argument('--browser', choices=['chrome', 'firefox'], default='chrome',
@@ -86,28 +446,45 @@ def main():
                         help='Output filename for single download (part suffix will be added for multi-part videos)')
     parser.add_argument('--indexes', type=str, 
                         help='Comma-separated list of video indexes to download (all parts will be downloaded for each index)')
-    
-    args = parser.parse_args()
-
-    # Set up logging
-    log_levels = {
-        'debug': logger.DEBUG,
-        'info': logger.INFO,
-        'warning': logger.WARNING,
-        'error': logger.ERROR
-    }
+    parser.add_argument('--refresh-catalog', action='store_true',
+                        help='Scrape the lesson list again instead of using the cached one')
+    parser.add_argument('--prefetch', type=int, default=0,
+                        help='With --list, cache video URLs for the first N lessons for a later run (default: 0)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of lessons to download in parallel (default: 4)')
+    parser.add_argument('--browsers', type=int, default=1,
+                        help='Number of browsers extracting video URLs in parallel with --indexes, '
+                             '--prefetch or when downloading everything (default: 1)')
+    parser.add_argument('--parts', type=int, default=4,
+                        help='Number of parallel HTTP range requests per MP4 download (default: 4)')
+    parser.add_argument('--quality', type=_quality, default='best',
+                        help='HLS rendition to download: best, worst or a height such as 720p (default: best)')
+    return parser
+
+
+def setup_logging(args):
+    """Configure file and console logging from the parsed arguments."""
     # Use the specified log level for the file, but keep INFO level for console by default
     # unless verbose mode is enabled
-    console_level = log_levels[args.log_level] if args.verbose else log_levels['info']
+    console_level = _LOG_LEVELS[args.log_level] if args.verbose else logger.INFO
 
     logger.setup_logger(
-        level=log_levels[args.log_level],
+        level=_LOG_LEVELS[args.log_level],
         log_to_file=not args.no_log_file,
         console_level=console_level
     )
 
-    logger.info("Starting 101 Karate Games downloader")
-    
+
+def resolve_credentials(args):
+    """
+    Work out the Hotmart credentials to use.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+
+    Returns:
+        tuple: (email, password), either of which may be None
+    """
     # Load config if specified
     config = {}
     if args.config or not (args.email and args.password):
@@ -116,6 +493,231 @@ def main():
     # Command line args override config file
     email = args.email or config.get('email')
     password = args.password or config.get('password')
+    return email, password
+
+
+def _download_single(downloader, lessons, args, url_cache):
+    """Download the first lesson matching --single by name or number."""
+    if args.single.isdigit() and 1 <= int(args.single) <= len(lessons):
+        # Numbers select a lesson directly without searching titles
+        candidates = [(int(args.single), lessons[int(args.single)-1])]
+    else:
+        # Match by name (case insensitive)
+        needle = args.single.lower()
+        lowered = [lesson['title'].lower() for lesson in lessons]
+        candidates = [(i, lesson) for i, (title, lesson) in enumerate(zip(lowered, lessons), 1) if needle in title]
+
+    for i, lesson in candidates:
+        logger.info(f"Downloading {lesson['title']}...")
+        video_urls, description_text = _extract_lesson(downloader, lesson, url_cache)
+        
+        if not video_urls:
+            logger.error(f"No videos found for {lesson['title']}")
+            continue
+
+        _download_parts(downloader, video_urls, description_text, args.output or f"{i:03d}_{lesson['title']}")
+        break
+
+    if not candidates:
+        logger.error(f"No lesson found matching '{args.single}'")
+    return 0 if candidates else 1
+
+
+def _open_helpers(downloader, args):
+    """
+    Start extra browsers that share the logged-in session, so lessons can be
+    extracted by several browsers at once.
+
+    Args:
+        downloader (VideoDownloader): Logged-in downloader
+        args (argparse.Namespace): Parsed command line arguments
+
+    Returns:
+        list: Logged-in VideoDownloader instances; browsers that fail to start are skipped
+    """
+    count = args.browsers - 1
+    if count < 1:
+        return []
+    if args.browser_profile:
+        logger.warning("A browser profile can only be used by one browser at a time, ignoring --browsers")
+        return []
+
+    with downloader.browser_lock:
+        cookies = downloader.driver.get_cookies()
+
+    def start_helper(_):
+        try:
+            helper = VideoDownloader(
+                downloader.email,
+                downloader.password,
+                headless=args.headless,
+                browser_type=args.browser,
+                browser_profile=args.browser_profile
+            )
+        except Exception as e:
+            logger.warning(f"Could not start an extra browser: {str(e)}")
+            return None
+        helper.range_parts = args.parts
+        helper.hls_quality = args.quality
+        if helper.login_with_cookies(cookies):
+            return helper
+        logger.warning("Extra browser could not log in, closing it")
+        helper.close()
+        return None
+
+    logger.info(f"Starting {count} extra browsers")
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        return [helper for helper in executor.map(start_helper, range(count)) if helper]
+
+
+@contextmanager
+def _browsers(downloader, args):
+    """
+    Provide the logged-in downloader plus any extra browsers asked for with --browsers.
+
+    Args:
+        downloader (VideoDownloader): Logged-in downloader
+        args (argparse.Namespace): Parsed command line arguments
+
+    Yields:
+        list: Logged-in downloaders, the given one first; extra ones are closed afterwards
+    """
+    helpers = _open_helpers(downloader, args)
+    try:
+        yield [downloader] + helpers
+    finally:
+        for helper in helpers:
+            helper.close()
+
+
+def _download_lessons(downloaders, lessons, indexes, workers, url_cache):
+    """
+    Download the lessons at the given 1-based indexes in parallel.
+
+    Lessons are spread round-robin over the downloaders; each downloader's
+    browser extracts one lesson at a time while downloads overlap freely.
+
+    Args:
+        downloaders (list): Logged-in downloaders
+        lessons (list): Lessons returned by get_all_lessons()
+        indexes (iterable): 1-based lesson indexes
+        workers (int): Number of lessons in flight at once
+        url_cache (dict): Cache loaded by load_url_cache()
+
+    Returns:
+        int: Process exit code
+    """
+    success_count = 0
+    fail_count = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(_fetch_one, downloaders[n % len(downloaders)], lessons, idx, url_cache)
+            for n, idx in enumerate(indexes)
+        ]
+        for future in as_completed(futures):
+            _, lesson_successes, lesson_failures = future.result()
+            success_count += lesson_successes
+            fail_count += lesson_failures
+
+    logger.info(f"Download summary: {success_count} successes, {fail_count} failures")
+    return 0 if success_count > 0 else 1
+
+
+def _download_indexes(downloaders, lessons, args, url_cache):
+    """Download the lessons listed in --indexes in parallel."""
+    try:
+        indexes = [int(i.strip()) for i in args.indexes.split(',')]
+    except ValueError:
+        logger.error(f"Invalid index format: {args.indexes}")
+        return 1
+
+    return _download_lessons(downloaders, lessons, indexes, max(args.workers, len(downloaders)), url_cache)
+
+
+def run_downloads(downloader, args, url_cache):
+    """
+    Log in and run whichever download mode the arguments select.
+
+    Args:
+        downloader (VideoDownloader): Downloader to drive
+        args (argparse.Namespace): Parsed command line arguments
+        url_cache (dict): Cache loaded by load_url_cache()
+
+    Returns:
+        int: Process exit code
+    """
+    # Attempt login
+    logger.info("Logging in to Hotmart")
+    if not downloader.login():
+        logger.error("Failed to login. Exiting...")
+        return 1
+    
+    # Handle direct URL download
+    if args.url:
+        output_name = args.output or "downloaded_video"
+        logger.info(f"Downloading from URL to {output_name}")
+        if downloader.download_video(args.url, output_name):
+            logger.info(f"Successfully downloaded: {output_name}")
+        else:
+            logger.error(f"Failed to download from URL: {args.url}")
+        return 0
+
+    # List all lessons
+    logger.info("Fetching lesson list")
+    lessons = _get_lessons(downloader, refresh=args.refresh_catalog)
+    
+    if not lessons:
+        logger.error("No lessons found. Please check your account and try again.")
+        return 1
+    
+    listing = "\n".join(f"{i}. {lesson['title']} (hash: {lesson['hash']})" for i, lesson in enumerate(lessons, 1))
+
+    # Just list mode
+    if args.list:
+        logger.info(f"Found {len(lessons)} lessons:\n{listing}")
+        if args.prefetch > 0:
+            with _browsers(downloader, args) as downloaders:
+                _prefetch(downloaders, lessons[:args.prefetch], url_cache)
+        return 0
+
+    logger.info(f"Found {len(lessons)} lessons")
+    # Only log all lesson titles at debug level
+    logger.debug(f"Lessons:\n{listing}")
+    
+    if args.single:
+        return _download_single(downloader, lessons, args, url_cache)
+    
+    with _browsers(downloader, args) as downloaders:
+        if args.indexes:
+            return _download_indexes(downloaders, lessons, args, url_cache)
+
+        # Download all videos
+        logger.info("Starting download of all lessons")
+        start_time = time.perf_counter()
+        if len(downloaders) > 1:
+            _download_lessons(downloaders, lessons, range(1, len(lessons) + 1),
+                              max(args.workers, len(downloaders)), url_cache)
+        else:
+            downloader.download_all_lessons(lessons)
+
+        # Log completion
+        elapsed_time = time.perf_counter() - start_time
+        logger.info(f"Download completed successfully in {elapsed_time:.2f} seconds")
+        return 0
+
+
+def main():
+    """Main entry point for the script."""
+    args = build_parser().parse_args()
+
+    global VideoDownloader
+    if VideoDownloader is None:
+        from video_downloader import VideoDownloader
+
+    setup_logging(args)
+    logger.info("Starting 101 Karate Games downloader")
+    
+    email, password = resolve_credentials(args)
     
     # Ensure we have credentials
     if not email or not password:
@@ -130,152 +732,14 @@ def main():
         browser_type=args.browser,
         browser_profile=args.browser_profile
     )
-    start_time = time.time()
+    downloader.range_parts = args.parts
+    downloader.hls_quality = args.quality
+    downloader.download_workers = args.workers
+    url_cache = load_url_cache()
+    cached_hashes = set(url_cache)
 
     try:
-        # Attempt login
-        logger.info("Logging in to Hotmart")
-        if not downloader.login():
-            logger.error("Failed to login. Exiting...")
-            return 1
-        
-        # Handle direct URL download
-        if args.url:
-            output_name = args.output or "downloaded_video"
-            logger.info(f"Downloading from URL to {output_name}")
-            if downloader.download_video(args.url, output_name):
-                logger.info(f"Successfully downloaded: {output_name}")
-            else:
-                logger.error(f"Failed to download from URL: {args.url}")
-            return 0
-
-        # List all lessons
-        logger.info("Fetching lesson list")
-        lessons = downloader.get_all_lessons()
-        
-        if not lessons:
-            logger.error("No lessons found. Please check your account and try again.")
-            return 1
-        
-        logger.info(f"Found {len(lessons)} lessons")
-        # Only log all lesson titles at debug level
-        for i, lesson in enumerate(lessons, 1):
-            logger.debug(f"{i}. {lesson['title']} (hash: {lesson['hash']})")
-        
-        # Just list mode
-        if args.list:
-            return 0
-        
-        # Single video download
-        if args.single:
-            found = False
-            for i, lesson in enumerate(lessons, 1):
-                # Match by index or name (case insensitive)
-                if args.single.lower() in lesson['title'].lower() or args.single == str(i):
-                    found = True
-                    logger.info(f"Downloading {lesson['title']}...")
-                    lesson_url = f"{downloader.base_url}/lesson/{lesson['hash']}"
-                    video_urls = downloader.extract_video_url(lesson_url)
-                    
-                    if not video_urls:
-                        logger.error(f"No videos found for {lesson['title']}")
-                        continue
-                    
-                    # Extract lesson description text first
-                    lesson_url = f"{downloader.base_url}/lesson/{lesson['hash']}"
-                    description_text = downloader.extract_lesson_description(lesson_url)
-                        
-                    # Save video files
-                    for part_idx, (part_suffix, video_url) in enumerate(video_urls, 1):
-                        filename = args.output or f"{i:03d}_{lesson['title']}"
-                        if part_suffix:
-                            filename = f"{filename}_{part_suffix}"
-                        
-                        if downloader.download_video(video_url, filename):
-                            logger.info(f"Successfully downloaded: {filename}")
-                            
-                            # Save description text (only for the first part to avoid duplication)
-                            if part_idx == 1 and description_text:
-                                base_filename = filename.rsplit('_', 1)[0] if part_suffix else filename
-                                description_path = os.path.join('videos', f"{base_filename}.txt")
-                                try:
-                                    with open(description_path, "w", encoding="utf-8") as desc_file:
-                                        desc_file.write(description_text)
-                                    logger.info(f"Saved lesson description to: {description_path}")
-                                except Exception as e:
-                                    logger.error(f"Failed to save description text: {str(e)}")
-                        else:
-                            logger.error(f"Failed to download: {filename}")
-                    break
-            
-            if not found:
-                logger.error(f"No lesson found matching '{args.single}'")
-            return 0 if found else 1
-        
-        # Download videos by index
-        if args.indexes:
-            try:
-                indexes = [int(i.strip()) for i in args.indexes.split(',')]
-                success_count = 0
-                fail_count = 0
-                
-                for idx in indexes:
-                    if 1 <= idx <= len(lessons):
-                        lesson = lessons[idx-1]
-                        logger.info(f"Downloading {lesson['title']}...")
-                        lesson_url = f"{downloader.base_url}/lesson/{lesson['hash']}"
-                        video_urls = downloader.extract_video_url(lesson_url)
-                        
-                        if not video_urls:
-                            logger.error(f"No videos found for {lesson['title']}")
-                            fail_count += 1
-                            continue
-                        
-                        # Extract lesson description text first
-                        lesson_url = f"{downloader.base_url}/lesson/{lesson['hash']}"
-                        description_text = downloader.extract_lesson_description(lesson_url)
-                        
-                        for part_idx, (part_suffix, video_url) in enumerate(video_urls, 1):
-                            filename = f"{idx:03d}_{lesson['title']}"
-                            if part_suffix:
-                                filename = f"{filename}_{part_suffix}"
-                            
-                            if downloader.download_video(video_url, filename):
-                                logger.info(f"Successfully downloaded: {filename}")
-                                success_count += 1
-                                
-                                # Save description text (only for the first part to avoid duplication)
-                                if part_idx == 1 and description_text:
-                                    base_filename = filename.rsplit('_', 1)[0] if part_suffix else filename
-                                    description_path = os.path.join('videos', f"{base_filename}.txt")
-                                    try:
-                                        with open(description_path, "w", encoding="utf-8") as desc_file:
-                                            desc_file.write(description_text)
-                                        logger.info(f"Saved lesson description to: {description_path}")
-                                    except Exception as e:
-                                        logger.error(f"Failed to save description text: {str(e)}")
-                            else:
-                                logger.error(f"Failed to download: {filename}")
-                                fail_count += 1
-                    else:
-                        logger.error(f"Invalid index: {idx}")
-                        fail_count += 1
-                
-                logger.info(f"Download summary: {success_count} successes, {fail_count} failures")
-                return 0 if success_count > 0 else 1
-            except ValueError:
-                logger.error(f"Invalid index format: {args.indexes}")
-                return 1
-
-        # Download all videos
-        logger.info("Starting download of all lessons")
-        downloader.download_all_lessons()
-
-        # Log completion
-        elapsed_time = time.time() - start_time
-        logger.info(f"Download completed successfully in {elapsed_time:.2f} seconds")
-        return 0
-
+        return run_downloads(downloader, args, url_cache)
     except KeyboardInterrupt:
         logger.warning("Download interrupted by user")
         return 130
@@ -283,6 +747,8 @@ def main():
         logger.error(f"Unhandled exception: {str(e)}", exc_info=True)
         return 1
     finally:
+        if set(url_cache) != cached_hashes:
+            save_url_cache(url_cache)
         logger.info("Closing browser and cleaning up")
         downloader.close()
 
@@ -4,25 +4,482 @@ Browser Management Module for 101kg
 This module handles browser initialization, configuration, and common browser operations.
 It provides a consistent interface for working with the browser across different modules.
 """
+import os
 import time
+import atexit
+import contextlib
+import json
 import platform
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
+import queue
+import shutil
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import importlib
 
 # Import logger
 import logger
 log = logger
 
+class _LazyModule:
+    """Stand-in for a module that is only imported on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# Selenium is only imported once a browser is actually configured
+webdriver = _LazyModule("selenium.webdriver")
+
+# Driver binaries resolved by webdriver-manager, remembered across runs
+DRIVER_PATH_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "101kg", "driver_paths.json")
+# Days webdriver-manager trusts its downloaded drivers before checking for a newer version
+DRIVER_CACHE_VALID_DAYS = 30
+# Standard driver locations for this OS, tried when nothing else finds a driver
+DEFAULT_CHROMEDRIVER_PATH = {
+    "Darwin": "/usr/local/bin/chromedriver",
+    "Linux": "/usr/bin/chromedriver",
+}.get(platform.system(), "C:\\Program Files\\Google\\Chrome\\Application\\chromedriver.exe")
+DEFAULT_GECKODRIVER_PATH = {
+    "Darwin": "/usr/local/bin/geckodriver",
+    "Linux": "/usr/bin/geckodriver",
+}.get(platform.system(), "C:\\Program Files\\Mozilla Firefox\\geckodriver.exe")
+# Which driver start-up method worked last, so later runs try it first
+DRIVER_STRATEGY_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "101kg", "driver_strategy.json")
+# Cookies from the last session, replayed on start-up when there is no persistent profile
+COOKIE_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "101kg", "cookies.json")
+# A profile whose cookie store was written more recently than this still holds the session
+PROFILE_COOKIES_MAX_AGE = 7 * 24 * 3600
+
+
+def _cached_driver_path(name, resolve, refresh=False):
+    """
+    Look up a driver binary in the on-disk cache, resolving and storing it on a miss.
+
+    Args:
+        name (str): Driver name, e.g. "chromedriver"
+        resolve (callable): Returns the driver path when it isn't cached
+        refresh (bool): Resolve the path again even if a cached binary exists
+
+    Returns:
+        str: Path to the driver binary
+    """
+    key = f"{name}:{platform.system()}:{platform.machine()}"
+    try:
+        with open(DRIVER_PATH_CACHE, 'r') as f:
+            cache = json.load(f)
+    except Exception:
+        cache = {}
+
+    path = cache.get(key)
+    if path and not refresh and os.access(path, os.X_OK):
+        log.debug("Using cached %s path: %s", name, path)
+        return path
+
+    path = resolve()
+    cache[key] = path
+    try:
+        os.makedirs(os.path.dirname(DRIVER_PATH_CACHE), exist_ok=True)
+        with open(DRIVER_PATH_CACHE, 'w') as f:
+            json.dump(cache, f)
+    except Exception as e:
+        log.debug("Could not save driver path cache: %s", e)
+    return path
+
+
+def _install_chromedriver():
+    """Resolve chromedriver with ChromeDriverManager."""
+    from webdriver_manager.chrome import ChromeDriverManager
+    from webdriver_manager.core.driver_cache import DriverCacheManager
+
+    cache_manager = DriverCacheManager(valid_range=DRIVER_CACHE_VALID_DAYS)
+    return _resolve_chromedriver_binary(ChromeDriverManager(cache_manager=cache_manager).install())
+
+
+@functools.lru_cache(maxsize=4)
+def _resolve_chromedriver_binary(driver_path):
+    """
+    Find the chromedriver executable for a path returned by ChromeDriverManager.
+
+    Some webdriver-manager versions return the THIRD_PARTY_NOTICES file instead of
+    the binary, in which case the driver directory is searched once per path.
+
+    Args:
+        driver_path (str): Path returned by ChromeDriverManager().install()
+
+    Returns:
+        str: Path to the chromedriver executable
+    """
+    if "THIRD_PARTY_NOTICES" not in driver_path:
+        return driver_path
+
+    driver_dir = os.path.dirname(driver_path)
+    for file in os.listdir(driver_dir):
+        if file.startswith("chromedriver") and not file.endswith(".zip") and not file.endswith(".md"):
+            return os.path.join(driver_dir, file)
+    return driver_path
+
+
+def _install_geckodriver():
+    """Resolve geckodriver with GeckoDriverManager."""
+    from webdriver_manager.firefox import GeckoDriverManager
+    from webdriver_manager.core.driver_cache import DriverCacheManager
+
+    cache_manager = DriverCacheManager(valid_range=DRIVER_CACHE_VALID_DAYS)
+    return GeckoDriverManager(cache_manager=cache_manager).install()
+
+
+@functools.lru_cache(maxsize=1)
+def _winning_strategies():
+    """Load which driver start-up strategy last worked for each browser."""
+    try:
+        with open(DRIVER_STRATEGY_CACHE, 'r') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _remember_winning_strategy(browser, name):
+    """Record the driver start-up strategy that worked, for this and later runs."""
+    strategies = _winning_strategies()
+    strategies[browser] = name
+    try:
+        os.makedirs(os.path.dirname(DRIVER_STRATEGY_CACHE), exist_ok=True)
+        with open(DRIVER_STRATEGY_CACHE, 'w') as f:
+            json.dump(strategies, f)
+    except Exception as e:
+        log.debug("Could not save driver strategy cache: %s", e)
+
+
+@functools.lru_cache(maxsize=1)
+def _chromedriver_on_path():
+    """Find chromedriver on PATH, looking only once per process."""
+    return shutil.which("chromedriver")
+
+
+@functools.lru_cache(maxsize=4)
+def _resolved_chromedriver_path():
+    """Get the chromedriver path, resolving it at most once per process."""
+    return _cached_driver_path("chromedriver", _install_chromedriver)
+
+
+@functools.lru_cache(maxsize=4)
+def _resolved_geckodriver_path():
+    """Get the geckodriver path, resolving it at most once per process."""
+    return _cached_driver_path("geckodriver", _install_geckodriver)
+
+
+# Keeps only the elements that are rendered and not hidden
+VISIBLE_ELEMENTS_SCRIPT = """
+return arguments[0].filter(function(e) {
+    var r = e.getBoundingClientRect();
+    var s = getComputedStyle(e);
+    return r.width > 0 && r.height > 0 && s.visibility !== 'hidden' && s.display !== 'none';
+});
+"""
+
+# Launch arguments every Chrome session gets, plus the ones for headless runs
+CHROME_STATIC_ARGS = (
+    "--start-maximized",
+    "--disable-notifications",
+    "--disable-popup-blocking",
+    "--disable-infobars",
+    "--disable-extensions",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+)
+# Autoplay flag ensures proper video playback; "--mute-audio" is left out so audio is captured.
+# Nobody looks at a headless page, so skip GPU rasterisation, image decoding and web fonts too
+CHROME_HEADLESS_ARGS = (
+    "--headless=new",
+    "--autoplay-policy=no-user-gesture-required",
+    "--disable-gpu",
+    "--disable-software-rasterizer",
+    "--blink-settings=imagesEnabled=false",
+    "--disable-remote-fonts",
+)
+CHROME_HEADLESS_PREFS = {"profile.managed_default_content_settings.images": 2}
+CHROME_USER_AGENT = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+                     "(KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36")
+
+# Preferences every Firefox session gets
+FIREFOX_STATIC_PREFS = (
+    ("browser.download.folderList", 2),
+    ("browser.download.manager.showWhenStarting", False),
+    ("browser.helperApps.neverAsk.saveToDisk",
+     "video/mp4,video/x-matroska,video/webm,video/ogg,application/octet-stream,application/vnd.apple.mpegurl"),
+    ("media.volume_scale", "1.0"),  # Enable audio (was 0.0)
+    ("media.autoplay.default", 0),  # Allow autoplay
+    ("media.autoplay.blocking_policy", 0),  # Don't block autoplay
+    ("general.useragent.override",
+     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/117.0"),
+)
+
+# How often explicit waits re-check their condition (seconds); Selenium's default is 0.5
+WAIT_POLL_FREQUENCY = 0.1
+
+# expected_conditions factory for each wait condition; anything else waits for presence.
+# Names rather than functions so Selenium is still only imported on first use.
+EC_SINGLE = {
+    "presence": "presence_of_element_located",
+    "visible": "visibility_of_element_located",
+    "clickable": "element_to_be_clickable",
+}
+EC_MULTI = {
+    "presence": "presence_of_all_elements_located",
+    "visible": "visibility_of_all_elements_located",
+}
+
+# Locator strategies WAIT_FOR_ELEMENT_SCRIPT can resolve in the page
+FUSED_LOCATORS = frozenset({"id", "name", "tag name", "class name", "xpath", "css selector"})
+
+# Waits in the page for an element to match a condition and hands it back in one
+# round-trip. DOM mutations trigger a re-check immediately; a short interval covers
+# style-only changes (requestAnimationFrame is paused in background tabs).
+WAIT_FOR_ELEMENT_SCRIPT = """
+var by = arguments[0], value = arguments[1], condition = arguments[2], timeoutMs = arguments[3];
+var done = arguments[arguments.length - 1];
+
+var find = function() {
+    switch (by) {
+        case 'id': return document.getElementById(value);
+        case 'name': return document.getElementsByName(value)[0] || null;
+        case 'tag name': return document.getElementsByTagName(value)[0] || null;
+        case 'class name': return document.getElementsByClassName(value)[0] || null;
+        case 'xpath':
+            return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        default: return document.querySelector(value);
+    }
+};
+var visible = function(el) {
+    var r = el.getBoundingClientRect();
+    var s = getComputedStyle(el);
+    return r.width > 0 && r.height > 0 && s.visibility !== 'hidden' && s.display !== 'none';
+};
+var matches = function(el) {
+    if (!el) return false;
+    if (condition === 'visible') return visible(el);
+    if (condition === 'clickable') return visible(el) && !el.disabled && getComputedStyle(el).pointerEvents !== 'none';
+    return true;
+};
+
+var observer, interval, timer;
+var finish = function(el) {
+    if (observer) observer.disconnect();
+    clearInterval(interval);
+    clearTimeout(timer);
+    done(el);
+};
+var check = function() {
+    var el = find();
+    if (matches(el)) { finish(el); return true; }
+    return false;
+};
+
+if (check()) return;
+observer = new MutationObserver(check);
+observer.observe(document.documentElement, {attributes: true, childList: true, subtree: true});
+interval = setInterval(check, 100);
+timer = setTimeout(function() { finish(null); }, timeoutMs);
+"""
+
+# Cookies that tell Hotmart the cookie policy was already accepted
+INITIAL_COOKIES = (
+    {'name': 'cookie-policy-accepted', 'value': 'true', 'domain': '.hotmart.com'},
+    {'name': 'cookie-policy-preferences', 'value': 'true', 'domain': '.hotmart.com'},
+    {'name': 'hotmart-cookie-policy', 'value': 'accepted', 'domain': '.hotmart.com'}
+)
+INITIAL_CDP_COOKIES = tuple(dict(cookie, path='/') for cookie in INITIAL_COOKIES)
+INITIAL_COOKIE_NAMES = ', '.join(cookie['name'] for cookie in INITIAL_COOKIES)
+# With this cookie in place the site doesn't show its cookie policy popup
+COOKIE_POLICY_ACCEPTED = ('cookie-policy-accepted', 'true')
+
+# WebDriver cookie fields that Network.setCookies accepts under the same name
+CDP_COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite')
+
+
+def _cdp_cookie(cookie):
+    """
+    Convert a cookie from driver.get_cookies() into a Network.setCookies parameter.
+
+    Args:
+        cookie (dict): WebDriver cookie
+
+    Returns:
+        dict: CDP cookie parameter
+    """
+    cdp_cookie = {field: cookie[field] for field in CDP_COOKIE_FIELDS if field in cookie}
+    if 'expiry' in cookie:
+        cdp_cookie['expires'] = cookie['expiry']
+    return cdp_cookie
+
+
+def _load_cached_cookies():
+    """
+    Read the cookies saved by the last session, dropping any that have expired.
+
+    Returns:
+        list: WebDriver cookies, empty if there is no usable cache
+    """
+    try:
+        with open(COOKIE_CACHE, 'r') as f:
+            cookies = json.load(f)
+    except Exception:
+        return []
+    now = time.time()
+    return [cookie for cookie in cookies if cookie.get('expiry', now + 1) > now]
+
+
+def _save_cached_cookies(cookies):
+    """
+    Save cookies for the next session, readable only by the current user.
+
+    Args:
+        cookies (list): WebDriver cookies from driver.get_cookies()
+    """
+    os.makedirs(os.path.dirname(COOKIE_CACHE), exist_ok=True)
+    tmp_path = f"{COOKIE_CACHE}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(cookies, f)
+    os.replace(tmp_path, COOKIE_CACHE)
+
+# Cookie popup lookups, combined so each is a single DOM query
+COOKIE_CONTAINER_SELECTORS = (".cookie-notice,#cookie-notice,.cookie-banner,#cookie-banner,"
+                              ".cookie-consent,#cookie-consent,.cookie-policy,#cookie-policy")
+ACCEPT_BUTTON_SELECTORS = ("button.accept-button,button.accept,button.agree,.accept-cookies-button,"
+                           "button[data-action='accept'],.cookie-accept-button,#acceptCookies,"
+                           "button.ok,#okButton,[aria-label='OK']")
+COOKIE_TEXT_XPATH = ("//*[contains(text(), 'This site uses cookies') or contains(text(), 'site uses cookies') "
+                     "or contains(text(), 'cookies are important')]")
+
+# Finds and accepts the cookie policy popup in one round-trip. Tries, in order: the
+# Hotmart container, a bare OK button, dialogs containing cookie text, common cookie
+# banner selectors and class names, and finally hides the Hotmart container. After a
+# click it watches the DOM until the popup disappears or the timeout passes.
+COOKIE_POPUP_SCRIPT = """
+var containerSelectors = arguments[0];
+var acceptSelectors = arguments[1];
+var cookieTextXPath = arguments[2];
+var timeoutMs = arguments[3];
+var done = arguments[arguments.length - 1];
+
+var visible = function(el) {
+    return !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length));
+};
+var isAccept = function(el) {
+    var text = (el.innerText || el.textContent || '').trim().toLowerCase();
+    return text === 'ok' || text.includes('accept') || text.includes('agree') || text.includes('aceitar');
+};
+var clickAccept = function(container) {
+    var accepts = container.querySelectorAll(acceptSelectors);
+    for (var i = 0; i < accepts.length; i++) {
+        if (visible(accepts[i])) { accepts[i].click(); return true; }
+    }
+    var buttons = container.querySelectorAll('button, .btn, a.accept, a.agree');
+    for (var j = 0; j < buttons.length; j++) {
+        if (visible(buttons[j]) && isAccept(buttons[j])) { buttons[j].click(); return true; }
+    }
+    return false;
+};
+var finish = function(via, target) {
+    if (!target || !visible(target)) { done({handled: true, via: via, dismissed: true}); return; }
+    var observer = new MutationObserver(function() {
+        if (!visible(target)) {
+            observer.disconnect();
+            clearTimeout(timer);
+            done({handled: true, via: via, dismissed: true});
+        }
+    });
+    var timer = setTimeout(function() {
+        observer.disconnect();
+        done({handled: true, via: via, dismissed: !visible(target)});
+    }, timeoutMs);
+    observer.observe(document.documentElement, {attributes: true, childList: true, subtree: true});
+};
+
+var policy = document.getElementById('hotmart-cookie-policy');
+if (visible(policy) && clickAccept(policy)) { finish('id', policy); return; }
+
+var okButtons = document.querySelectorAll('button');
+for (var i = 0; i < okButtons.length; i++) {
+    if (visible(okButtons[i]) && okButtons[i].textContent.trim().toUpperCase() === 'OK') {
+        var okDialog = okButtons[i].closest('div');
+        okButtons[i].click();
+        finish('ok-button', okDialog);
+        return;
+    }
+}
+
+var texts = document.evaluate(cookieTextXPath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (var t = 0; t < texts.snapshotLength; t++) {
+    var dialog = texts.snapshotItem(t).closest("div[class*='cookie'], div[class*='dialog'], div[class*='modal']");
+    if (visible(dialog) && clickAccept(dialog)) { finish('cookie-text', dialog); return; }
+}
+
+var containers = document.querySelectorAll(containerSelectors);
+for (var c = 0; c < containers.length; c++) {
+    if (visible(containers[c]) && clickAccept(containers[c])) { finish('selector', containers[c]); return; }
+}
+
+var banners = [
+    'cookie-banner', 'cookie-notice', 'cookie-policy', 'cookie-consent',
+    'cookie-popup', 'cookie-message', 'cookie-notification', 'cookie-alert'
+];
+for (var b = 0; b < banners.length; b++) {
+    var elements = Array.prototype.slice.call(document.getElementsByClassName(banners[b]));
+    elements.push(document.getElementById(banners[b]));
+    for (var e = 0; e < elements.length; e++) {
+        if (elements[e] && clickAccept(elements[e])) { finish('banner', elements[e]); return; }
+    }
+}
+
+// If we reach here, try to just hide any cookie policy containers
+if (policy) {
+    policy.style.display = 'none';
+    policy.style.visibility = 'hidden';
+    policy.style.zIndex = '-999999';
+    done({handled: true, via: 'hidden', dismissed: true});
+    return;
+}
+
+// Nothing to click; send back just enough of the page to debug with
+var bodyText = document.body ? (document.body.innerText || '') : '';
+done({
+    handled: false,
+    snippet: bodyText.slice(0, 1000),
+    hasCookieText: /(This site uses |site uses )cookies/.test(bodyText)
+});
+"""
+# Chromium drivers get COOKIE_POPUP_SCRIPT installed in every page once, so each
+# check only sends this short call; it reports {missing: true} where it isn't installed
+COOKIE_POPUP_PAGE_SCRIPT = f"window.__101kgCookiePopup = function() {{{COOKIE_POPUP_SCRIPT}}};"
+COOKIE_POPUP_CALL_SCRIPT = """
+var popup = window.__101kgCookiePopup;
+if (!popup) { arguments[arguments.length - 1]({missing: true}); return; }
+popup.apply(null, arguments);
+"""
+
 
 class BrowserManager:
     """
     Manages browser initialization and provides common browser interaction methods.
     """
 
-    def __init__(self, headless=False, user_data_dir=None, browser_type="chrome", browser_profile=None):
+    # Warm drivers handed out by initialize() and returned by release(), keyed by configuration
+    _pools = {}
+    _pools_lock = threading.Lock()
+    _pool_size = 2
+    _max_uses_per_instance = 20
+
+    def __init__(self, headless=False, user_data_dir=None, browser_type="chrome", browser_profile=None,
+                 cdp_endpoint=None):
         """
         Initialize the browser manager.
 
@@ -31,37 +488,219 @@ class BrowserManager:
             user_data_dir (str, optional): Path to user data directory for Chrome profile
             browser_type (str): The browser to use ("chrome" or "firefox")
             browser_profile (str, optional): Path to browser profile with extensions
+            cdp_endpoint (str, optional): host:port of an already running Chrome to attach to
+                instead of launching one; defaults to the CDP_ENDPOINT environment variable
         """
         self.driver = None
         self.headless = headless
         self.user_data_dir = user_data_dir
         self.browser_profile = browser_profile
         self.browser_type = browser_type.lower()
+        self.cdp_endpoint = cdp_endpoint or os.environ.get("CDP_ENDPOINT")
         self.base_url = "https://101karategames.club.hotmart.com"
+        self._cdp_context_id = None
+        self._cdp_target_id = None
+        self._wait_cache = {}
+        self._page_scripts_installed = False
 
-    def initialize(self):
+    def initialize(self, timeout=None):
         """
         Initialize the browser with appropriate settings.
 
+        Reuses a warm driver from the pool when one is available.
+
+        Args:
+            timeout (float, optional): Seconds to wait for another manager to release a
+                pooled driver before starting a new browser; by default don't wait
+
         Returns:
             webdriver.Chrome/Firefox: Initialized WebDriver
         """
-        if self.browser_type == "firefox":
-            # Configure Firefox options and initialize
-            options = self._configure_firefox_options()
-            self.driver = self._initialize_firefox_driver(options)
-        else:
-            # Configure Chrome options and initialize
-            options = self._configure_chrome_options()
-            self.driver = self._initialize_chrome_driver(options)
+        try:
+            pool = self._get_pool()
+            self.driver = pool.get(timeout=timeout) if timeout else pool.get_nowait()
+            log.debug("Reusing pooled browser")
+        except queue.Empty:
+            self.driver = self._create_driver()
+
+        # Work in a private tab when sharing someone else's browser
+        if self.driver and self._attached():
+            self._open_isolated_tab()
 
         # Set window size and initialize cookies
         if self.driver:
             self.driver.set_window_size(1366, 768)
+            self._install_page_scripts()
             self._set_initial_cookies()
 
         return self.driver
 
+    def _create_driver(self):
+        """
+        Start a new browser with appropriate settings.
+
+        Returns:
+            webdriver.Chrome/Firefox: WebDriver instance or None if initialization fails
+        """
+        if self.browser_type == "firefox":
+            # Configure Firefox options and initialize
+            options = self._configure_firefox_options()
+            return self._initialize_firefox_driver(options)
+
+        # Configure Chrome options and initialize
+        options = self._configure_chrome_options()
+        return self._initialize_chrome_driver(options)
+
+    def _attached(self):
+        """Whether this manager attaches to a shared Chrome over CDP."""
+        return bool(self.cdp_endpoint) and self.browser_type != "firefox"
+
+    def _open_isolated_tab(self):
+        """Open a tab in a fresh browser context so cookies and storage aren't shared."""
+        try:
+            context = self.driver.execute_cdp_cmd("Target.createBrowserContext", {})
+            self._cdp_context_id = context["browserContextId"]
+            target = self.driver.execute_cdp_cmd("Target.createTarget", {
+                "url": "about:blank",
+                "browserContextId": self._cdp_context_id
+            })
+            self._cdp_target_id = target["targetId"]
+            self.driver.switch_to.window(self._cdp_target_id)
+            log.debug("Opened isolated tab %s in shared browser", self._cdp_target_id)
+        except Exception as e:
+            log.warning(f"Could not open isolated tab, using the current one: {e}")
+
+    def _close_isolated_tab(self):
+        """Close this manager's tab and browser context, leaving the shared browser running."""
+        try:
+            if self._cdp_target_id:
+                self.driver.execute_cdp_cmd("Target.closeTarget", {"targetId": self._cdp_target_id})
+            if self._cdp_context_id:
+                self.driver.execute_cdp_cmd("Target.disposeBrowserContext",
+                                            {"browserContextId": self._cdp_context_id})
+        finally:
+            self._cdp_target_id = None
+            self._cdp_context_id = None
+            # Stop our chromedriver without asking it to shut the browser down
+            self.driver.service.stop()
+
+    def _get_pool(self):
+        """
+        Get the pool of warm drivers matching this manager's configuration.
+
+        Returns:
+            queue.Queue: Bounded queue of idle drivers
+        """
+        key = (self.browser_type, self.headless, self.user_data_dir, self.browser_profile, self.cdp_endpoint)
+        with BrowserManager._pools_lock:
+            if key not in BrowserManager._pools:
+                BrowserManager._pools[key] = queue.Queue(maxsize=self._pool_size)
+            return BrowserManager._pools[key]
+
+    @classmethod
+    def prewarm(cls, count, **kwargs):
+        """
+        Start several browsers in parallel and park them in the pool.
+
+        Args:
+            count (int): Number of browsers to start
+            **kwargs: BrowserManager constructor arguments
+
+        Returns:
+            int: Number of browsers added to the pool
+        """
+        managers = [cls(**kwargs) for _ in range(count)]
+        with ThreadPoolExecutor(max_workers=max(1, count)) as executor:
+            drivers = list(executor.map(lambda manager: manager._create_driver(), managers))
+
+        added = 0
+        for manager, driver in zip(managers, drivers):
+            if not driver:
+                continue
+            try:
+                manager._get_pool().put_nowait(driver)
+                added += 1
+            except queue.Full:
+                driver.quit()
+
+        log.info(f"Prewarmed {added} browsers")
+        return added
+
+    @contextlib.contextmanager
+    def acquire(self, timeout=None):
+        """
+        Check out a driver for the duration of a with block, returning it to the pool afterwards.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a pooled driver before starting a new browser
+
+        Yields:
+            webdriver.Chrome/Firefox: Initialized WebDriver, or None if initialization fails
+        """
+        driver = self.initialize(timeout=timeout)
+        try:
+            yield driver
+        finally:
+            self.release()
+
+    @classmethod
+    def shutdown_pools(cls):
+        """
+        Quit every idle driver left in the pools.
+
+        Returns:
+            int: Number of browsers quit
+        """
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+
+        closed = 0
+        for pool in pools:
+            while True:
+                try:
+                    driver = pool.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    driver.quit()
+                    closed += 1
+                except Exception as e:
+                    log.warning(f"Error closing pooled browser: {e}")
+
+        if closed:
+            log.debug("Closed %d pooled browsers", closed)
+        return closed
+
+    def release(self):
+        """
+        Return the browser to the pool for reuse.
+
+        Cookies are cleared and the browser is parked on about:blank. Browsers
+        that have been used too often, or that don't fit in the pool, are quit.
+        """
+        driver, self.driver = self.driver, None
+        if not driver:
+            return
+
+        uses = getattr(driver, '_pool_uses', 0) + 1
+        try:
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            driver._pool_uses = uses
+            if uses < self._max_uses_per_instance:
+                self._get_pool().put_nowait(driver)
+                log.debug("Returned browser to pool after %d uses", uses)
+                return
+        except queue.Full:
+            pass
+        except Exception as e:
+            log.warning(f"Error resetting browser for reuse: {e}")
+
+        try:
+            driver.quit()
+        except Exception as e:
+            log.warning(f"Error closing browser: {e}")
+
     def _configure_chrome_options(self):
         """
         Configure Chrome options for optimal video streaming and automation.
@@ -71,28 +710,27 @@ class BrowserManager:
         """
         chrome_options = webdriver.ChromeOptions()
 
+        # Attaching to a running browser ignores launch arguments
+        if self._attached():
+            chrome_options.add_experimental_option("debuggerAddress", self.cdp_endpoint)
+            return chrome_options
+
         # Basic options for better automation
-        chrome_options.add_argument("--start-maximized")
-        chrome_options.add_argument("--disable-notifications")
-        chrome_options.add_argument("--disable-popup-blocking")
-        chrome_options.add_argument("--disable-infobars")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
+        for argument in CHROME_STATIC_ARGS:
+            chrome_options.add_argument(argument)
 
         # Set headless mode if requested
         if self.headless:
-            chrome_options.add_argument("--headless=new")
-            # Additional options for headless mode to ensure proper video playback
-            chrome_options.add_argument("--autoplay-policy=no-user-gesture-required")
-            # Removed "--mute-audio" to ensure audio is captured
+            for argument in CHROME_HEADLESS_ARGS:
+                chrome_options.add_argument(argument)
+            chrome_options.add_experimental_option("prefs", dict(CHROME_HEADLESS_PREFS))
 
         # Set user data directory if provided
         if self.user_data_dir:
             chrome_options.add_argument(f"--user-data-dir={self.user_data_dir}")
 
         # Add user agent to ensure compatibility
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36")
+        chrome_options.add_argument(f"--user-agent={CHROME_USER_AGENT}")
 
         return chrome_options
 
@@ -105,26 +743,23 @@ class BrowserManager:
         """
         firefox_options = webdriver.FirefoxOptions()
         
-        # Basic options for better automation
-        firefox_options.set_preference("browser.download.folderList", 2)
-        firefox_options.set_preference("browser.download.manager.showWhenStarting", False)
-        firefox_options.set_preference("browser.helperApps.neverAsk.saveToDisk", 
-                                      "video/mp4,video/x-matroska,video/webm,video/ogg,application/octet-stream,application/vnd.apple.mpegurl")
-        firefox_options.set_preference("media.volume_scale", "1.0")  # Enable audio (was 0.0)
-        firefox_options.set_preference("media.autoplay.default", 0)  # Allow autoplay
-        firefox_options.set_preference("media.autoplay.blocking_policy", 0)  # Don't block autoplay
+        # Basic options for better automation, audio, autoplay and a compatible user agent
+        for name, value in FIREFOX_STATIC_PREFS:
+            firefox_options.set_preference(name, value)
         
         # Set headless mode if requested
         if self.headless:
             firefox_options.add_argument("--headless")
         
         # Set Firefox profile if provided
-        # Note: We don't use set_preference for profile as it doesn't work correctly
-        # Instead, the profile is loaded directly in the _initialize_firefox_driver method
-        
-        # Add user agent to ensure compatibility
-        firefox_options.set_preference("general.useragent.override", 
-                                     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/117.0")
+        # Pass the directory with -profile so Firefox uses it in place; FirefoxProfile(path)
+        # would copy the whole profile (extensions, caches, places.sqlite) on every start
+        if self.browser_profile:
+            firefox_options.add_argument("-profile")
+            firefox_options.add_argument(self.browser_profile)
+            # Ensure the profile's extensions stay enabled
+            firefox_options.set_preference("xpinstall.signatures.required", False)
+            firefox_options.set_preference("extensions.autoDisableScopes", 0)
         
         return firefox_options
         
@@ -138,86 +773,62 @@ class BrowserManager:
         Returns:
             webdriver.Firefox: Firefox WebDriver instance or None if initialization fails
         """
-        driver = None
-        
         # Method 1: Try with browser profile if provided
         if self.browser_profile:
             try:
-                log.debug(f"Attempting to initialize Firefox driver with profile: {self.browser_profile}")
-                from selenium.webdriver.firefox.service import Service as FirefoxService
-                
-                # Use the Firefox profile that has the Video Downloader Helper extension installed
-                from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
-                
-                # Create a Firefox profile object
-                firefox_profile = FirefoxProfile(self.browser_profile)
-                
-                # Add special preferences to ensure extensions are enabled
-                firefox_profile.set_preference("xpinstall.signatures.required", False)
-                firefox_profile.set_preference("extensions.autoDisableScopes", 0)
-                
-                # Create a driver with this profile
-                driver = webdriver.Firefox(firefox_profile=firefox_profile, options=options)
-                
-                # Log info about installed extensions
-                try:
-                    # Check for the Video Downloader Helper specifically
-                    extensions_script = """
-                    return {
-                        hasDownloadHelper: Boolean(document.querySelector(
-                            "#net_downloadhelper_toolbar, .net-downloadhelper-button, [title*='Download Helper'], #wrapper-downloadhelper-net_downloadhelper_toolbar"
-                        ))
-                    };
-                    """
-                    # Navigate to about:blank to execute the script
-                    driver.get("about:blank")
-                    time.sleep(1)
-                    extensions_info = driver.execute_script(extensions_script)
-                    
-                    if extensions_info.get('hasDownloadHelper'):
-                        log.info("Video Downloader Helper extension detected in Firefox")
-                    else:
-                        log.warning("Video Downloader Helper extension NOT found in Firefox profile")
-                except Exception as e:
-                    log.warning(f"Could not check for Video Downloader Helper extension: {e}")
+                log.debug("Attempting to initialize Firefox driver with profile: %s", self.browser_profile)
+                driver = self._firefox_with_profile(options)
                 log.info("Successfully initialized Firefox driver with provided profile")
                 return driver
             except Exception as e:
                 log.warning(f"Failed to create Firefox driver with profile: {e}")
+
+        return self._run_driver_strategies("firefox", [
+            ("manager", "GeckoDriverManager", self._firefox_with_manager),
+            ("os_path", "standard OS path", self._firefox_with_os_path),
+        ], options)
+
+    def _firefox_with_profile(self, options):
+        """Start Firefox with the user's profile, which has the Video Downloader Helper extension."""
+        # The profile directory is already passed via -profile in _configure_firefox_options
+        driver = webdriver.Firefox(options=options)
         
-        # Method 2: Try system Firefox with GeckoDriverManager
-        try:
-            log.debug("Attempting to initialize Firefox driver with GeckoDriverManager")
-            from selenium.webdriver.firefox.service import Service as FirefoxService
-            from webdriver_manager.firefox import GeckoDriverManager
-            
-            service = FirefoxService(executable_path=GeckoDriverManager().install())
-            driver = webdriver.Firefox(service=service, options=options)
-            log.info("Successfully initialized Firefox driver with GeckoDriverManager")
-            return driver
-        except Exception as e:
-            log.warning(f"Failed to create Firefox driver with GeckoDriverManager: {e}")
-        
-        # Method 3: Try standard Firefox path by OS
+        # Log info about installed extensions
         try:
-            log.debug("Attempting to initialize Firefox driver with standard OS path")
-            from selenium.webdriver.firefox.service import Service as FirefoxService
+            # Check for the Video Downloader Helper specifically
+            extensions_script = """
+            return {
+                hasDownloadHelper: Boolean(document.querySelector(
+                    "#net_downloadhelper_toolbar, .net-downloadhelper-button, [title*='Download Helper'], #wrapper-downloadhelper-net_downloadhelper_toolbar"
+                ))
+            };
+            """
+            # Navigate to about:blank to execute the script
+            driver.get("about:blank")
+            time.sleep(1)
+            extensions_info = driver.execute_script(extensions_script)
             
-            # Determine driver path based on operating system
-            if platform.system() == "Darwin":  # macOS
-                driver_path = "/usr/local/bin/geckodriver"
-            elif platform.system() == "Linux":
-                driver_path = "/usr/bin/geckodriver"
-            else:  # Windows
-                driver_path = "C:\\Program Files\\Mozilla Firefox\\geckodriver.exe"
-                
-            service = FirefoxService(executable_path=driver_path)
-            driver = webdriver.Firefox(service=service, options=options)
-            log.info("Successfully initialized Firefox driver with standard OS path")
-            return driver
+            if extensions_info.get('hasDownloadHelper'):
+                log.info("Video Downloader Helper extension detected in Firefox")
+            else:
+                log.warning("Video Downloader Helper extension NOT found in Firefox profile")
         except Exception as e:
-            log.error(f"All Firefox driver initialization methods failed: {e}", exc_info=True)
-            return None
+            log.warning(f"Could not check for Video Downloader Helper extension: {e}")
+        return driver
+
+    def _firefox_with_manager(self, options):
+        """Start Firefox with a geckodriver resolved by GeckoDriverManager."""
+        from selenium.webdriver.firefox.service import Service as FirefoxService
+
+        service = FirefoxService(executable_path=_resolved_geckodriver_path())
+        return webdriver.Firefox(service=service, options=options)
+
+    def _firefox_with_os_path(self, options):
+        """Start Firefox with geckodriver from the standard location for this OS."""
+        from selenium.webdriver.firefox.service import Service as FirefoxService
+
+        service = FirefoxService(executable_path=DEFAULT_GECKODRIVER_PATH)
+        return webdriver.Firefox(service=service, options=options)
     
     def _initialize_chrome_driver(self, options):
         """
@@ -229,80 +840,235 @@ class BrowserManager:
         Returns:
             webdriver.Chrome: Chrome WebDriver instance or None if initialization fails
         """
-        driver = None
+        return self._run_driver_strategies("chrome", [
+            ("system", "system Chrome", self._chrome_from_system),
+            ("manager", "ChromeDriverManager", self._chrome_with_manager),
+            ("os_path", "standard OS path", self._chrome_with_os_path),
+        ], options)
 
-        # Method 1: Try system Chrome
-        try:
-            log.debug("Attempting to initialize Chrome driver with system Chrome")
-            driver = webdriver.Chrome(options=options)
-            log.info("Successfully initialized Chrome driver with system Chrome")
-            return driver
-        except Exception as e:
-            log.warning(f"Failed to create Chrome driver with default settings: {e}")
+    def _chrome_from_system(self, options):
+        """
+        Start Chrome with the chromedriver on PATH, or whatever chromedriver Selenium finds itself.
 
-        # Method 2: Try using ChromeDriverManager
-        try:
-            log.debug("Attempting to initialize Chrome driver with ChromeDriverManager")
+        Passing the PATH driver directly saves Selenium Manager's lookup on every start.
+        """
+        driver_path = _chromedriver_on_path()
+        if driver_path:
             from selenium.webdriver.chrome.service import Service as ChromeService
-            from webdriver_manager.chrome import ChromeDriverManager
-
-            # Get the driver path but don't automatically install
-            driver_path = ChromeDriverManager().install()
-
-            # If the path contains THIRD_PARTY_NOTICES, adjust to find the actual executable
-            if "THIRD_PARTY_NOTICES" in driver_path:
-                import os
-                driver_dir = os.path.dirname(driver_path)
-                for file in os.listdir(driver_dir):
-                    if file.startswith("chromedriver") and not file.endswith(".zip") and not file.endswith(".md"):
-                        driver_path = os.path.join(driver_dir, file)
-                        break
-
-            service = ChromeService(executable_path=driver_path)
-            driver = webdriver.Chrome(service=service, options=options)
-            log.info("Successfully initialized Chrome driver with ChromeDriverManager")
-            return driver
+
+            return webdriver.Chrome(service=ChromeService(executable_path=driver_path), options=options)
+        return webdriver.Chrome(options=options)
+
+    def _chrome_with_manager(self, options):
+        """Start Chrome with a chromedriver resolved by ChromeDriverManager."""
+        from selenium.webdriver.chrome.service import Service as ChromeService
+
+        driver_path = _resolved_chromedriver_path()
+        try:
+            return webdriver.Chrome(service=ChromeService(executable_path=driver_path), options=options)
         except Exception as e:
-            log.warning(f"Failed to create Chrome driver with ChromeDriverManager: {e}")
+            # The cached driver may no longer match the installed Chrome
+            log.debug("Cached chromedriver %s failed, resolving it again: %s", driver_path, e)
+            _resolved_chromedriver_path.cache_clear()
+            driver_path = _cached_driver_path("chromedriver", _install_chromedriver, refresh=True)
+            return webdriver.Chrome(service=ChromeService(executable_path=driver_path), options=options)
+
+    def _chrome_with_os_path(self, options):
+        """Start Chrome with chromedriver from the standard location for this OS."""
+        from selenium.webdriver.chrome.service import Service as ChromeService
+
+        service = ChromeService(executable_path=DEFAULT_CHROMEDRIVER_PATH)
+        return webdriver.Chrome(service=service, options=options)
 
-        # Method 3: Try standard Chrome path by OS
+    def _run_driver_strategies(self, browser, strategies, options):
+        """
+        Try each way of starting a driver until one works.
+
+        The strategy that worked last time is tried first, so machines where
+        the early methods are known to fail skip straight to the one that works.
+
+        Args:
+            browser (str): "chrome" or "firefox"
+            strategies (list): (name, description, factory) tuples in default order
+            options: Browser options passed to each factory
+
+        Returns:
+            WebDriver: WebDriver instance or None if every strategy fails
+        """
+        label = browser.capitalize()
+        winner = _winning_strategies().get(browser)
+        ordered = sorted(strategies, key=lambda strategy: strategy[0] != winner)
+
+        for attempt, (name, description, factory) in enumerate(ordered, 1):
+            try:
+                log.debug("Attempting to initialize %s driver with %s", label, description)
+                driver = factory(options)
+                log.info(f"Successfully initialized {label} driver with {description}")
+                if name != winner:
+                    _remember_winning_strategy(browser, name)
+                return driver
+            except Exception as e:
+                if attempt == len(ordered):
+                    log.error(f"All {label} driver initialization methods failed: {e}", exc_info=True)
+                else:
+                    log.warning(f"Failed to create {label} driver with {description}: {e}")
+        return None
+
+    def _wait(self, timeout):
+        """
+        Get a WebDriverWait for the current driver, reusing one per timeout.
+
+        Args:
+            timeout (int): Maximum time to wait (seconds)
+
+        Returns:
+            WebDriverWait: Wait bound to self.driver
+        """
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver, wait = self._wait_cache.get(timeout, (None, None))
+        if wait is None or driver is not self.driver:
+            wait = WebDriverWait(self.driver, timeout, poll_frequency=WAIT_POLL_FREQUENCY)
+            self._wait_cache[timeout] = (self.driver, wait)
+        return wait
+
+    @contextlib.contextmanager
+    def implicit_wait(self, timeout):
+        """
+        Let plain find_element calls in a with block wait for elements inside the browser.
+
+        The driver polls for the element itself instead of the client polling over
+        WebDriver calls. The implicit wait is reset to zero afterwards so it never
+        adds to the explicit waits used elsewhere.
+
+        Args:
+            timeout (float): Maximum time to wait for elements in seconds
+
+        Yields:
+            webdriver.Chrome/Firefox: The driver
+        """
+        self.driver.implicitly_wait(timeout)
         try:
-            log.debug("Attempting to initialize Chrome driver with standard OS path")
-            from selenium.webdriver.chrome.service import Service as ChromeService
+            yield self.driver
+        finally:
+            self.driver.implicitly_wait(0)
 
-            # Determine driver path based on operating system
-            if platform.system() == "Darwin":  # macOS
-                driver_path = "/usr/local/bin/chromedriver"
-            elif platform.system() == "Linux":
-                driver_path = "/usr/bin/chromedriver"
-            else:  # Windows
-                driver_path = "C:\\Program Files\\Google\\Chrome\\Application\\chromedriver.exe"
-
-            service = ChromeService(executable_path=driver_path)
-            driver = webdriver.Chrome(service=service, options=options)
-            log.info("Successfully initialized Chrome driver with standard OS path")
-            return driver
+    def add_cookies(self, cookies):
+        """
+        Install cookies taken from another browser, e.g. to share a logged-in session.
+
+        Args:
+            cookies (list): WebDriver cookies from driver.get_cookies()
+        """
+        execute_cdp_cmd = getattr(self.driver, "execute_cdp_cmd", None)
+        if execute_cdp_cmd is not None:
+            try:
+                execute_cdp_cmd("Network.setCookies", {"cookies": [_cdp_cookie(cookie) for cookie in cookies]})
+                return
+            except Exception as e:
+                log.debug("Could not set cookies over CDP, adding them one by one: %s", e)
+
+        # add_cookie only accepts cookies for the site currently loaded
+        self.driver.get(self.base_url)
+        for cookie in cookies:
+            try:
+                self.driver.add_cookie(cookie)
+            except Exception as e:
+                log.debug("Could not add cookie %s: %s", cookie['name'], e)
+
+    def has_saved_session(self):
+        """
+        Whether the browser may already hold cookies from an earlier run.
+
+        Returns:
+            bool: True if a persistent profile is in use or cookies were saved on the last close
+        """
+        return bool(self.user_data_dir or self.browser_profile) or os.path.exists(COOKIE_CACHE)
+
+    def save_session(self):
+        """
+        Save the browser's cookies so the next run can skip the login form.
+
+        Called after logging in as well as on close, so a run that crashes
+        part way through still leaves a usable session behind.
+        """
+        # Without a persistent profile the session's cookies would be lost with the browser
+        if not self.driver or self.user_data_dir or self._attached():
+            return
+        try:
+            _save_cached_cookies(self.driver.get_cookies())
         except Exception as e:
-            log.error(f"All Chrome driver initialization methods failed: {e}", exc_info=True)
-            return None
+            log.debug("Could not save cookies: %s", e)
+
+    def _profile_has_recent_cookies(self):
+        """Whether the persistent Chrome profile already holds cookies from a recent session."""
+        if not self.user_data_dir:
+            return False
+        now = time.time()
+        for path in (os.path.join(self.user_data_dir, "Default", "Network", "Cookies"),
+                     os.path.join(self.user_data_dir, "Default", "Cookies")):
+            try:
+                if now - os.path.getmtime(path) < PROFILE_COOKIES_MAX_AGE:
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def _install_page_scripts(self):
+        """Install helper scripts into every page the browser loads from now on (Chromium only)."""
+        execute_cdp_cmd = getattr(self.driver, "execute_cdp_cmd", None)
+        if execute_cdp_cmd is None:
+            return
+        # A pooled driver keeps the script from its first use; registering it again
+        # would run it once more on every page
+        if vars(self.driver).get('_page_script_id') is None:
+            try:
+                result = execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": COOKIE_POPUP_PAGE_SCRIPT})
+                self.driver._page_script_id = result["identifier"]
+            except Exception as e:
+                log.debug("Could not install page scripts: %s", e)
+                return
+        self._page_scripts_installed = True
 
     def _set_initial_cookies(self):
-        """Set initial cookies to prevent popups and improve user experience."""
-        try:
-            log.debug("Setting initial cookies")
-            self.driver.get(self.base_url)
-            time.sleep(2)  # Wait for page to load
+        """
+        Set initial cookies to prevent popups and improve user experience.
+
+        A persistent profile with a recent cookie store already has them. Chromium
+        drivers install cookies cached by the last session together with the
+        initial ones in a single CDP call, which needs no page at all; other
+        drivers open a small same-origin document so add_cookie accepts them
+        without waiting for the site's full page to load.
+        """
+        if self._profile_has_recent_cookies():
+            log.debug("Profile already has recent cookies, skipping initial cookies")
+            return
 
-            cookie_settings = [
-                {'name': 'cookie-policy-accepted', 'value': 'true', 'domain': '.hotmart.com'},
-                {'name': 'cookie-policy-preferences', 'value': 'true', 'domain': '.hotmart.com'},
-                {'name': 'hotmart-cookie-policy', 'value': 'accepted', 'domain': '.hotmart.com'}
-            ]
+        log.debug("Setting initial cookies")
 
-            for cookie in cookie_settings:
+        # Chromium drivers can install every cookie in a single CDP call; Firefox has no execute_cdp_cmd
+        execute_cdp_cmd = getattr(self.driver, "execute_cdp_cmd", None)
+        if execute_cdp_cmd is not None:
+            cached_cookies = _load_cached_cookies()
+            try:
+                cookies = [_cdp_cookie(cookie) for cookie in cached_cookies] + list(INITIAL_CDP_COOKIES)
+                execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+                if cached_cookies:
+                    log.debug("Restored %d cookies from the last session", len(cached_cookies))
+                log.debug("Added cookies: %s", INITIAL_COOKIE_NAMES)
+                return
+            except Exception as e:
+                log.debug("Could not set cookies over CDP, adding them one by one: %s", e)
+
+        try:
+            # add_cookie only needs a page on the site's domain; driver.get blocks
+            # until the page has loaded, so use a plain-text one
+            self.driver.get(f"{self.base_url}/robots.txt")
+
+            for cookie in INITIAL_COOKIES:
                 try:
                     self.driver.add_cookie(cookie)
-                    log.debug(f"Added cookie: {cookie['name']}")
+                    log.debug("Added cookie: %s", cookie['name'])
                 except Exception as e:
                     log.warning(f"Could not add cookie {cookie['name']}: {str(e)}")
         except Exception as e:
@@ -312,223 +1078,64 @@ class BrowserManager:
         """
         Handle cookie policy popup if it exists by clicking on accept buttons.
 
+        Detection and clicking happen in a single script run in the page, which
+        then waits for the popup to go away before reporting back. Nothing is
+        searched for when the page already has the acceptance cookie.
+
         Args:
-            timeout (int): Maximum time to wait for popup elements (seconds)
+            timeout (int): Maximum time to wait for the popup to be dismissed (seconds)
 
         Returns:
             bool: True if popup was handled, False otherwise
         """
         try:
+            if any((cookie.get('name'), cookie.get('value')) == COOKIE_POLICY_ACCEPTED
+                   for cookie in self.driver.get_cookies()):
+                log.debug("Cookie policy already accepted, skipping popup check")
+                return True
+
             log.info("Checking for cookie policy popup")
-            # Wait only a short time since we don't want to slow things down if there's no popup
-            wait = WebDriverWait(self.driver, timeout)
+            popup_args = (COOKIE_CONTAINER_SELECTORS, ACCEPT_BUTTON_SELECTORS, COOKIE_TEXT_XPATH, int(timeout * 1000))
+            result = None
+            if self._page_scripts_installed:
+                result = self.driver.execute_async_script(COOKIE_POPUP_CALL_SCRIPT, *popup_args)
+            if result is None or result.get('missing'):
+                result = self.driver.execute_async_script(COOKIE_POPUP_SCRIPT, *popup_args)
 
-            # First try by ID
-            try:
-                # Check if the cookie policy container exists
-                cookie_container = self.driver.find_element(By.ID, "hotmart-cookie-policy")
-                if cookie_container.is_displayed():
-                    log.info("Found cookie policy popup, attempting to accept...")
-                    return self._try_accept_cookie_buttons(cookie_container)
-            except Exception:
-                pass
-
-            # Try with specific text "This site uses cookies"
-            try:
-                log.info("Looking for 'This site uses cookies' dialog")
-                
-                # Try direct approach - look for the OK button directly
-                try:
-                    log.info("Looking for cookie OK button directly")
-                    ok_buttons = self.driver.find_elements(By.XPATH, "//button[text()='OK' or text()='Ok' or text()='ok']")
-                    if len(ok_buttons) > 0:
-                        log.info(f"Found {len(ok_buttons)} OK buttons directly")
-                        for button in ok_buttons:
-                            try:
-                                if button.is_displayed():
-                                    log.info("Found visible OK button, clicking it")
-                                    self.driver.execute_script("arguments[0].click();", button)
-                                    log.info("Clicked OK button")
-                                    time.sleep(1)
-                                    return True
-                            except Exception as e:
-                                log.info(f"Error with OK button: {e}")
-                except Exception as e:
-                    log.info(f"Error searching for OK buttons: {e}")
-                
-                # Try multiple patterns to find the cookie dialog text
-                cookie_text_elements = self.driver.find_elements(By.XPATH, 
-                    "//*[contains(text(), 'This site uses cookies') or contains(text(), 'site uses cookies') or contains(text(), 'cookies are important')]")
-                
-                # Also try looking for the text in divs with cookie/modal classes
-                if len(cookie_text_elements) == 0:
-                    log.info("Trying to find cookie dialog by class and content")
-                    cookie_text_elements = self.driver.find_elements(By.XPATH, 
-                        "//div[contains(@class, 'cookie') or contains(@class, 'modal')]//p[contains(text(), 'cookie') or contains(text(), 'Cookie')]")
-                
-                log.info(f"Found {len(cookie_text_elements)} elements containing cookie-related text")
-                
-                # Dump page source for debugging if no elements found
-                if len(cookie_text_elements) == 0:
-                    log.info("No cookie dialog found, dumping some page content for debugging")
-                    try:
-                        page_body = self.driver.find_element(By.TAG_NAME, "body").text
-                        if len(page_body) > 1000:
-                            page_snippet = page_body[:1000] + "..."
-                        else:
-                            page_snippet = page_body
-                        log.info(f"Page content snippet: {page_snippet}")
-                        
-                        # If we see the cookie text in the page but couldn't find it with XPath, try JavaScript
-                        if "This site uses cookies" in page_body or "site uses cookies" in page_body:
-                            log.info("Cookie text found in page body, trying JavaScript approach")
-                            result = self.driver.execute_script("""
-                                // Try to find and click OK button for cookie consent
-                                var buttons = document.querySelectorAll('button');
-                                for (var i = 0; i < buttons.length; i++) {
-                                    if (buttons[i].textContent.trim().toUpperCase() === 'OK') {
-                                        console.log('Found OK button via JS');
-                                        buttons[i].click();
-                                        return true;
-                                    }
-                                }
-                                return false;
-                            """)
-                            if result:
-                                log.info("Successfully clicked OK button via JavaScript")
-                                return True
-                    except Exception as e:
-                        log.info(f"Could not get page content: {e}")
-                for element in cookie_text_elements:
-                    # Try to find the parent dialog container
-                    try:
-                        dialog_container = element.find_element(By.XPATH, "./ancestor::div[contains(@class, 'cookie') or contains(@class, 'dialog') or contains(@class, 'modal')]")
-                        if dialog_container.is_displayed():
-                            log.info("Found 'This site uses cookies' dialog, attempting to accept...")
-                            
-                            # First look for an OK button
-                            ok_buttons = dialog_container.find_elements(By.XPATH, 
-                                ".//button[contains(text(), 'OK') or contains(text(), 'Ok') or contains(text(), 'ok')]")
-                            
-                            log.info(f"Found {len(ok_buttons)} OK buttons in dialog")
-                            for button in ok_buttons:
-                                if button.is_displayed():
-                                    log.info("Found visible OK button, clicking it")
-                                    self.driver.execute_script("arguments[0].click();", button)
-                                    log.info("Clicked OK button on cookie dialog")
-                                    time.sleep(1)
-                                    return True
-                            
-                            # If no OK button found, try other accept buttons
-                            return self._try_accept_cookie_buttons(dialog_container)
-                    except Exception:
-                        continue
-            except Exception:
-                pass
-                
-            # Try other common cookie consent popup classes/IDs
-            cookie_selectors = [
-                ".cookie-notice", "#cookie-notice", ".cookie-banner", "#cookie-banner",
-                ".cookie-consent", "#cookie-consent", ".cookie-policy", "#cookie-policy"
-            ]
-
-            for selector in cookie_selectors:
-                try:
-                    cookie_element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    if cookie_element.is_displayed():
-                        log.debug(f"Found cookie element with selector: {selector}")
-                        return self._try_accept_cookie_buttons(cookie_element)
-                except Exception:
-                    continue
+            if not result or not result.get('handled'):
+                log.debug("No cookie policy popup found")
+                if result:
+                    log.debug("Page content snippet: %s", result.get('snippet'))
+                    if result.get('hasCookieText'):
+                        log.info("Cookie text found in page body but no accept button matched")
+                return False
 
-            # Use JavaScript as a last resort
-            return self._try_javascript_cookie_handling()
+            log.info(f"Handled cookie policy popup via {result.get('via')}"
+                     f"{'' if result.get('dismissed') else ' (still visible)'}")
+            return True
 
         except Exception as e:
             log.warning(f"Error handling cookie popup: {str(e)}")
             return False
 
-    def _try_accept_cookie_buttons(self, container):
+    def wait_for_ready(self, timeout=10):
         """
-        Try to find and click accept buttons within a container.
+        Wait for the current page to finish loading.
 
         Args:
-            container: WebElement containing cookie consent buttons
+            timeout (int): Maximum time to wait (seconds)
 
         Returns:
-            bool: True if a button was clicked, False otherwise
+            bool: True if the page loaded, False if it timed out
         """
-        # Try different accept button selectors
-        selectors = [
-            "button.accept-button", "button.accept", "button.agree",
-            ".accept-cookies-button", "button[data-action='accept']",
-            ".cookie-accept-button", "#acceptCookies", 
-            "button:contains('OK')", "button.ok", "#okButton", "[aria-label='OK']"
-        ]
+        from selenium.common.exceptions import TimeoutException
 
-        for selector in selectors:
-            try:
-                accept_button = container.find_element(By.CSS_SELECTOR, selector)
-                if accept_button.is_displayed():
-                    self.driver.execute_script("arguments[0].click();", accept_button)
-                    log.debug(f"Clicked cookie accept button with selector: {selector}")
-                    time.sleep(1)  # Wait for the popup to disappear
-                    return True
-            except Exception:
-                continue
-
-        return False
-
-    def _try_javascript_cookie_handling(self):
-        """
-        Try to handle cookie popups using JavaScript.
-
-        Returns:
-            bool: True if JavaScript handled the popup, False otherwise
-        """
-        result = self.driver.execute_script("""
-            // Try to handle cookie banners by common class/ID names
-            var banners = [
-                'cookie-banner', 'cookie-notice', 'cookie-policy', 'cookie-consent',
-                'cookie-popup', 'cookie-message', 'cookie-notification', 'cookie-alert'
-            ];
-
-            // Try to find and click accept buttons in any of these containers
-            for (var i = 0; i < banners.length; i++) {
-                var elements = document.getElementsByClassName(banners[i]);
-                if (elements.length === 0) {
-                    elements = [document.getElementById(banners[i])];
-                }
-
-                for (var j = 0; j < elements.length; j++) {
-                    if (elements[j]) {
-                        var buttons = elements[j].querySelectorAll('button, .btn, a.accept, a.agree');
-                        for (var k = 0; k < buttons.length; k++) {
-                            if (buttons[k].innerText.toLowerCase().includes('accept') || 
-                                buttons[k].innerText.toLowerCase().includes('agree') ||
-                                buttons[k].innerText.toLowerCase().includes('aceitar') ||
-                                buttons[k].innerText.toLowerCase().includes('ok')) {
-                                buttons[k].click();
-                                return true;
-                            }
-                        }
-                    }
-                }
-            }
-
-            // If we reach here, try to just hide any cookie policy containers
-            var policy = document.getElementById('hotmart-cookie-policy');
-            if (policy) {
-                policy.style.display = 'none';
-                policy.style.visibility = 'hidden';
-                policy.style.zIndex = '-999999';
-                return true;
-            }
-
-            return false;
-        """)
-
-        return bool(result)
+        try:
+            self._wait(timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
+            return True
+        except TimeoutException:
+            log.debug("Timed out after %ds waiting for page to load", timeout)
+            return False
 
     def wait_for_element(self, by, value, timeout=10, condition="presence"):
         """
@@ -543,15 +1150,12 @@ class BrowserManager:
         Returns:
             WebElement: The element if found, None otherwise
         """
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+
         try:
-            wait = WebDriverWait(self.driver, timeout)
-
-            if condition == "visible":
-                return wait.until(EC.visibility_of_element_located((by, value)))
-            elif condition == "clickable":
-                return wait.until(EC.element_to_be_clickable((by, value)))
-            else:  # default to presence
-                return wait.until(EC.presence_of_element_located((by, value)))
+            expected = getattr(EC, EC_SINGLE.get(condition, EC_SINGLE["presence"]))
+            return self._wait(timeout).until(expected((by, value)))
         except TimeoutException:
             log.warning(f"Timeout waiting for element: {value} (condition: {condition})")
             return None
@@ -559,6 +1163,40 @@ class BrowserManager:
             log.warning(f"Error waiting for element {value}: {e}")
             return None
     
+    def wait_for_element_fused(self, by, value, timeout=10, condition="presence"):
+        """
+        Wait for an element inside the page instead of polling from Python.
+
+        Presence, visibility and clickability are all checked by one script that
+        reacts to DOM changes as they happen, so an appearing element is picked
+        up within milliseconds and the whole wait costs a single round-trip.
+        Locators the script can't resolve (link text) fall back to wait_for_element.
+        Timeouts longer than the driver's script timeout (30s by default) fail early.
+
+        Args:
+            by (selenium.webdriver.common.by.By): The method to locate the element
+            value (str): The locator value
+            timeout (int): Maximum time to wait (seconds)
+            condition (str): Type of wait condition: "presence", "visible", or "clickable"
+
+        Returns:
+            WebElement: The element if found, None otherwise
+        """
+        if by not in FUSED_LOCATORS:
+            return self.wait_for_element(by, value, timeout, condition)
+
+        try:
+            element = self.driver.execute_async_script(
+                WAIT_FOR_ELEMENT_SCRIPT, by, value, condition, int(timeout * 1000)
+            )
+        except Exception as e:
+            log.warning(f"Error waiting for element {value}: {e}")
+            return None
+
+        if element is None:
+            log.warning(f"Timeout waiting for element: {value} (condition: {condition})")
+        return element
+
     def wait_for_elements(self, by, value, timeout=10, condition="presence"):
         """
         Wait for multiple elements to be available in the DOM.
@@ -572,13 +1210,12 @@ class BrowserManager:
         Returns:
             list: List of WebElements if found, empty list otherwise
         """
-        try:
-            wait = WebDriverWait(self.driver, timeout)
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
 
-            if condition == "visible":
-                return wait.until(EC.visibility_of_all_elements_located((by, value)))
-            else:  # default to presence
-                return wait.until(EC.presence_of_all_elements_located((by, value)))
+        try:
+            expected = getattr(EC, EC_MULTI.get(condition, EC_MULTI["presence"]))
+            return self._wait(timeout).until(expected((by, value)))
         except TimeoutException:
             log.warning(f"Timeout waiting for elements: {value} (condition: {condition})")
             return []
@@ -586,6 +1223,22 @@ class BrowserManager:
             log.warning(f"Error waiting for elements {value}: {e}")
             return []
 
+    def visible_elements(self, elements):
+        """
+        Filter elements down to the visible ones in a single round-trip.
+
+        Use this instead of calling is_displayed() on each element in turn.
+
+        Args:
+            elements (list): WebElements to check
+
+        Returns:
+            list: The elements that are visible, in their original order
+        """
+        if not elements:
+            return []
+        return self.driver.execute_script(VISIBLE_ELEMENTS_SCRIPT, elements) or []
+
     def execute_javascript(self, script, *args):
         """
         Execute JavaScript in the browser.
@@ -604,10 +1257,18 @@ class BrowserManager:
             return None
 
     def close(self):
-        """Close the browser."""
+        """Close the browser, or just this manager's tab when attached to a shared browser."""
         if self.driver:
+            self.save_session()
             try:
-                self.driver.quit()
+                if self._attached():
+                    self._close_isolated_tab()
+                else:
+                    self.driver.quit()
                 log.debug("Browser closed successfully")
             except Exception as e:
-                log.warning(f"Error closing browser: {e}")
\ No newline at end of file
+                log.warning(f"Error closing browser: {e}")
+
+
+# Don't leave warm browsers running once the program is done with them
+atexit.register(BrowserManager.shutdown_pools)
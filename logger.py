@@ -3,8 +3,11 @@ Logging module for 101kg downloader.
 
 Provides standardized logging functionality across the application.
 """
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import sys
 from datetime import datetime
 
@@ -15,9 +18,76 @@ WARNING = logging.WARNING
 ERROR = logging.ERROR
 CRITICAL = logging.CRITICAL
 
+# Size of the in-memory buffer for log file writes (bytes)
+LOG_BUFFER_SIZE = 64 * 1024
+
+# Set this environment variable to "1" to log to the console only
+DISABLE_FILE_LOG_ENV = "KG_DISABLE_FILE_LOG"
+
 # Global logger instance
 _logger = None
 
+# Background listener that writes queued records to the real handlers
+_listener = None
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    File handler that batches writes in a user-space buffer.
+
+    Records are written to disk when the buffer fills up, or straight away for
+    WARNING and above so errors are never stuck in memory.
+    """
+
+    def __init__(self, filename, buf_size=LOG_BUFFER_SIZE):
+        """
+        Open the log file for buffered appending.
+
+        Args:
+            filename (str): Path of the log file
+            buf_size (int): Size of the write buffer in bytes
+        """
+        self.buf_size = buf_size
+        super().__init__(filename, mode="ab")
+
+    def _open(self):
+        # Binary mode with an explicit buffer size gives an io.BufferedWriter
+        return open(self.baseFilename, self.mode, buffering=self.buf_size)
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+            self.stream.write(msg.encode("utf-8"))
+            if record.levelno >= logging.WARNING:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class CachedSecondFormatter(logging.Formatter):
+    """
+    Formatter that formats the timestamp once per second rather than per record.
+
+    Only caches when a datefmt is given, since the default format includes
+    milliseconds.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last_sec = None
+        self._last_str = ""
+
+    def formatTime(self, record, datefmt=None):
+        if datefmt is None:
+            return super().formatTime(record, datefmt)
+        sec = int(record.created)
+        if sec != self._last_sec:
+            self._last_str = super().formatTime(record, datefmt)
+            self._last_sec = sec
+        return self._last_str
+
 
 def setup_logger(level=logging.INFO, log_to_file=True, console_level=None):
     """
@@ -25,18 +95,24 @@ def setup_logger(level=logging.INFO, log_to_file=True, console_level=None):
 
     Args:
         level (int): The logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-        log_to_file (bool): Whether to log to a file in addition to console
+        log_to_file (bool): Whether to log to a file in addition to console.
+                            Ignored when KG_DISABLE_FILE_LOG=1 is set.
         console_level (int, optional): Separate logging level for console output.
                                       If None, uses the same level as specified in 'level'.
 
     Returns:
         logging.Logger: Configured logger instance
     """
-    global _logger
+    global _logger, _listener
 
     if _logger is not None:
         return _logger
 
+    # Records never show thread or process details, so skip looking them up
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
     # Create logger
     _logger = logging.getLogger("101kg")
     _logger.setLevel(level)
@@ -47,32 +123,57 @@ def setup_logger(level=logging.INFO, log_to_file=True, console_level=None):
     console_handler.setLevel(console_level if console_level is not None else level)
 
     # Create formatter
-    formatter = logging.Formatter(
+    formatter = CachedSecondFormatter(
         "%(asctime)s - %(levelname)s - %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     console_handler.setFormatter(formatter)
 
-    # Add console handler to logger
-    _logger.addHandler(console_handler)
+    handlers = [console_handler]
 
     # Add file handler if requested
-    if log_to_file:
-        # Ensure logs directory exists
-        os.makedirs("logs", exist_ok=True)
-        
+    if log_to_file and os.environ.get(DISABLE_FILE_LOG_ENV) != "1":
         # Create log filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         log_file = f"logs/101kg_{timestamp}.log"
         
-        file_handler = logging.FileHandler(log_file)
+        # Only create the logs directory the first time it is missing
+        try:
+            file_handler = BufferedFileHandler(log_file)
+        except FileNotFoundError:
+            os.makedirs("logs", exist_ok=True)
+            file_handler = BufferedFileHandler(log_file)
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        _logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    # Callers only enqueue records; the listener thread does the actual I/O
+    log_queue = queue.SimpleQueue()
+    _logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(shutdown_logger)
 
     return _logger
 
 
+def shutdown_logger():
+    """
+    Stop the background log listener and close its handlers.
+
+    Any queued records are written and the log file buffer is flushed.
+    Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
 def get_logger():
     """
     Get the configured logger instance.
@@ -88,27 +189,42 @@ def get_logger():
     return _logger
 
 
-# Convenience functions
+def is_enabled_for(level):
+    """
+    Check whether a message at the given level would be logged.
+
+    Use this to skip building expensive debug output that would be discarded.
+
+    Args:
+        level (int): The logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+
+    Returns:
+        bool: True if messages at this level are logged
+    """
+    return get_logger().isEnabledFor(level)
+
+
+# Convenience functions (skip the get_logger() call once the logger exists)
 def debug(msg, *args, **kwargs):
     """Log a debug message."""
-    get_logger().debug(msg, *args, **kwargs)
+    (_logger or get_logger()).debug(msg, *args, **kwargs)
 
 
 def info(msg, *args, **kwargs):
     """Log an info message."""
-    get_logger().info(msg, *args, **kwargs)
+    (_logger or get_logger()).info(msg, *args, **kwargs)
 
 
 def warning(msg, *args, **kwargs):
     """Log a warning message."""
-    get_logger().warning(msg, *args, **kwargs)
+    (_logger or get_logger()).warning(msg, *args, **kwargs)
 
 
 def error(msg, *args, **kwargs):
     """Log an error message."""
-    get_logger().error(msg, *args, **kwargs)
+    (_logger or get_logger()).error(msg, *args, **kwargs)
 
 
 def critical(msg, *args, **kwargs):
     """Log a critical message."""
-    get_logger().critical(msg, *args, **kwargs)
\ No newline at end of file
+    (_logger or get_logger()).critical(msg, *args, **kwargs)
\ No newline at end of file
@@ -63,8 +63,9 @@ def diagnose_audio_capture():
                 canvas.height = videoElement.videoHeight;
                 const ctx = canvas.getContext('2d');
                 
-                // Initialize recording variables
-                let canvasStream = canvas.captureStream();
+                // Initialize recording variables, capturing at 30 fps
+                const frameRate = 30;
+                let canvasStream = canvas.captureStream(frameRate);
                 let combinedStream = canvasStream;
                 
                 // Method 1: Try to get audio from the video element directly
@@ -90,28 +91,16 @@ def diagnose_audio_capture():
                     const audioStream = await navigator.mediaDevices.getUserMedia({ audio: true });
                     console.log('Received audio stream');
                     
-                    // Create a new MediaStream with both video and audio
-                    const newStream = new MediaStream();
-                    
-                    // Add all video tracks from canvas stream
-                    canvasStream.getVideoTracks().forEach(track => {
-                        newStream.addTrack(track);
-                    });
-                    
-                    // Add all audio tracks from audio stream
-                    audioStream.getAudioTracks().forEach(track => {
-                        console.log('Adding audio track:', track.label);
-                        newStream.addTrack(track);
-                    });
-                    
-                    // Use the combined stream
-                    combinedStream = newStream;
+                    // Combine the canvas video tracks with the system audio tracks in one stream
+                    const audioTracks = audioStream.getAudioTracks();
+                    audioTracks.forEach(track => console.log('Adding audio track:', track.label));
+                    combinedStream = new MediaStream([...canvasStream.getVideoTracks(), ...audioTracks]);
                     console.log('Created combined stream with video and system audio');
                 } catch (e) {
                     console.log('Could not get system audio:', e);
                 }
                 
-                // Find a supported codec with audio
+                // Find a supported codec with audio, probing only once per page
                 const codecsToTry = [
                     'video/webm; codecs=vp9,opus',
                     'video/webm; codecs=vp8,opus',
@@ -120,14 +109,9 @@ def diagnose_audio_capture():
                     'video/webm'
                 ];
                 
-                let mimeType = '';
-                for (const codec of codecsToTry) {
-                    if (MediaRecorder.isTypeSupported(codec)) {
-                        mimeType = codec;
-                        console.log('Using codec:', codec);
-                        break;
-                    }
-                }
+                const mimeType = window.__101kgSupportedMime ??=
+                    codecsToTry.find(codec => MediaRecorder.isTypeSupported(codec)) ?? '';
+                console.log('Using codec:', mimeType);
                 
                 if (!mimeType) {
                     return { success: false, error: 'No supported codec found' };
@@ -153,13 +137,19 @@ def diagnose_audio_capture():
                 console.log('Starting recording for 5 seconds');
                 recorder.start();
                 
-                // Draw video frames to canvas
-                const drawFrame = () => {
+                // Draw video frames to canvas, skipping animation frames the stream won't capture
+                const frameInterval = 1000 / frameRate;
+                let lastDraw = -frameInterval;
+                const drawFrame = (timestamp) => {
                     if (videoElement.paused || videoElement.ended) return;
-                    ctx.drawImage(videoElement, 0, 0, canvas.width, canvas.height);
+                    // Allow a millisecond of jitter so a 60 Hz display still draws every other frame
+                    if (timestamp - lastDraw >= frameInterval - 1) {
+                        ctx.drawImage(videoElement, 0, 0, canvas.width, canvas.height);
+                        lastDraw = timestamp;
+                    }
                     requestAnimationFrame(drawFrame);
                 };
-                drawFrame();
+                drawFrame(performance.now());
                 
                 // Record for 5 seconds
                 await new Promise(resolve => setTimeout(resolve, 5000));
@@ -203,23 +193,25 @@ def diagnose_audio_capture():
             # Save base64 data to a file
             base64_data = result.get('base64')
             if base64_data:
-                # Remove the data URL prefix
-                base64_data = base64_data.split(',')[1]
+                # Remove the data URL prefix without splitting the whole payload
+                base64_data = base64_data.partition(',')[2]
                 
                 # Save to file
                 import base64
+                recording = base64.b64decode(base64_data)
                 output_path = os.path.join(output_dir, "recording.webm")
                 with open(output_path, "wb") as f:
-                    f.write(base64.b64decode(base64_data))
+                    f.write(recording)
                 log.info(f"Saved recording to {output_path}")
                 
-                # Convert to MP4 with audio
+                # Convert to MP4 with audio, piping the recording we already have in memory
                 try:
                     import subprocess
                     mp4_path = os.path.join(output_dir, "recording.mp4")
                     cmd = [
                         'ffmpeg', '-y',
-                        '-i', output_path,
+                        '-f', 'webm',
+                        '-i', 'pipe:0',
                         '-c:v', 'libx264',
                         '-crf', '22',
                         '-preset', 'medium',
@@ -231,7 +223,7 @@ def diagnose_audio_capture():
                         mp4_path
                     ]
                     log.info(f"Converting to MP4 with command: {' '.join(cmd)}")
-                    subprocess.run(cmd, check=True)
+                    subprocess.run(cmd, input=recording, check=True)
                     log.info(f"Converted to MP4: {mp4_path}")
                 except Exception as e:
                     log.error(f"Error converting to MP4: {e}")
@@ -4,7 +4,6 @@ Firefox Configuration Checker
 
 This tool helps verify Firefox is properly configured with the Video Downloader Helper extension.
 """
-import time
 import sys
 import os
 import argparse
@@ -12,6 +11,25 @@ from selenium import webdriver
 from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+# XPath 1.0 has no lower-case(), so fold case with translate()
+_LOWERCASE = "translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+
+# Elements whose text or attributes name the Video DownloadHelper extension
+VDH_MENTION_XPATH = " | ".join(
+    f"//*[text()[contains({_LOWERCASE}, '{name}')] or @*[contains({_LOWERCASE}, '{name}')]]"
+    for name in ("video downloadhelper", "video download helper")
+)
+
+# Version shown on the extension's card in about:addons, or null
+VDH_VERSION_SCRIPT = """
+const card = document.querySelector("[class*='downloadhelper'], [title*='Download Helper']");
+const version = card && card.querySelector('.version');
+return version ? version.textContent.trim() : null;
+"""
 
 def check_firefox_configuration(browser_profile_path=None):
     """
@@ -29,14 +47,11 @@ def check_firefox_configuration(browser_profile_path=None):
         "/usr/bin/firefox"                                   # Linux
     ]
     
-    firefox_found = False
-    for path in firefox_binary_paths:
-        if os.path.exists(path):
-            print(f"✅ Firefox found at: {path}")
-            firefox_found = True
-            break
+    firefox_path = next((path for path in firefox_binary_paths if os.path.exists(path)), None)
     
-    if not firefox_found:
+    if firefox_path:
+        print(f"✅ Firefox found at: {firefox_path}")
+    else:
         print("❌ Firefox not found in standard locations. Please install Firefox or provide its location.")
         return False
     
@@ -59,14 +74,18 @@ def check_firefox_configuration(browser_profile_path=None):
         
         profiles_dir_found = False
         for profile_dir in profile_locations:
-            if os.path.exists(profile_dir):
-                print(f"✅ Firefox profiles directory found at: {profile_dir}")
-                profiles_dir_found = True
-                print(f"ℹ️ Detected profiles:")
-                for entry in os.listdir(profile_dir):
-                    if os.path.isdir(os.path.join(profile_dir, entry)):
-                        print(f"   - {entry}")
-                break
+            # scandir reports each entry's type without a stat per entry
+            try:
+                with os.scandir(profile_dir) as entries:
+                    profiles = [entry.name for entry in entries if entry.is_dir()]
+            except OSError:
+                continue
+            print(f"✅ Firefox profiles directory found at: {profile_dir}")
+            profiles_dir_found = True
+            print(f"ℹ️ Detected profiles:")
+            for profile in profiles:
+                print(f"   - {profile}")
+            break
         
         if not profiles_dir_found:
             print("⚠️ Firefox profiles directory not found in standard locations.")
@@ -89,46 +108,46 @@ def check_firefox_configuration(browser_profile_path=None):
         
         # Navigate to Mozilla's extension page
         driver.get("about:addons")
-        time.sleep(3)
         
         # Click on "Extensions" in the sidebar
         try:
-            extensions_link = driver.find_element(By.CSS_SELECTOR, "[name='extension']")
+            extensions_link = WebDriverWait(driver, 3).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "[name='extension']"))
+            )
             extensions_link.click()
-            time.sleep(2)
+            try:
+                WebDriverWait(driver, 2).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "addon-card"))
+                )
+            except TimeoutException:
+                pass  # No extensions listed
             print("✅ Navigated to Extensions page")
         except Exception as e:
             print(f"⚠️ Could not navigate to Extensions page: {e}")
         
-        # Check for Video Downloader Helper extension
-        page_source = driver.page_source.lower()
-        
-        if "video downloadhelper" in page_source or "video download helper" in page_source:
+        # Check for Video Downloader Helper extension without pulling the whole page source
+        if driver.find_elements(By.XPATH, VDH_MENTION_XPATH):
             print("✅ Video Downloader Helper extension is INSTALLED!")
             
+            # Read the version while about:addons is still loaded, in one round trip
+            try:
+                version = driver.execute_script(VDH_VERSION_SCRIPT)
+            except Exception:
+                version = None
+            
             # Check if the extension is enabled
             try:
                 # Check toolbar for extension icon
                 driver.get("about:blank")
-                time.sleep(2)
                 
-                extension_icon = driver.find_element(By.CSS_SELECTOR, 
+                WebDriverWait(driver, 2).until(EC.presence_of_element_located((By.CSS_SELECTOR,
                     "#net_downloadhelper_toolbar, .net-downloadhelper-button, [title*='Download Helper'], #wrapper-downloadhelper-net_downloadhelper_toolbar"
-                )
+                )))
                 print("✅ Video Downloader Helper toolbar icon is visible")
                 
-                # Get extension version if possible
-                driver.get("about:addons")
-                time.sleep(2)
-                
-                try:
-                    extension_card = driver.find_element(By.CSS_SELECTOR, 
-                        "[class*='downloadhelper'], [title*='Download Helper']"
-                    )
-                    version_elem = extension_card.find_element(By.CSS_SELECTOR, ".version")
-                    if version_elem:
-                        print(f"✅ Video Downloader Helper version: {version_elem.text}")
-                except:
+                if version:
+                    print(f"✅ Video Downloader Helper version: {version}")
+                else:
                     print("ℹ️ Could not determine extension version")
                 
             except Exception as e:
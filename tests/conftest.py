@@ -3,7 +3,7 @@ Pytest configuration and fixtures for 101kg tests.
 """
 import os
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 import requests
 import logging
 
@@ -33,13 +33,26 @@ def mock_driver():
     return driver
 
 
+@pytest.fixture(autouse=True)
+def console_only_logging(monkeypatch):
+    """Keep test runs from writing log files into the repository."""
+    monkeypatch.setenv("KG_DISABLE_FILE_LOG", "1")
+
+
 @pytest.fixture
+def no_sleep():
+    """Skip the fixed waits in code that normally gives a real browser time to react."""
+    with patch('time.sleep') as mock_sleep:
+        yield mock_sleep
+
+
+@pytest.fixture(scope="session")
 def sample_iframe_src():
     """Sample iframe src attribute for testing."""
     return "https://cf-embed.play.hotmart.com/embed/12345?jwtToken=sample_token"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_content_with_auth_token():
     """Sample content with auth token for testing."""
     return """
@@ -54,7 +67,7 @@ def sample_content_with_auth_token():
     """
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_m3u8_content():
     """Sample m3u8 playlist content for testing."""
     return """
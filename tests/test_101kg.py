@@ -6,6 +6,7 @@ import sys
 import os
 import json
 import importlib
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock, call, mock_open
 
 # Import the main module using importlib to avoid SyntaxError with numeric module name
@@ -16,22 +17,40 @@ main_func = kg_module.main
 load_config_func = kg_module.load_config
 
 
-def test_main_successful_execution(monkeypatch):
+@pytest.fixture
+def patched_kg_env(monkeypatch):
+    """Replace the logger setup and VideoDownloader used by main() with mocks."""
+    env = SimpleNamespace(
+        setup_logger=MagicMock(),
+        logger=MagicMock(),
+        downloader_class=MagicMock(),
+        downloader=MagicMock()
+    )
+    env.downloader.login.return_value = True
+    env.downloader_class.return_value = env.downloader
+
+    monkeypatch.setattr(kg_module.logger, 'setup_logger', env.setup_logger)
+    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: env.logger)
+    # Make the logging helpers ask get_logger() rather than reuse a real logger
+    monkeypatch.setattr(kg_module.logger, '_logger', None)
+    monkeypatch.setattr(kg_module, 'VideoDownloader', env.downloader_class)
+    return env
+
+
+@pytest.fixture(autouse=True)
+def isolated_url_cache(monkeypatch, tmp_path):
+    """Keep tests from reading or writing the real URL and lesson caches."""
+    cache_path = tmp_path / 'url_cache.json'
+    monkeypatch.setattr(kg_module, 'URL_CACHE_PATH', str(cache_path))
+    monkeypatch.setattr(kg_module, 'LESSON_CACHE_PATH', str(tmp_path / 'cache' / 'lessons.json'))
+    return cache_path
+
+
+def test_main_successful_execution(patched_kg_env, monkeypatch):
     """Test successful execution of the main function."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
-    
-    # Configure mocks
-    mock_downloader.login.return_value = True
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
+    mock_setup_logger = patched_kg_env.setup_logger
+    mock_downloader_class = patched_kg_env.downloader_class
+    mock_downloader = patched_kg_env.downloader
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', ['101kg.py', '--email', 'test@example.com', '--password', 'password123'])
@@ -42,28 +61,20 @@ def test_main_successful_execution(monkeypatch):
     # Check the results
     assert result == 0  # Success exit code
     mock_setup_logger.assert_called()
-    mock_downloader_class.assert_called_once_with('test@example.com', 'password123', headless=False, browser_type='chrome', browser_profile=None)
+    mock_downloader_class.assert_called_once_with('test@example.com', 'password123', headless=True, browser_type='chrome', browser_profile=None)
     mock_downloader.login.assert_called_once()
     mock_downloader.download_all_lessons.assert_called_once()
     mock_downloader.close.assert_called_once()
 
 
-def test_main_login_failure(monkeypatch):
+def test_main_login_failure(patched_kg_env, monkeypatch):
     """Test main function when login fails."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
+    mock_setup_logger = patched_kg_env.setup_logger
+    mock_downloader_class = patched_kg_env.downloader_class
+    mock_downloader = patched_kg_env.downloader
     
     # Configure mocks
     mock_downloader.login.return_value = False  # Login fails
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', ['101kg.py', '--email', 'test@example.com', '--password', 'wrong_password'])
@@ -74,28 +85,17 @@ def test_main_login_failure(monkeypatch):
     # Check the results
     assert result == 1  # Error exit code
     mock_setup_logger.assert_called()
-    mock_downloader_class.assert_called_once_with('test@example.com', 'wrong_password', headless=False, browser_type='chrome', browser_profile=None)
+    mock_downloader_class.assert_called_once_with('test@example.com', 'wrong_password', headless=True, browser_type='chrome', browser_profile=None)
     mock_downloader.login.assert_called_once()
     mock_downloader.download_all_lessons.assert_not_called()  # Should not be called on login failure
     mock_downloader.close.assert_called_once()  # Should still be called for cleanup
 
 
-def test_main_with_verbose_and_headless(monkeypatch):
+def test_main_with_verbose_and_headless(patched_kg_env, monkeypatch):
     """Test main function with verbose and headless options."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
-    
-    # Configure mocks
-    mock_downloader.login.return_value = True
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
+    mock_setup_logger = patched_kg_env.setup_logger
+    mock_downloader_class = patched_kg_env.downloader_class
+    mock_downloader = patched_kg_env.downloader
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', [
@@ -129,26 +129,40 @@ def test_main_with_verbose_and_headless(monkeypatch):
     assert matching_call, "No logger setup call found with matching log level and console level"
 
 
-def test_load_config_existing(monkeypatch):
+def test_quality_flag():
+    """Test that --quality accepts best, worst and heights only."""
+    parser = kg_module.build_parser()
+    assert parser.parse_args([]).quality == 'best'
+    assert parser.parse_args(['--quality', '720P']).quality == '720p'
+    with pytest.raises(SystemExit):
+        parser.parse_args(['--quality', 'hd'])
+
+
+def test_no_headless_flag():
+    """Test that the browser is headless unless --no-headless is given."""
+    parser = kg_module.build_parser()
+    assert parser.parse_args([]).headless is True
+    assert parser.parse_args(['--no-headless']).headless is False
+
+
+def test_load_config_existing(monkeypatch, tmp_path):
     """Test loading configuration from an existing file."""
     mock_config = {
         'email': 'test@example.com',
         'password': 'password123'
     }
-    mock_file_content = json.dumps(mock_config)
-    
-    # Mock os.path.exists to return True
-    monkeypatch.setattr(os.path, 'exists', lambda _: True)
-    # Mock open to return our mock config data
-    with patch('builtins.open', mock_open(read_data=mock_file_content)):
-        # Mock print function
-        with patch('builtins.print') as mock_print:
-            # Call the function
-            config = load_config_func('/mock/path/config.json')
-            
-            # Verify the result
-            assert config == mock_config
-            mock_print.assert_called_with("Loaded configuration from /mock/path/config.json")
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps(mock_config))
+    mock_logger = MagicMock()
+    monkeypatch.setattr(kg_module, 'logger', mock_logger)
+    monkeypatch.setattr(sys.stdin, 'isatty', lambda: False)
+
+    # Call the function
+    config = load_config_func(str(config_path))
+
+    # Verify the result
+    assert config == mock_config
+    mock_logger.info.assert_called_with(f"Loaded configuration from {config_path}")
 
 
 def test_load_config_nonexistent(monkeypatch):
@@ -165,10 +179,11 @@ def test_load_config_nonexistent(monkeypatch):
     assert config == {}
 
 
-def test_load_config_interactive_prompting(monkeypatch):
+def test_load_config_interactive_prompting(monkeypatch, tmp_path):
     """Test configuration loading with interactive prompting."""
-    # Mock os.path.exists to return False
-    monkeypatch.setattr(os.path, 'exists', lambda _: False)
+    config_path = tmp_path / 'config.json'
+    mock_logger = MagicMock()
+    monkeypatch.setattr(kg_module, 'logger', mock_logger)
     # Mock sys.stdin.isatty to return True (interactive)
     monkeypatch.setattr(sys.stdin, 'isatty', lambda: True)
     
@@ -176,64 +191,54 @@ def test_load_config_interactive_prompting(monkeypatch):
     monkeypatch.setattr('builtins.input', lambda _: 'test@example.com')
     monkeypatch.setattr('101kg.getpass', lambda _: 'password123')
     
-    # Mock file operations
-    mock_file = mock_open()
-    with patch('builtins.open', mock_file):
-        # Mock os.chmod to do nothing
-        with patch('os.chmod') as mock_chmod:
-            # Mock print function
-            with patch('builtins.print') as mock_print:
-                # Call the function
-                config = load_config_func('/mock/path/config.json')
-                
-                # Verify the result
-                assert config == {'email': 'test@example.com', 'password': 'password123'}
-                mock_file.assert_called_with('/mock/path/config.json', 'w')
-                mock_chmod.assert_called_with('/mock/path/config.json', 0o600)
-                
-                # Verify that print was called with the right message
-                save_message_found = False
-                for call_args in mock_print.call_args_list:
-                    if "Configuration saved to" in call_args[0][0]:
-                        save_message_found = True
-                        break
-                assert save_message_found
-
-
-def test_load_config_file_error(monkeypatch):
+    # Call the function
+    config = load_config_func(str(config_path))
+
+    # Verify the result
+    assert config == {'email': 'test@example.com', 'password': 'password123'}
+    assert json.loads(config_path.read_bytes()) == config
+    assert config_path.stat().st_mode & 0o777 == 0o600
+    assert not (tmp_path / 'config.json.tmp').exists()
+    mock_logger.info.assert_called_with(f"Configuration saved to {config_path}")
+
+
+def test_load_config_saves_through_short_writes(monkeypatch, tmp_path):
+    """Test that the saved configuration is complete when os.write writes only part of it."""
+    config_path = tmp_path / 'config.json'
+    monkeypatch.setattr(kg_module, 'logger', MagicMock())
+    monkeypatch.setattr(sys.stdin, 'isatty', lambda: True)
+    monkeypatch.setattr('builtins.input', lambda _: 'test@example.com')
+    monkeypatch.setattr('101kg.getpass', lambda _: 'password123')
+    real_write = os.write
+    monkeypatch.setattr(os, 'write', lambda fd, data: real_write(fd, data[:4]))
+
+    config = load_config_func(str(config_path))
+
+    assert json.loads(config_path.read_bytes()) == config
+
+
+def test_load_config_file_error(monkeypatch, tmp_path):
     """Test load_config with file operation errors."""
-    # Mock os.path.exists to return True
-    monkeypatch.setattr(os.path, 'exists', lambda _: True)
-    
-    # Mock open to raise an exception
-    with patch('builtins.open', side_effect=Exception("Mock file error")):
-        # Mock print function
-        with patch('builtins.print') as mock_print:
-            # Call the function
-            config = load_config_func('/mock/path/config.json')
-            
-            # Verify error handling
-            assert config == {}
-            mock_print.assert_called_with("Error loading config: Mock file error")
-
-
-def test_main_with_direct_url(monkeypatch):
-    """Test main function with direct URL download."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
+    config_path = tmp_path / 'config.json'
+    config_path.write_text('{not json')
     mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
+    monkeypatch.setattr(kg_module, 'logger', mock_logger)
+    monkeypatch.setattr(sys.stdin, 'isatty', lambda: False)
+
+    # Call the function
+    config = load_config_func(str(config_path))
+
+    # Verify error handling
+    assert config == {}
+    assert mock_logger.error.call_args[0][0].startswith("Error loading config: ")
+
+
+def test_main_with_direct_url(patched_kg_env, monkeypatch):
+    """Test main function with direct URL download."""
+    mock_downloader = patched_kg_env.downloader
     
     # Configure mocks
-    mock_downloader.login.return_value = True
     mock_downloader.download_video.return_value = True
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', [
@@ -256,23 +261,12 @@ def test_main_with_direct_url(monkeypatch):
     mock_downloader.close.assert_called_once()
 
 
-def test_main_with_direct_url_failure(monkeypatch):
+def test_main_with_direct_url_failure(patched_kg_env, monkeypatch):
     """Test main function with failing direct URL download."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
+    mock_downloader = patched_kg_env.downloader
     
     # Configure mocks
-    mock_downloader.login.return_value = True
     mock_downloader.download_video.return_value = False  # Download fails
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', [
@@ -292,26 +286,16 @@ def test_main_with_direct_url_failure(monkeypatch):
     mock_downloader.close.assert_called_once()
 
 
-def test_main_list_lessons_only(monkeypatch):
+def test_main_list_lessons_only(patched_kg_env, monkeypatch):
     """Test main function in list-only mode."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
+    mock_logger = patched_kg_env.logger
+    mock_downloader = patched_kg_env.downloader
     
     # Configure mocks
-    mock_downloader.login.return_value = True
     mock_downloader.get_all_lessons.return_value = [
         {'title': 'Lesson 1', 'hash': 'abc123'},
         {'title': 'Lesson 2', 'hash': 'def456'}
     ]
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', [
@@ -329,19 +313,61 @@ def test_main_list_lessons_only(monkeypatch):
     mock_downloader.login.assert_called_once()
     mock_downloader.get_all_lessons.assert_called_once()
     mock_downloader.download_all_lessons.assert_not_called()  # Should not be called in list mode
+    mock_logger.info.assert_any_call("Found 2 lessons:\n1. Lesson 1 (hash: abc123)\n2. Lesson 2 (hash: def456)")
     mock_downloader.close.assert_called_once()
 
 
-def test_main_single_video_download(monkeypatch):
+def test_main_list_with_prefetch(patched_kg_env, monkeypatch, isolated_url_cache):
+    """Test that --prefetch caches video URLs for the first lessons after listing."""
+    mock_downloader = patched_kg_env.downloader
+    
+    mock_downloader.get_all_lessons.return_value = [
+        {'title': 'Lesson 1', 'hash': 'abc123'},
+        {'title': 'Lesson 2', 'hash': 'def456'}
+    ]
+    mock_downloader.extract_video_url.return_value = [("", "https://example.com/video.mp4")]
+    mock_downloader.extract_lesson_description.return_value = "Description"
+    mock_downloader.base_url = "https://example.com"
+    
+    monkeypatch.setattr(sys, 'argv', [
+        '101kg.py',
+        '--email', 'test@example.com',
+        '--password', 'password123',
+        '--list',
+        '--prefetch', '1'
+    ])
+    
+    result = main_func()
+    
+    assert result == 0
+    mock_downloader.extract_video_url.assert_called_once_with("https://example.com/lesson/abc123")
+    mock_downloader.download_video.assert_not_called()
+    assert list(json.loads(isolated_url_cache.read_text())) == ['abc123']
+
+
+def test_prefetch_spreads_lessons_over_browsers():
+    """Test that prefetching hands lessons round-robin to each browser."""
+    downloaders = [MagicMock(base_url="https://example.com"), MagicMock(base_url="https://example.com")]
+    for downloader in downloaders:
+        downloader.extract_video_url.return_value = [("", "https://example.com/video.mp4")]
+        downloader.extract_lesson_description.return_value = None
+    lessons = [{'title': f'Lesson {i}', 'hash': f'hash{i}'} for i in range(1, 4)]
+    url_cache = {}
+
+    kg_module._prefetch(downloaders, lessons, url_cache)
+
+    assert sorted(url_cache) == ['hash1', 'hash2', 'hash3']
+    assert downloaders[0].extract_video_url.call_args_list == [
+        call("https://example.com/lesson/hash1"), call("https://example.com/lesson/hash3")
+    ]
+    downloaders[1].extract_video_url.assert_called_once_with("https://example.com/lesson/hash2")
+
+
+def test_main_single_video_download(patched_kg_env, monkeypatch):
     """Test main function with single video download."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
+    mock_downloader = patched_kg_env.downloader
     
     # Configure mocks
-    mock_downloader.login.return_value = True
     mock_downloader.get_all_lessons.return_value = [
         {'title': 'Lesson 1', 'hash': 'abc123'},
         {'title': 'Lesson 2', 'hash': 'def456'}
@@ -349,12 +375,6 @@ def test_main_single_video_download(monkeypatch):
     mock_downloader.extract_video_url.return_value = [("", "https://example.com/video.mp4")]
     mock_downloader.download_video.return_value = True
     mock_downloader.base_url = "https://example.com"
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', [
@@ -376,26 +396,15 @@ def test_main_single_video_download(monkeypatch):
     mock_downloader.close.assert_called_once()
 
 
-def test_main_single_video_not_found(monkeypatch):
+def test_main_single_video_not_found(patched_kg_env, monkeypatch):
     """Test main function when single video is not found."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
+    mock_downloader = patched_kg_env.downloader
     
     # Configure mocks
-    mock_downloader.login.return_value = True
     mock_downloader.get_all_lessons.return_value = [
         {'title': 'Lesson 1', 'hash': 'abc123'},
         {'title': 'Lesson 2', 'hash': 'def456'}
     ]
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', [
@@ -417,16 +426,38 @@ def test_main_single_video_not_found(monkeypatch):
     mock_downloader.close.assert_called_once()
 
 
-def test_main_with_index_download(monkeypatch):
+def test_main_single_video_by_number(patched_kg_env, monkeypatch):
+    """Test that a numeric --single selects by index even if an earlier title contains the number."""
+    mock_downloader = patched_kg_env.downloader
+    
+    mock_downloader.get_all_lessons.return_value = [
+        {'title': 'Kata 2 Basics', 'hash': 'abc123'},
+        {'title': 'Lesson B', 'hash': 'def456'}
+    ]
+    mock_downloader.extract_video_url.return_value = [("", "https://example.com/video.mp4")]
+    mock_downloader.extract_lesson_description.return_value = None
+    mock_downloader.download_video.return_value = True
+    mock_downloader.base_url = "https://example.com"
+    
+    monkeypatch.setattr(sys, 'argv', [
+        '101kg.py',
+        '--email', 'test@example.com',
+        '--password', 'password123',
+        '--single', '2'
+    ])
+    
+    result = main_func()
+    
+    assert result == 0
+    mock_downloader.extract_video_url.assert_called_once_with("https://example.com/lesson/def456")
+    mock_downloader.download_video.assert_called_once_with("https://example.com/video.mp4", "002_Lesson B")
+
+
+def test_main_with_index_download(patched_kg_env, monkeypatch):
     """Test main function with index-based downloading."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
+    mock_downloader = patched_kg_env.downloader
     
     # Configure mocks
-    mock_downloader.login.return_value = True
     mock_downloader.get_all_lessons.return_value = [
         {'title': 'Lesson 1', 'hash': 'abc123'},
         {'title': 'Lesson 2', 'hash': 'def456'},
@@ -435,12 +466,6 @@ def test_main_with_index_download(monkeypatch):
     mock_downloader.extract_video_url.return_value = [("", "https://example.com/video.mp4")]
     mock_downloader.download_video.return_value = True
     mock_downloader.base_url = "https://example.com"
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', [
@@ -469,26 +494,152 @@ def test_main_with_index_download(monkeypatch):
     mock_downloader.close.assert_called_once()
 
 
-def test_main_with_invalid_index_format(monkeypatch):
-    """Test main function with invalid index format."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
+def test_main_with_index_download_multiple_browsers(patched_kg_env, monkeypatch):
+    """Test --browsers spreads lesson extraction over extra logged-in browsers."""
+    mock_downloader_class = patched_kg_env.downloader_class
+    mock_downloader = patched_kg_env.downloader
+    mock_helper = MagicMock()
+
+    cookies = [{'name': 'session', 'value': 'abc'}]
+    mock_downloader.driver.get_cookies.return_value = cookies
+    mock_downloader.get_all_lessons.return_value = [
+        {'title': 'Lesson 1', 'hash': 'abc123'},
+        {'title': 'Lesson 2', 'hash': 'def456'}
+    ]
+    for downloader in (mock_downloader, mock_helper):
+        downloader.extract_video_url.return_value = [("", "https://example.com/video.mp4")]
+        downloader.download_video.return_value = True
+        downloader.base_url = "https://example.com"
+    mock_helper.login_with_cookies.return_value = True
+    mock_downloader_class.side_effect = [mock_downloader, mock_helper]
+
+    monkeypatch.setattr(sys, 'argv', [
+        '101kg.py',
+        '--email', 'test@example.com',
+        '--password', 'password123',
+        '--indexes', '1,2',
+        '--browsers', '2'
+    ])
+
+    result = main_func()
+
+    assert result == 0
+    assert mock_downloader_class.call_count == 2
+    mock_helper.login_with_cookies.assert_called_once_with(cookies)
+    mock_helper.login.assert_not_called()
+    mock_downloader.extract_video_url.assert_called_once_with("https://example.com/lesson/abc123")
+    mock_helper.extract_video_url.assert_called_once_with("https://example.com/lesson/def456")
+    mock_helper.close.assert_called_once()
+    mock_downloader.close.assert_called_once()
+
+
+def test_fetch_one_invalid_index():
+    """Test that an out-of-range index is counted as a failure without touching the browser."""
+    mock_downloader = MagicMock()
+    lessons = [{'title': 'Lesson 1', 'hash': 'abc123'}]
+
+    result = kg_module._fetch_one(mock_downloader, lessons, 5)
+
+    assert result == (5, 0, 1)
+    mock_downloader.extract_video_url.assert_not_called()
+    mock_downloader.download_video.assert_not_called()
+
+
+def test_fetch_one_multi_part(monkeypatch):
+    """Test that every part of a lesson is downloaded and counted."""
+    mock_downloader = MagicMock()
+    mock_downloader.base_url = "https://example.com"
+    mock_downloader.extract_video_url.return_value = [
+        ("Part_1", "https://example.com/1.mp4"),
+        ("Part_2", "https://example.com/2.mp4")
+    ]
+    mock_downloader.extract_lesson_description.return_value = None
+    mock_downloader.download_video.side_effect = [True, False]
+    lessons = [{'title': 'Lesson 1', 'hash': 'abc123'}]
+
+    result = kg_module._fetch_one(mock_downloader, lessons, 1)
+
+    assert result == (1, 1, 1)
+    mock_downloader.download_video.assert_has_calls([
+        call("https://example.com/1.mp4", "001_Lesson 1_Part_1"),
+        call("https://example.com/2.mp4", "001_Lesson 1_Part_2")
+    ])
+
+
+def test_fetch_one_uses_url_cache():
+    """Test that a cached lesson is downloaded without driving the browser."""
+    mock_downloader = MagicMock()
+    mock_downloader.download_video.return_value = True
+    lessons = [{'title': 'Lesson 1', 'hash': 'abc123'}]
+    url_cache = {
+        'abc123': {
+            'video_urls': [["", "https://example.com/1.mp4"]],
+            'description': None,
+            'expires_at': kg_module.time.time() + 60
+        }
+    }
+
+    result = kg_module._fetch_one(mock_downloader, lessons, 1, url_cache)
+
+    assert result == (1, 1, 0)
+    mock_downloader.extract_video_url.assert_not_called()
+    mock_downloader.extract_lesson_description.assert_not_called()
+    mock_downloader.download_video.assert_called_once_with("https://example.com/1.mp4", "001_Lesson 1")
+
+
+def test_url_cache_round_trip(isolated_url_cache):
+    """Test that extracted URLs are cached with their signed expiry and expired entries are dropped."""
+    mock_downloader = MagicMock()
+    mock_downloader.base_url = "https://example.com"
+    exp = int(kg_module.time.time()) + 7200
+    mock_downloader.extract_video_url.return_value = [("", f"https://example.com/1.m3u8?hdntl=exp={exp}~hmac=x")]
+    mock_downloader.extract_lesson_description.return_value = "Description"
+    lesson = {'title': 'Lesson 1', 'hash': 'abc123'}
+
+    url_cache = {'stale': {'video_urls': [], 'expires_at': 0}}
+    kg_module._extract_lesson(mock_downloader, lesson, url_cache)
+    kg_module.save_url_cache(url_cache)
+
+    loaded = kg_module.load_url_cache()
+    assert list(loaded) == ['abc123']
+    assert loaded['abc123']['expires_at'] == exp - kg_module.URL_CACHE_MARGIN
+    assert loaded['abc123']['description'] == "Description"
+    assert not os.path.exists(f"{isolated_url_cache}.tmp")
+
+
+def test_get_lessons_uses_lesson_cache():
+    """Test that the lesson list is scraped once and then served from the cache."""
     mock_downloader = MagicMock()
+    mock_downloader.base_url = "https://example.com"
+    lessons = [{'title': 'Lesson 1', 'hash': 'abc123'}]
+    mock_downloader.get_all_lessons.return_value = lessons
+
+    assert kg_module._get_lessons(mock_downloader) == lessons
+    assert kg_module._get_lessons(mock_downloader) == lessons
+    mock_downloader.get_all_lessons.assert_called_once()
+
+    assert kg_module._get_lessons(mock_downloader, refresh=True) == lessons
+    assert mock_downloader.get_all_lessons.call_count == 2
+    assert kg_module.load_lesson_cache("https://other.example.com") is None
+
+
+def test_lesson_cache_expires(monkeypatch):
+    """Test that a lesson list older than LESSON_CACHE_TTL is scraped again."""
+    kg_module.save_lesson_cache("https://example.com", [{'title': 'Lesson 1', 'hash': 'abc123'}])
+    monkeypatch.setattr(kg_module, 'LESSON_CACHE_TTL', 0)
+
+    assert kg_module.load_lesson_cache("https://example.com") is None
+
+
+def test_main_with_invalid_index_format(patched_kg_env, monkeypatch):
+    """Test main function with invalid index format."""
+    mock_downloader = patched_kg_env.downloader
     
     # Configure mocks
-    mock_downloader.login.return_value = True
     mock_downloader.get_all_lessons.return_value = [
         {'title': 'Lesson 1', 'hash': 'abc123'},
         {'title': 'Lesson 2', 'hash': 'def456'}
     ]
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', [
@@ -510,22 +661,12 @@ def test_main_with_invalid_index_format(monkeypatch):
     mock_downloader.close.assert_called_once()
 
 
-def test_main_keyboard_interrupt(monkeypatch):
+def test_main_keyboard_interrupt(patched_kg_env, monkeypatch):
     """Test main function with keyboard interrupt."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
+    mock_downloader = patched_kg_env.downloader
     
     # Configure mocks to raise KeyboardInterrupt
     mock_downloader.login.side_effect = KeyboardInterrupt()
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', ['101kg.py', '--email', 'test@example.com', '--password', 'password123'])
@@ -539,22 +680,13 @@ def test_main_keyboard_interrupt(monkeypatch):
     mock_downloader.close.assert_called_once()
 
 
-def test_main_generic_exception(monkeypatch):
+def test_main_generic_exception(patched_kg_env, monkeypatch):
     """Test main function with generic exception."""
-    # Setup mocks
-    mock_setup_logger = MagicMock()
-    mock_logger = MagicMock()
-    mock_downloader_class = MagicMock()
-    mock_downloader = MagicMock()
+    mock_logger = patched_kg_env.logger
+    mock_downloader = patched_kg_env.downloader
     
     # Configure mocks to raise an exception
     mock_downloader.login.side_effect = Exception("Test exception")
-    mock_downloader_class.return_value = mock_downloader
-    
-    # Monkeypatch
-    monkeypatch.setattr(kg_module.logger, 'setup_logger', mock_setup_logger)
-    monkeypatch.setattr(kg_module.logger, 'get_logger', lambda: mock_logger)
-    monkeypatch.setattr(kg_module, 'VideoDownloader', mock_downloader_class)
     
     # Mock command line arguments
     monkeypatch.setattr(sys, 'argv', ['101kg.py', '--email', 'test@example.com', '--password', 'password123'])
@@ -24,7 +24,7 @@ def mock_driver():
     mock_driver = MagicMock()
     yield mock_driver
 
-def test_diagnose_audio_capture_successful(mock_browser_manager, mock_driver):
+def test_diagnose_audio_capture_successful(mock_browser_manager, mock_driver, no_sleep):
     """Test successful audio capture diagnostic scenario."""
     # Setup the mock manager to return mock driver
     mock_browser_manager.initialize.return_value = mock_driver
@@ -66,11 +66,13 @@ def test_diagnose_audio_capture_successful(mock_browser_manager, mock_driver):
         
         # Verify ffmpeg conversion
         mock_subprocess_run.assert_called_once()
+        assert 'pipe:0' in mock_subprocess_run.call_args[0][0]
+        assert mock_subprocess_run.call_args[1]['input'] == b'test_data'
         
         # Verify browser was closed
         mock_driver.quit.assert_called_once()
         
-def test_diagnose_audio_capture_failure(mock_browser_manager, mock_driver):
+def test_diagnose_audio_capture_failure(mock_browser_manager, mock_driver, no_sleep):
     """Test failed audio capture diagnostic scenario."""
     # Setup the mock manager to return mock driver
     mock_browser_manager.initialize.return_value = mock_driver
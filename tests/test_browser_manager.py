@@ -1,15 +1,31 @@
 """
 Tests for the browser_manager module.
 """
+import json
+import os
+import threading
+import time
 import pytest
 from unittest.mock import patch, MagicMock, call
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+import browser_manager
 from browser_manager import BrowserManager
 
 
+@pytest.fixture(autouse=True)
+def isolated_driver_caches(tmp_path):
+    """Keep tests from reading or writing the real driver and cookie caches in ~/.cache."""
+    browser_manager._winning_strategies.cache_clear()
+    with patch.object(browser_manager, 'DRIVER_STRATEGY_CACHE', str(tmp_path / "driver_strategy.json")), \
+         patch.object(browser_manager, 'DRIVER_PATH_CACHE', str(tmp_path / "driver_paths.json")), \
+         patch.object(browser_manager, 'COOKIE_CACHE', str(tmp_path / "cookies.json")):
+        yield
+    browser_manager._winning_strategies.cache_clear()
+
+
 class TestBrowserManagerInit:
     """Tests for BrowserManager initialization."""
 
@@ -70,6 +86,11 @@ class TestChromeConfiguration:
         assert "--autoplay-policy=no-user-gesture-required" in args
         # We've removed mute-audio flag to enable audio capture
         assert "--mute-audio" not in args
+        # Images and GPU work are skipped when nobody watches
+        assert "--blink-settings=imagesEnabled=false" in args
+        assert "--disable-remote-fonts" in args
+        assert "--disable-gpu" in args
+        assert options.experimental_options["prefs"] == {"profile.managed_default_content_settings.images": 2}
 
     def test_configure_chrome_options_user_data_dir(self):
         """Test configuring Chrome options with user data directory."""
@@ -113,6 +134,18 @@ class TestFirefoxConfiguration:
         # Verify audio is still enabled in headless mode
         assert options.preferences["media.volume_scale"] == "1.0"
 
+    def test_configure_firefox_options_profile(self):
+        """Test that a Firefox profile is used in place rather than copied."""
+        manager = BrowserManager(browser_type="firefox", browser_profile="/path/to/profile")
+        options = manager._configure_firefox_options()
+        
+        # Verify the profile directory is passed straight to Firefox
+        assert options.arguments[-2:] == ["-profile", "/path/to/profile"]
+        
+        # Verify extensions in the profile stay enabled
+        assert options.preferences["xpinstall.signatures.required"] is False
+        assert options.preferences["extensions.autoDisableScopes"] == 0
+
 
 class TestChromeDriverInitialization:
     """Tests for Chrome driver initialization."""
@@ -134,7 +167,8 @@ class TestChromeDriverInitialization:
         mock_error = MagicMock()
         
         # Apply patches
-        with patch('selenium.webdriver.Chrome', mock_chrome):
+        with patch('selenium.webdriver.Chrome', mock_chrome), \
+             patch.object(browser_manager, '_chromedriver_on_path', return_value=None):
             with patch('logger.debug', mock_debug):
                 with patch('logger.info', mock_info):
                     with patch('logger.warning', mock_warning):
@@ -146,7 +180,7 @@ class TestChromeDriverInitialization:
         mock_chrome.assert_called_once_with(options=options)
         
         # Verify logging
-        mock_debug.assert_called_once_with("Attempting to initialize Chrome driver with system Chrome")
+        mock_debug.assert_called_once_with("Attempting to initialize %s driver with %s", "Chrome", "system Chrome")
         mock_info.assert_called_once_with("Successfully initialized Chrome driver with system Chrome")
         mock_warning.assert_not_called()
         mock_error.assert_not_called()
@@ -154,6 +188,34 @@ class TestChromeDriverInitialization:
         # Verify the driver was returned
         assert driver is mock_chrome_instance
 
+    def test_chrome_from_system_uses_driver_on_path(self):
+        """Test that a chromedriver on PATH is handed to Selenium directly."""
+        with patch('selenium.webdriver.Chrome') as mock_chrome, \
+             patch('selenium.webdriver.chrome.service.Service') as mock_service, \
+             patch.object(browser_manager, '_chromedriver_on_path', return_value="/opt/bin/chromedriver"):
+            driver = BrowserManager()._chrome_from_system("options")
+        
+        mock_service.assert_called_once_with(executable_path="/opt/bin/chromedriver")
+        mock_chrome.assert_called_once_with(service=mock_service.return_value, options="options")
+        assert driver is mock_chrome.return_value
+
+    def test_winning_strategy_is_tried_first(self):
+        """Test that the strategy that worked last time is tried before the others."""
+        manager = BrowserManager()
+        options = MagicMock()
+        mock_driver = MagicMock()
+        
+        with patch.object(manager, '_chrome_from_system', side_effect=Exception("no driver")) as mock_system, \
+             patch.object(manager, '_chrome_with_manager', return_value=mock_driver) as mock_manager:
+            assert manager._initialize_chrome_driver(options) is mock_driver
+            assert mock_system.call_count == 1
+            
+            # The next start goes straight to the method that worked
+            browser_manager._winning_strategies.cache_clear()
+            assert manager._initialize_chrome_driver(options) is mock_driver
+            assert mock_system.call_count == 1
+            assert mock_manager.call_count == 2
+
     def test_simple_alternative_initialization(self):
         """Test a simplified version of fallback initialization."""
         # Create a simpler test to verify the core concept
@@ -165,7 +227,8 @@ class TestChromeDriverInitialization:
         # the code still returns a valid driver
         
         # Apply patches in a specific way to test fallback
-        with patch.object(BrowserManager, '_initialize_chrome_driver') as mock_init:
+        with patch.object(BrowserManager, '_initialize_chrome_driver') as mock_init, \
+             patch.object(BrowserManager, '_set_initial_cookies'):
             mock_init.return_value = MagicMock()  # Successfully initialize a driver
             
             # Call the method 
@@ -184,14 +247,118 @@ class TestCookieHandling:
     def test_set_initial_cookies(self, mock_warning, mock_debug, mock_sleep):
         """Test setting initial cookies."""
         mock_driver = MagicMock()
+        mock_driver.execute_script.return_value = "complete"
         
         manager = BrowserManager()
         manager.driver = mock_driver
         manager._set_initial_cookies()
         
-        # Verify driver navigated to base URL
-        mock_driver.get.assert_called_once_with(manager.base_url)
-        mock_sleep.assert_called_once_with(2)
+        # Verify no page was loaded just to seat the cookies
+        mock_driver.get.assert_not_called()
+        mock_sleep.assert_not_called()
+        
+        # Verify all cookies were installed in one CDP call
+        mock_driver.execute_cdp_cmd.assert_called_once_with("Network.setCookies", {"cookies": [
+            {'name': 'cookie-policy-accepted', 'value': 'true', 'domain': '.hotmart.com', 'path': '/'},
+            {'name': 'cookie-policy-preferences', 'value': 'true', 'domain': '.hotmart.com', 'path': '/'},
+            {'name': 'hotmart-cookie-policy', 'value': 'accepted', 'domain': '.hotmart.com', 'path': '/'}
+        ]})
+        mock_driver.add_cookie.assert_not_called()
+        mock_warning.assert_not_called()
+
+    @patch('logger.debug')
+    @patch('logger.warning')
+    def test_set_initial_cookies_restores_cached_cookies(self, mock_warning, mock_debug, mock_sleep):
+        """Test that cookies from the last session are installed without loading a page."""
+        with open(browser_manager.COOKIE_CACHE, 'w') as f:
+            json.dump([
+                {'name': 'session', 'value': 'abc', 'domain': '.hotmart.com', 'path': '/',
+                 'secure': True, 'httpOnly': True, 'expiry': 4102444800},
+                {'name': 'stale', 'value': 'old', 'domain': '.hotmart.com', 'expiry': 1}
+            ], f)
+        mock_driver = MagicMock()
+        
+        manager = BrowserManager()
+        manager.driver = mock_driver
+        manager._set_initial_cookies()
+        
+        mock_driver.get.assert_not_called()
+        mock_driver.execute_cdp_cmd.assert_called_once_with("Network.setCookies", {"cookies": [
+            {'name': 'session', 'value': 'abc', 'domain': '.hotmart.com', 'path': '/',
+             'secure': True, 'httpOnly': True, 'expires': 4102444800},
+            *browser_manager.INITIAL_CDP_COOKIES
+        ]})
+        mock_warning.assert_not_called()
+
+    @patch('logger.debug')
+    def test_set_initial_cookies_skipped_for_recent_profile(self, mock_debug, mock_sleep, tmp_path):
+        """Test that a persistent profile with a fresh cookie store needs no initial cookies."""
+        cookies_file = tmp_path / "Default" / "Network" / "Cookies"
+        cookies_file.parent.mkdir(parents=True)
+        cookies_file.write_bytes(b"")
+        mock_driver = MagicMock()
+        
+        manager = BrowserManager(user_data_dir=str(tmp_path))
+        manager.driver = mock_driver
+        manager._set_initial_cookies()
+        
+        mock_driver.get.assert_not_called()
+        mock_driver.execute_cdp_cmd.assert_not_called()
+        mock_debug.assert_called_once_with("Profile already has recent cookies, skipping initial cookies")
+
+    def test_has_saved_session(self, mock_sleep):
+        """Test detecting cookies that may survive from an earlier run."""
+        assert BrowserManager().has_saved_session() is False
+        assert BrowserManager(browser_profile="/path/to/profile").has_saved_session() is True
+        
+        with open(browser_manager.COOKIE_CACHE, 'w') as f:
+            json.dump([], f)
+        assert BrowserManager().has_saved_session() is True
+
+    def test_save_session(self, mock_sleep, tmp_path):
+        """Test that cookies are saved for the next run unless the profile keeps them."""
+        manager = BrowserManager(user_data_dir=str(tmp_path))
+        manager.driver = MagicMock()
+        manager.driver.get_cookies.return_value = [{'name': 'session', 'value': 'abc'}]
+        
+        manager.save_session()
+        assert not os.path.exists(browser_manager.COOKIE_CACHE)
+        
+        manager.user_data_dir = None
+        manager.save_session()
+        with open(browser_manager.COOKIE_CACHE) as f:
+            assert json.load(f) == [{'name': 'session', 'value': 'abc'}]
+
+    def test_add_cookies(self, mock_sleep):
+        """Test sharing cookies from another browser in one CDP call."""
+        mock_driver = MagicMock()
+        manager = BrowserManager()
+        manager.driver = mock_driver
+        
+        manager.add_cookies([{'name': 'session', 'value': 'abc', 'domain': '.hotmart.com', 'path': '/', 'expiry': 123}])
+        
+        mock_driver.execute_cdp_cmd.assert_called_once_with("Network.setCookies", {"cookies": [
+            {'name': 'session', 'value': 'abc', 'domain': '.hotmart.com', 'path': '/', 'expires': 123}
+        ]})
+        mock_driver.get.assert_not_called()
+        mock_driver.add_cookie.assert_not_called()
+
+    @patch('logger.debug')
+    @patch('logger.warning')
+    def test_set_initial_cookies_without_cdp(self, mock_warning, mock_debug, mock_sleep):
+        """Test falling back to WebDriver cookies when CDP isn't available."""
+        mock_driver = MagicMock()
+        mock_driver.execute_script.return_value = "complete"
+        mock_driver.execute_cdp_cmd.side_effect = Exception("CDP unavailable")
+        
+        manager = BrowserManager()
+        manager.driver = mock_driver
+        manager._set_initial_cookies()
+        
+        # Verify driver navigated to a lightweight page on the site instead of sleeping
+        mock_driver.get.assert_called_once_with(f"{manager.base_url}/robots.txt")
+        mock_driver.execute_script.assert_not_called()
+        mock_sleep.assert_not_called()
         
         # Verify cookies were added
         assert mock_driver.add_cookie.call_count == 3
@@ -205,19 +372,35 @@ class TestCookieHandling:
         assert mock_debug.call_count >= 4  # Initial debug message + one for each cookie
         mock_warning.assert_not_called()
 
+    @patch('logger.debug')
+    @patch('logger.warning')
+    def test_set_initial_cookies_firefox(self, mock_warning, mock_debug, mock_sleep):
+        """Test that drivers without CDP support add cookies one by one."""
+        mock_driver = MagicMock(spec=['get', 'execute_script', 'add_cookie'])
+        mock_driver.execute_script.return_value = "complete"
+        
+        manager = BrowserManager(browser_type="firefox")
+        manager.driver = mock_driver
+        manager._set_initial_cookies()
+        
+        assert mock_driver.add_cookie.call_count == 3
+        mock_warning.assert_not_called()
+
     @patch('logger.debug')
     @patch('logger.warning')
     def test_set_initial_cookies_add_cookie_fails(self, mock_warning, mock_debug, mock_sleep):
         """Test handling when adding cookies fails."""
         mock_driver = MagicMock()
+        mock_driver.execute_script.return_value = "complete"
+        mock_driver.execute_cdp_cmd.side_effect = Exception("CDP unavailable")
         mock_driver.add_cookie.side_effect = Exception("Cookie error")
         
         manager = BrowserManager()
         manager.driver = mock_driver
         manager._set_initial_cookies()
         
-        # Verify driver navigated to base URL
-        mock_driver.get.assert_called_once_with(manager.base_url)
+        # Verify driver navigated to a page on the site
+        mock_driver.get.assert_called_once_with(f"{manager.base_url}/robots.txt")
         
         # Verify attempt to add cookies was made
         assert mock_driver.add_cookie.call_count == 3
@@ -230,6 +413,7 @@ class TestCookieHandling:
     def test_set_initial_cookies_navigation_fails(self, mock_warning, mock_debug, mock_sleep):
         """Test handling when navigation fails."""
         mock_driver = MagicMock()
+        mock_driver.execute_cdp_cmd.side_effect = Exception("CDP unavailable")
         mock_driver.get.side_effect = Exception("Navigation error")
         
         manager = BrowserManager()
@@ -237,7 +421,7 @@ class TestCookieHandling:
         manager._set_initial_cookies()
         
         # Verify attempt to navigate was made
-        mock_driver.get.assert_called_once_with(manager.base_url)
+        mock_driver.get.assert_called_once_with(f"{manager.base_url}/robots.txt")
         
         # Verify no cookies were added
         mock_driver.add_cookie.assert_not_called()
@@ -249,207 +433,158 @@ class TestCookieHandling:
 class TestCookiePolicyPopup:
     """Tests for cookie policy popup handling."""
 
-    @patch('time.sleep')
     @patch('logger.debug')
     @patch('logger.info')
     @patch('logger.warning')
-    def test_handle_cookie_policy_popup_found_by_id(self, mock_warning, mock_info, 
-                                                    mock_debug, mock_sleep):
-        """Test handling cookie policy popup when found by ID."""
+    def test_handle_cookie_policy_popup_found_by_id(self, mock_warning, mock_info, mock_debug):
+        """Test handling cookie policy popup when the script finds the Hotmart container."""
         mock_driver = MagicMock()
-        mock_cookie_container = MagicMock()
-        mock_cookie_container.is_displayed.return_value = True
-        mock_driver.find_element.return_value = mock_cookie_container
-        
-        # Set up a successful button click
-        accept_button = MagicMock()
-        accept_button.is_displayed.return_value = True
-        mock_cookie_container.find_element.return_value = accept_button
+        mock_driver.execute_async_script.return_value = {'handled': True, 'via': 'id', 'dismissed': True}
         
         manager = BrowserManager()
         manager.driver = mock_driver
         result = manager.handle_cookie_policy_popup()
         
-        # Verify we looked for the cookie policy container by ID
-        mock_driver.find_element.assert_called_with(By.ID, "hotmart-cookie-policy")
-        
-        # Verify we checked if it's displayed
-        mock_cookie_container.is_displayed.assert_called_once()
-        
-        # Verify we tried to find an accept button
-        mock_cookie_container.find_element.assert_called()
-        
-        # Verify we attempted to click the button
-        assert mock_driver.execute_script.call_count == 1
-        
-        # Verify we logged the success - can be called multiple times now
-        assert mock_info.call_count >= 1
+        # Detection and clicking happen in a single round-trip
+        mock_driver.execute_async_script.assert_called_once_with(
+            browser_manager.COOKIE_POPUP_SCRIPT, browser_manager.COOKIE_CONTAINER_SELECTORS,
+            browser_manager.ACCEPT_BUTTON_SELECTORS, browser_manager.COOKIE_TEXT_XPATH, 3000
+        )
+        mock_driver.find_element.assert_not_called()
+        mock_driver.find_elements.assert_not_called()
+        mock_info.assert_called_with("Handled cookie policy popup via id")
         mock_warning.assert_not_called()
-        
-        # Verify the result
         assert result is True
-        
-    @patch('time.sleep')
+
     @patch('logger.debug')
     @patch('logger.info')
     @patch('logger.warning')
-    def test_handle_cookie_policy_popup_found_by_selector(self, mock_warning, mock_info, 
-                                                          mock_debug, mock_sleep):
-        """Test handling cookie policy popup when found by CSS selector."""
+    def test_handle_cookie_policy_popup_not_dismissed(self, mock_warning, mock_info, mock_debug):
+        """Test that a clicked popup that stays visible still counts as handled."""
         mock_driver = MagicMock()
-        
-        # First find_element call fails (ID lookup)
-        mock_driver.find_element.side_effect = [Exception("Not found by ID")]
-        
-        # Mock find_elements to return empty list for XPATH lookups
-        mock_driver.find_elements.return_value = []
-        
-        # For find_element by tag_name to get body text
-        mock_body = MagicMock()
-        mock_body.text = "Some page content without cookie text"
-        
-        # Then we try CSS selectors
-        def find_element_side_effect(by, selector):
-            if by == By.ID:
-                raise Exception("Not found by ID")
-            elif by == By.TAG_NAME and selector == "body":
-                return mock_body
-            elif by == By.CSS_SELECTOR:
-                if selector == ".cookie-notice":
-                    cookie_element = MagicMock()
-                    cookie_element.is_displayed.return_value = True
-                    return cookie_element
-                elif selector == "button.accept-button":
-                    accept_button = MagicMock()
-                    accept_button.is_displayed.return_value = True
-                    return accept_button
-            raise Exception(f"Element not found: {selector}")
-            
-        mock_driver.find_element.side_effect = find_element_side_effect
+        mock_driver.execute_async_script.return_value = {'handled': True, 'via': 'cookie-text', 'dismissed': False}
         
         manager = BrowserManager()
         manager.driver = mock_driver
-        result = manager.handle_cookie_policy_popup()
+        result = manager.handle_cookie_policy_popup(timeout=1)
         
-        # With our new implementation, several XPATH searches will happen first
-        # We're more interested in whether it eventually tries CSS selectors
-        assert mock_driver.find_element.call_count >= 3
-        assert call(By.ID, "hotmart-cookie-policy") in mock_driver.find_element.call_args_list
-        # Eventually it will try CSS selectors
-        assert call(By.CSS_SELECTOR, ".cookie-notice") in mock_driver.find_element.call_args_list
-        
-        # Verify we attempted to click the button
-        assert mock_driver.execute_script.call_count == 1
-        
-        # Verify the result
+        mock_driver.execute_async_script.assert_called_once_with(
+            browser_manager.COOKIE_POPUP_SCRIPT, browser_manager.COOKIE_CONTAINER_SELECTORS,
+            browser_manager.ACCEPT_BUTTON_SELECTORS, browser_manager.COOKIE_TEXT_XPATH, 1000
+        )
+        mock_info.assert_called_with("Handled cookie policy popup via cookie-text (still visible)")
         assert result is True
 
-    @patch('time.sleep')
     @patch('logger.debug')
     @patch('logger.info')
     @patch('logger.warning')
-    def test_handle_cookie_policy_popup_not_found(self, mock_warning, mock_info, mock_debug, mock_sleep):
+    def test_handle_cookie_policy_popup_not_found(self, mock_warning, mock_info, mock_debug):
         """Test handling when cookie policy popup is not found."""
         mock_driver = MagicMock()
-        
-        # All find_element calls fail
-        mock_driver.find_element.side_effect = Exception("Not found")
-        
-        # XPATH searches find nothing
-        mock_driver.find_elements.return_value = []
-        
-        # JavaScript approach returns False
-        mock_driver.execute_script.return_value = False
+        mock_driver.execute_async_script.return_value = {
+            'handled': False,
+            'snippet': 'This site uses cookies',
+            'hasCookieText': True
+        }
         
         manager = BrowserManager()
         manager.driver = mock_driver
         result = manager.handle_cookie_policy_popup()
         
-        # Verify we tried the JavaScript approach as last resort
-        assert mock_driver.execute_script.call_count >= 1
-        
-        # Verify the result
         assert result is False
+        mock_debug.assert_any_call("Page content snippet: %s", "This site uses cookies")
+        mock_info.assert_called_with("Cookie text found in page body but no accept button matched")
+        mock_driver.find_element.assert_not_called()
+        mock_warning.assert_not_called()
+
+    def test_handle_cookie_policy_popup_uses_installed_script(self):
+        """Test that a page with the installed popup script only gets the short call."""
+        mock_driver = MagicMock()
+        mock_driver.execute_async_script.return_value = {'handled': True, 'via': 'id', 'dismissed': True}
+        
+        with patch.object(BrowserManager, '_pools', {}), \
+             patch.object(BrowserManager, '_create_driver', return_value=mock_driver), \
+             patch.object(BrowserManager, '_set_initial_cookies'):
+            manager = BrowserManager()
+            manager.initialize()
+        
+        mock_driver.execute_cdp_cmd.assert_called_once_with(
+            "Page.addScriptToEvaluateOnNewDocument", {"source": browser_manager.COOKIE_POPUP_PAGE_SCRIPT}
+        )
+        assert manager.handle_cookie_policy_popup() is True
+        mock_driver.execute_async_script.assert_called_once_with(
+            browser_manager.COOKIE_POPUP_CALL_SCRIPT, browser_manager.COOKIE_CONTAINER_SELECTORS,
+            browser_manager.ACCEPT_BUTTON_SELECTORS, browser_manager.COOKIE_TEXT_XPATH, 3000
+        )
+
+    def test_page_scripts_installed_once_per_pooled_driver(self):
+        """Test that reusing a pooled driver doesn't register the popup script again."""
+        mock_driver = MagicMock()
+        mock_driver.execute_cdp_cmd.return_value = {'identifier': '1'}
+        
+        with patch.object(BrowserManager, '_pools', {}), \
+             patch.object(BrowserManager, '_create_driver', return_value=mock_driver), \
+             patch.object(BrowserManager, '_set_initial_cookies'):
+            first = BrowserManager()
+            first.initialize()
+            first.release()
+            second = BrowserManager()
+            assert second.initialize() is mock_driver
+        
+        mock_driver.execute_cdp_cmd.assert_called_once_with(
+            "Page.addScriptToEvaluateOnNewDocument", {"source": browser_manager.COOKIE_POPUP_PAGE_SCRIPT}
+        )
+        assert mock_driver._page_script_id == '1'
+        assert second._page_scripts_installed is True
+
+    def test_handle_cookie_policy_popup_script_not_installed(self):
+        """Test that a page loaded before the script was installed gets the full script."""
+        mock_driver = MagicMock()
+        mock_driver.execute_async_script.side_effect = [{'missing': True}, {'handled': False}]
+        
+        manager = BrowserManager()
+        manager.driver = mock_driver
+        manager._page_scripts_installed = True
         
-    @patch('time.sleep')
+        assert manager.handle_cookie_policy_popup() is False
+        assert [c.args[0] for c in mock_driver.execute_async_script.call_args_list] == [
+            browser_manager.COOKIE_POPUP_CALL_SCRIPT, browser_manager.COOKIE_POPUP_SCRIPT
+        ]
+
     @patch('logger.debug')
     @patch('logger.info')
     @patch('logger.warning')
-    def test_handle_cookie_policy_popup_with_this_site_uses_cookies(self, mock_warning, mock_info, 
-                                                                  mock_debug, mock_sleep):
-        """Test handling cookie policy popup with 'This site uses cookies' text."""
+    def test_handle_cookie_policy_popup_already_accepted(self, mock_warning, mock_info, mock_debug):
+        """Test that the popup scan is skipped when the acceptance cookie is set."""
         mock_driver = MagicMock()
-        
-        # First lookup fails
-        mock_driver.find_element.side_effect = [Exception("Not found by ID")]
-        
-        # Cookie text elements found
-        cookie_text_element = MagicMock()
-        cookie_text_element.is_displayed.return_value = True
-        mock_driver.find_elements.return_value = [cookie_text_element]
-        
-        # Dialog container found
-        dialog_container = MagicMock()
-        dialog_container.is_displayed.return_value = True
-        cookie_text_element.find_element.return_value = dialog_container
-        
-        # OK button found
-        ok_button = MagicMock()
-        ok_button.is_displayed.return_value = True
-        dialog_container.find_elements.return_value = [ok_button]
+        mock_driver.get_cookies.return_value = [
+            {'name': 'session', 'value': 'abc'},
+            {'name': 'cookie-policy-accepted', 'value': 'true', 'domain': '.hotmart.com'}
+        ]
         
         manager = BrowserManager()
         manager.driver = mock_driver
         result = manager.handle_cookie_policy_popup()
         
-        # Verify we looked for elements with 'This site uses cookies' text
-        assert mock_driver.find_elements.call_count >= 1
-        
-        # Verify we attempted to click the OK button
-        assert mock_driver.execute_script.call_count == 1
-        
-        # Verify the result
         assert result is True
-        
-    @patch('time.sleep')
+        mock_driver.execute_async_script.assert_not_called()
+        mock_info.assert_not_called()
+        mock_debug.assert_called_once_with("Cookie policy already accepted, skipping popup check")
+
     @patch('logger.debug')
     @patch('logger.info')
     @patch('logger.warning')
-    def test_handle_cookie_policy_popup_javascript_approach(self, mock_warning, mock_info, 
-                                                          mock_debug, mock_sleep):
-        """Test handling cookie policy popup with JavaScript approach when text is in body."""
+    def test_handle_cookie_policy_popup_script_error(self, mock_warning, mock_info, mock_debug):
+        """Test that a failing script is logged and reported as unhandled."""
         mock_driver = MagicMock()
-        
-        # All element lookups fail
-        mock_driver.find_element.side_effect = Exception("Not found")
-        mock_driver.find_elements.return_value = []
-        
-        # But we find body text with cookie message
-        mock_body = MagicMock()
-        mock_body.text = "This site uses cookies\nCookies are important for this site..."
-        
-        def find_element_side_effect(by, selector):
-            if by == By.TAG_NAME and selector == "body":
-                return mock_body
-            raise Exception(f"Element not found: {selector}")
-            
-        mock_driver.find_element.side_effect = find_element_side_effect
-        
-        # JavaScript finds and clicks OK button
-        mock_driver.execute_script.return_value = True
+        mock_driver.execute_async_script.side_effect = WebDriverException("script timeout")
         
         manager = BrowserManager()
         manager.driver = mock_driver
         result = manager.handle_cookie_policy_popup()
         
-        # Verify we tried to get body text to check for cookie message
-        assert call(By.TAG_NAME, "body") in mock_driver.find_element.call_args_list
-        
-        # Verify we used JavaScript to find and click OK button
-        assert mock_driver.execute_script.call_count == 1
-        
-        # Verify the result
-        assert result is True
+        assert result is False
+        mock_warning.assert_called_once()
 
 
 class TestWaitForElement:
@@ -466,7 +601,7 @@ class TestWaitForElement:
         mock_wait.until.return_value = mock_element
         
         # Patch WebDriverWait to return our mock
-        with patch.object(WebDriverWait, '__new__', return_value=mock_wait):
+        with patch('selenium.webdriver.support.ui.WebDriverWait', return_value=mock_wait):
             # Patch EC.presence_of_element_located
             with patch.object(EC, 'presence_of_element_located') as mock_condition:
                 # Call the method being tested
@@ -492,7 +627,7 @@ class TestWaitForElement:
         mock_wait.until.return_value = mock_element
         
         # Patch WebDriverWait to return our mock
-        with patch.object(WebDriverWait, '__new__', return_value=mock_wait):
+        with patch('selenium.webdriver.support.ui.WebDriverWait', return_value=mock_wait):
             # Patch EC.visibility_of_element_located
             with patch.object(EC, 'visibility_of_element_located') as mock_condition:
                 # Call the method being tested
@@ -518,7 +653,7 @@ class TestWaitForElement:
         mock_wait.until.return_value = mock_element
         
         # Patch WebDriverWait to return our mock
-        with patch.object(WebDriverWait, '__new__', return_value=mock_wait):
+        with patch('selenium.webdriver.support.ui.WebDriverWait', return_value=mock_wait):
             # Patch EC.element_to_be_clickable
             with patch.object(EC, 'element_to_be_clickable') as mock_condition:
                 # Call the method being tested
@@ -543,7 +678,7 @@ class TestWaitForElement:
         mock_wait.until.side_effect = TimeoutException("Timed out")
         
         # Patch WebDriverWait to return our mock
-        with patch.object(WebDriverWait, '__new__', return_value=mock_wait):
+        with patch('selenium.webdriver.support.ui.WebDriverWait', return_value=mock_wait):
             # Patch EC.presence_of_element_located
             with patch.object(EC, 'presence_of_element_located'):
                 # Patch logger.warning
@@ -557,6 +692,116 @@ class TestWaitForElement:
                     # Verify the result is None on timeout
                     assert result is None
 
+    def test_simple_visible_elements_wait(self):
+        """Test wait_for_elements with visible condition."""
+        manager = BrowserManager()
+        manager.driver = MagicMock()
+        
+        mock_wait = MagicMock()
+        mock_elements = [MagicMock(), MagicMock()]
+        mock_wait.until.return_value = mock_elements
+        
+        with patch('selenium.webdriver.support.ui.WebDriverWait', return_value=mock_wait):
+            with patch.object(EC, 'visibility_of_all_elements_located') as mock_condition:
+                result = manager.wait_for_elements(By.CSS_SELECTOR, ".lesson", condition="visible")
+                
+                mock_condition.assert_called_once_with((By.CSS_SELECTOR, ".lesson"))
+                mock_wait.until.assert_called_once_with(mock_condition.return_value)
+                assert result == mock_elements
+
+    def test_wait_for_ready(self):
+        """Test waiting for the page's readyState instead of sleeping."""
+        manager = BrowserManager()
+        manager.driver = MagicMock()
+        manager.driver.execute_script.return_value = "complete"
+        
+        with patch.object(manager, '_wait') as mock_wait:
+            mock_wait.return_value.until.side_effect = lambda condition: condition(manager.driver)
+            assert manager.wait_for_ready(timeout=7) is True
+        
+        mock_wait.assert_called_once_with(7)
+        manager.driver.execute_script.assert_called_once_with("return document.readyState")
+
+    def test_wait_for_ready_timeout(self):
+        """Test that a page that never finishes loading returns False."""
+        manager = BrowserManager()
+        manager.driver = MagicMock()
+        
+        with patch.object(manager, '_wait') as mock_wait:
+            mock_wait.return_value.until.side_effect = TimeoutException("Timed out")
+            assert manager.wait_for_ready() is False
+
+    def test_implicit_wait_is_reset(self):
+        """Test that the implicit wait only applies inside the with block."""
+        mock_driver = MagicMock()
+        manager = BrowserManager()
+        manager.driver = mock_driver
+        
+        with pytest.raises(ValueError):
+            with manager.implicit_wait(10) as driver:
+                assert driver is mock_driver
+                raise ValueError("lookup failed")
+        
+        assert mock_driver.implicitly_wait.call_args_list == [call(10), call(0)]
+
+    def test_wait_reused_per_timeout(self):
+        """Test that a WebDriverWait is reused per timeout until the driver changes."""
+        manager = BrowserManager()
+        manager.driver = MagicMock()
+        
+        with patch('selenium.webdriver.support.ui.WebDriverWait',
+                   side_effect=lambda *args, **kwargs: MagicMock()) as mock_wait_class:
+            first = manager._wait(10)
+            assert manager._wait(10) is first
+            assert manager._wait(5) is not first
+            mock_wait_class.assert_any_call(manager.driver, 10, poll_frequency=browser_manager.WAIT_POLL_FREQUENCY)
+            
+            manager.driver = MagicMock()
+            assert manager._wait(10) is not first
+            assert mock_wait_class.call_count == 3
+
+
+class TestFusedWait:
+    """Tests for waiting for elements inside the page."""
+
+    def test_fused_wait_single_round_trip(self):
+        """Test that the fused wait hands the condition to one async script call."""
+        manager = BrowserManager()
+        manager.driver = MagicMock()
+        mock_element = MagicMock()
+        manager.driver.execute_async_script.return_value = mock_element
+        
+        result = manager.wait_for_element_fused(By.CSS_SELECTOR, "button.login", timeout=5, condition="clickable")
+        
+        assert result is mock_element
+        manager.driver.execute_async_script.assert_called_once_with(
+            browser_manager.WAIT_FOR_ELEMENT_SCRIPT, By.CSS_SELECTOR, "button.login", "clickable", 5000
+        )
+
+    def test_fused_wait_timeout(self):
+        """Test that a timed out fused wait logs a warning and returns None."""
+        manager = BrowserManager()
+        manager.driver = MagicMock()
+        manager.driver.execute_async_script.return_value = None
+        
+        with patch('logger.warning') as mock_warning:
+            result = manager.wait_for_element_fused(By.ID, "missing")
+        
+        assert result is None
+        mock_warning.assert_called_once_with("Timeout waiting for element: missing (condition: presence)")
+
+    def test_fused_wait_falls_back_for_link_text(self):
+        """Test that locators the script can't resolve use wait_for_element."""
+        manager = BrowserManager()
+        manager.driver = MagicMock()
+        
+        with patch.object(manager, 'wait_for_element') as mock_wait:
+            result = manager.wait_for_element_fused(By.LINK_TEXT, "Login", timeout=3)
+        
+        mock_wait.assert_called_once_with(By.LINK_TEXT, "Login", 3, "presence")
+        assert result is mock_wait.return_value
+        manager.driver.execute_async_script.assert_not_called()
+
 
 class TestJavaScriptExecution:
     """Tests for JavaScript execution."""
@@ -597,6 +842,32 @@ class TestJavaScriptExecution:
         assert result is None
 
 
+class TestVisibleElements:
+    """Tests for batched visibility filtering."""
+
+    def test_visible_elements_single_round_trip(self):
+        """Test that visibility is checked for all elements in one script call."""
+        mock_driver = MagicMock()
+        visible, hidden = MagicMock(), MagicMock()
+        mock_driver.execute_script.return_value = [visible]
+        
+        manager = BrowserManager()
+        manager.driver = mock_driver
+        result = manager.visible_elements([visible, hidden])
+        
+        assert result == [visible]
+        mock_driver.execute_script.assert_called_once_with(browser_manager.VISIBLE_ELEMENTS_SCRIPT, [visible, hidden])
+        visible.is_displayed.assert_not_called()
+
+    def test_visible_elements_empty(self):
+        """Test that an empty list doesn't touch the browser."""
+        manager = BrowserManager()
+        manager.driver = MagicMock()
+        
+        assert manager.visible_elements([]) == []
+        manager.driver.execute_script.assert_not_called()
+
+
 class TestInitializeAndClose:
     """Tests for initialize and close methods."""
 
@@ -604,6 +875,7 @@ class TestInitializeAndClose:
     def test_close_browser(self, mock_debug):
         """Test closing the browser."""
         mock_driver = MagicMock()
+        mock_driver.get_cookies.return_value = [{'name': 'session', 'value': 'abc', 'domain': '.hotmart.com'}]
         
         manager = BrowserManager()
         manager.driver = mock_driver
@@ -612,6 +884,10 @@ class TestInitializeAndClose:
         # Verify driver was quit
         mock_driver.quit.assert_called_once()
         
+        # Verify the session's cookies were kept for the next run
+        with open(browser_manager.COOKIE_CACHE) as f:
+            assert json.load(f) == [{'name': 'session', 'value': 'abc', 'domain': '.hotmart.com'}]
+        
         # Verify debug message was logged
         mock_debug.assert_called_once_with("Browser closed successfully")
 
@@ -620,6 +896,7 @@ class TestInitializeAndClose:
     def test_close_browser_error(self, mock_debug, mock_warning):
         """Test handling error when closing the browser."""
         mock_driver = MagicMock()
+        mock_driver.get_cookies.return_value = []
         mock_driver.quit.side_effect = Exception("Quit error")
         
         manager = BrowserManager()
@@ -654,4 +931,206 @@ class TestInitializeAndClose:
                     mock_driver.set_window_size.assert_called_once_with(1366, 768)
                     
                     # Verify driver was returned
-                    assert driver is mock_driver
\ No newline at end of file
+                    assert driver is mock_driver
+
+class TestBrowserPool:
+    """Tests for the warm browser pool."""
+
+    @pytest.fixture(autouse=True)
+    def empty_pool(self):
+        """Give each test an empty pool."""
+        with patch.object(BrowserManager, '_pools', {}):
+            yield
+
+    def test_release_returns_driver_for_reuse(self):
+        """Test that a released driver is reset and handed to the next manager."""
+        mock_driver = MagicMock(spec=['delete_all_cookies', 'get', 'quit', 'set_window_size'])
+        
+        manager = BrowserManager()
+        manager.driver = mock_driver
+        manager.release()
+        
+        mock_driver.delete_all_cookies.assert_called_once()
+        mock_driver.get.assert_called_once_with("about:blank")
+        mock_driver.quit.assert_not_called()
+        assert manager.driver is None
+        
+        with patch.object(BrowserManager, '_create_driver') as mock_create, \
+             patch.object(BrowserManager, '_set_initial_cookies'):
+            driver = BrowserManager().initialize()
+        
+        mock_create.assert_not_called()
+        assert driver is mock_driver
+
+    def test_release_quits_worn_out_driver(self):
+        """Test that a driver past its use limit is quit instead of pooled."""
+        mock_driver = MagicMock()
+        mock_driver._pool_uses = BrowserManager._max_uses_per_instance - 1
+        
+        manager = BrowserManager()
+        manager.driver = mock_driver
+        manager.release()
+        
+        mock_driver.quit.assert_called_once()
+        assert manager._get_pool().empty()
+
+    def test_prewarm_fills_pool(self):
+        """Test that prewarm starts drivers and parks them in the pool up to its size."""
+        with patch.object(BrowserManager, '_create_driver', side_effect=lambda: MagicMock()):
+            added = BrowserManager.prewarm(3, headless=True)
+        
+        assert added == BrowserManager._pool_size
+        assert BrowserManager(headless=True)._get_pool().qsize() == BrowserManager._pool_size
+        assert BrowserManager()._get_pool().empty()
+
+
+    def test_acquire_waits_for_released_driver(self):
+        """Test that acquire takes a driver released by another thread instead of starting one."""
+        mock_driver = MagicMock(spec=['delete_all_cookies', 'get', 'quit', 'set_window_size'])
+        
+        def release_later():
+            time.sleep(0.05)
+            BrowserManager()._get_pool().put_nowait(mock_driver)
+        
+        with patch.object(BrowserManager, '_create_driver') as mock_create, \
+             patch.object(BrowserManager, '_set_initial_cookies'):
+            releaser = threading.Thread(target=release_later)
+            releaser.start()
+            manager = BrowserManager()
+            with manager.acquire(timeout=5) as driver:
+                assert driver is mock_driver
+            releaser.join()
+        
+        mock_create.assert_not_called()
+        mock_driver.delete_all_cookies.assert_called_once()
+        assert manager.driver is None
+        assert manager._get_pool().get_nowait() is mock_driver
+
+    def test_shutdown_pools_quits_idle_drivers(self):
+        """Test that shutting down quits every pooled driver."""
+        drivers = [MagicMock(), MagicMock()]
+        BrowserManager()._get_pool().put_nowait(drivers[0])
+        BrowserManager(headless=True)._get_pool().put_nowait(drivers[1])
+        
+        assert BrowserManager.shutdown_pools() == 2
+        
+        for driver in drivers:
+            driver.quit.assert_called_once()
+        assert BrowserManager()._get_pool().empty()
+
+
+class TestSharedBrowser:
+    """Tests for attaching to a shared Chrome over CDP."""
+
+    def test_configure_chrome_options_attach(self):
+        """Test that attaching only sets the debugger address."""
+        manager = BrowserManager(cdp_endpoint="127.0.0.1:9222")
+        options = manager._configure_chrome_options()
+        
+        assert options.experimental_options["debuggerAddress"] == "127.0.0.1:9222"
+        assert "--start-maximized" not in options.arguments
+
+    def test_initialize_attach_opens_isolated_tab(self):
+        """Test that an attached manager works in its own browser context and tab."""
+        mock_driver = MagicMock()
+        mock_driver.execute_cdp_cmd.side_effect = [
+            {"browserContextId": "ctx-1"},
+            {"targetId": "tab-1"}
+        ]
+        
+        with patch.object(BrowserManager, '_pools', {}), \
+             patch.object(BrowserManager, '_initialize_chrome_driver', return_value=mock_driver), \
+             patch.object(BrowserManager, '_set_initial_cookies'):
+            manager = BrowserManager(cdp_endpoint="127.0.0.1:9222")
+            manager.initialize()
+        
+        mock_driver.execute_cdp_cmd.assert_has_calls([
+            call("Target.createBrowserContext", {}),
+            call("Target.createTarget", {"url": "about:blank", "browserContextId": "ctx-1"})
+        ])
+        mock_driver.switch_to.window.assert_called_once_with("tab-1")
+
+    def test_close_attach_keeps_shared_browser(self):
+        """Test that closing an attached manager disposes its tab instead of quitting."""
+        mock_driver = MagicMock()
+        manager = BrowserManager(cdp_endpoint="127.0.0.1:9222")
+        manager.driver = mock_driver
+        manager._cdp_context_id = "ctx-1"
+        manager._cdp_target_id = "tab-1"
+        
+        manager.close()
+        
+        mock_driver.execute_cdp_cmd.assert_has_calls([
+            call("Target.closeTarget", {"targetId": "tab-1"}),
+            call("Target.disposeBrowserContext", {"browserContextId": "ctx-1"})
+        ])
+        mock_driver.service.stop.assert_called_once()
+        mock_driver.quit.assert_not_called()
+
+
+class TestDriverPathCache:
+    """Tests for the on-disk driver path cache."""
+
+    def test_cached_driver_path_resolves_once(self, tmp_path):
+        """Test that a resolved driver path is stored and reused while the binary exists."""
+        driver_binary = tmp_path / "chromedriver"
+        driver_binary.write_text("")
+        driver_binary.chmod(0o755)
+        resolve = MagicMock(return_value=str(driver_binary))
+        
+        with patch.object(browser_manager, 'DRIVER_PATH_CACHE', str(tmp_path / "cache" / "driver_paths.json")):
+            first = browser_manager._cached_driver_path("chromedriver", resolve)
+            second = browser_manager._cached_driver_path("chromedriver", resolve)
+        
+        assert first == second == str(driver_binary)
+        resolve.assert_called_once()
+
+    def test_cached_driver_path_ignores_missing_binary(self, tmp_path):
+        """Test that a cached path whose binary was removed is resolved again."""
+        resolve = MagicMock(side_effect=[str(tmp_path / "old"), str(tmp_path / "new")])
+        
+        with patch.object(browser_manager, 'DRIVER_PATH_CACHE', str(tmp_path / "driver_paths.json")):
+            browser_manager._cached_driver_path("geckodriver", resolve)
+            path = browser_manager._cached_driver_path("geckodriver", resolve)
+        
+        assert path == str(tmp_path / "new")
+        assert resolve.call_count == 2
+
+    def test_cached_driver_path_ignores_non_executable_binary(self, tmp_path):
+        """Test that a cached path that can't be executed is resolved again."""
+        driver_binary = tmp_path / "chromedriver"
+        driver_binary.write_text("")
+        driver_binary.chmod(0o644)
+        resolve = MagicMock(return_value=str(driver_binary))
+        
+        browser_manager._cached_driver_path("chromedriver", resolve)
+        browser_manager._cached_driver_path("chromedriver", resolve)
+        
+        assert resolve.call_count == 2
+
+    def test_chrome_with_manager_refreshes_stale_driver(self):
+        """Test that a cached chromedriver that fails to start is replaced by a fresh install."""
+        mock_driver = MagicMock()
+        mock_chrome = MagicMock(side_effect=[WebDriverException("version mismatch"), mock_driver])
+        
+        with patch.object(browser_manager, '_resolved_chromedriver_path', return_value="/old/chromedriver"), \
+             patch.object(browser_manager, '_cached_driver_path', return_value="/new/chromedriver") as mock_cached, \
+             patch('selenium.webdriver.Chrome', mock_chrome), \
+             patch('selenium.webdriver.chrome.service.Service') as mock_service:
+            driver = BrowserManager()._chrome_with_manager(MagicMock())
+        
+        assert driver is mock_driver
+        mock_cached.assert_called_once_with("chromedriver", browser_manager._install_chromedriver, refresh=True)
+        assert [c.kwargs['executable_path'] for c in mock_service.call_args_list] == [
+            "/old/chromedriver", "/new/chromedriver"
+        ]
+
+    def test_resolve_chromedriver_binary_from_notices(self, tmp_path):
+        """Test that a THIRD_PARTY_NOTICES path is mapped to the chromedriver binary next to it."""
+        (tmp_path / "LICENSE.chromedriver.md").write_text("")
+        (tmp_path / "chromedriver").write_text("")
+        notices = str(tmp_path / "THIRD_PARTY_NOTICES.chromedriver")
+        
+        path = browser_manager._resolve_chromedriver_binary(notices)
+        
+        assert path == str(tmp_path / "chromedriver")
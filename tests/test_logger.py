@@ -2,17 +2,30 @@
 Tests for the logger module.
 """
 import logging
+import logging.handlers
 import os
 import pytest
 from unittest.mock import patch, MagicMock
 import logger
 
 
+@pytest.fixture(autouse=True)
+def file_logging(monkeypatch, tmp_path):
+    """Allow file logging again, writing logs/ under a temporary directory."""
+    monkeypatch.delenv(logger.DISABLE_FILE_LOG_ENV, raising=False)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
 @pytest.fixture
 def cleanup_logger():
     """Fixture to reset the logger between tests."""
+    # Start from a fresh logger even if another test module already set one up
+    logger.shutdown_logger()
+    logger._logger = None
     yield
-    # Reset the global _logger variable
+    # Stop the background listener and reset the global _logger variable
+    logger.shutdown_logger()
     logger._logger = None
     # Remove any handlers from the root logger
     root_logger = logging.getLogger()
@@ -27,31 +40,48 @@ class TestLoggerSetup:
         """Test setup_logger with default parameters."""
         log = logger.setup_logger()
         assert log.level == logging.INFO
-        assert len(log.handlers) == 2  # 1 console handler, 1 file handler
-        assert isinstance(log.handlers[0], logging.StreamHandler)
-        assert isinstance(log.handlers[1], logging.FileHandler)
+        assert len(log.handlers) == 1
+        assert isinstance(log.handlers[0], logging.handlers.QueueHandler)
+        handlers = logger._listener.handlers
+        assert len(handlers) == 2  # 1 console handler, 1 file handler
+        assert isinstance(handlers[0], logging.StreamHandler)
+        assert isinstance(handlers[1], logging.FileHandler)
 
     def test_setup_logger_custom_level(self, cleanup_logger):
         """Test setup_logger with custom log level."""
         log = logger.setup_logger(level=logging.DEBUG)
         assert log.level == logging.DEBUG
+        handlers = logger._listener.handlers
         # Console handler should inherit logger level by default when console_level is None
-        assert log.handlers[0].level == logging.DEBUG  
+        assert handlers[0].level == logging.DEBUG
         # File handler should have DEBUG level
-        assert log.handlers[1].level == logging.DEBUG
+        assert handlers[1].level == logging.DEBUG
 
     def test_setup_logger_console_level(self, cleanup_logger):
         """Test setup_logger with custom console_level."""
         log = logger.setup_logger(level=logging.INFO, console_level=logging.DEBUG)
         assert log.level == logging.INFO
-        assert log.handlers[0].level == logging.DEBUG
-        assert log.handlers[1].level == logging.INFO
+        handlers = logger._listener.handlers
+        assert handlers[0].level == logging.DEBUG
+        assert handlers[1].level == logging.INFO
 
     def test_setup_logger_no_file(self, cleanup_logger):
         """Test setup_logger with log_to_file=False."""
+        logger.setup_logger(log_to_file=False)
+        handlers = logger._listener.handlers
+        assert len(handlers) == 1
+        assert isinstance(handlers[0], logging.StreamHandler)
+
+    def test_records_written_by_listener(self, cleanup_logger):
+        """Test records reach the handlers once the listener is stopped."""
         log = logger.setup_logger(log_to_file=False)
-        assert len(log.handlers) == 1
-        assert isinstance(log.handlers[0], logging.StreamHandler)
+        stream_handler = logger._listener.handlers[0]
+        with patch.object(stream_handler, 'emit') as mock_emit:
+            log.info("Queued message")
+            logger.shutdown_logger()
+        mock_emit.assert_called_once()
+        assert mock_emit.call_args[0][0].getMessage() == "Queued message"
+        assert logger._listener is None
 
     def test_get_logger_creates_logger(self, cleanup_logger):
         """Test get_logger creates a logger if none exists."""
@@ -71,6 +101,25 @@ class TestLoggerSetup:
         assert log is original_log
         assert log.level == logging.DEBUG
 
+    def test_is_enabled_for(self, cleanup_logger):
+        """Test level checks used to skip expensive debug output."""
+        logger.setup_logger(level=logging.INFO, log_to_file=False)
+        assert logger.is_enabled_for(logging.INFO)
+        assert not logger.is_enabled_for(logging.DEBUG)
+
+    def test_cached_second_formatter(self):
+        """Test the timestamp is only formatted again when the second changes."""
+        formatter = logger.CachedSecondFormatter("%(asctime)s %(message)s", datefmt="%H:%M:%S")
+        first = logging.makeLogRecord({'msg': 'first', 'created': 1000.1})
+        second = logging.makeLogRecord({'msg': 'second', 'created': 1000.9})
+        later = logging.makeLogRecord({'msg': 'later', 'created': 1001.0})
+
+        with patch.object(formatter, 'converter', wraps=formatter.converter) as mock_converter:
+            assert formatter.format(first).split()[0] == formatter.format(second).split()[0]
+            assert mock_converter.call_count == 1
+            formatter.format(later)
+            assert mock_converter.call_count == 2
+
 
 class TestLoggingFunctions:
     """Tests for logging convenience functions."""
@@ -136,13 +185,52 @@ class TestLogFileCreation:
     def test_log_file_creation(self, cleanup_logger, tmpdir):
         """Test that a log file is created in the logs directory."""
         with patch('logger.os.makedirs') as mock_makedirs:
-            with patch('logging.FileHandler') as mock_file_handler:
+            with patch('logger.BufferedFileHandler') as mock_file_handler:
                 logger.setup_logger()
-                # Verify that the logs directory is created
-                mock_makedirs.assert_called_once_with("logs", exist_ok=True)
+                # The logs directory is only created if opening the file fails
+                mock_makedirs.assert_not_called()
                 # Verify that a file handler is created
                 mock_file_handler.assert_called_once()
                 # Extract the log filename from the call arguments
                 log_file = mock_file_handler.call_args[0][0]
                 assert log_file.startswith("logs/101kg_")
-                assert log_file.endswith(".log")
\ No newline at end of file
+                assert log_file.endswith(".log")
+
+    def test_logs_directory_created_when_missing(self, cleanup_logger, file_logging):
+        """Test that the logs directory is created on demand."""
+        assert not (file_logging / "logs").exists()
+        logger.setup_logger()
+        assert (file_logging / "logs").is_dir()
+        assert isinstance(logger._listener.handlers[1], logger.BufferedFileHandler)
+
+    def test_setup_logger_writes_to_real_log_file(self, cleanup_logger, file_logging):
+        """Test that the default file logging path opens and writes a real log file."""
+        logger.setup_logger(log_to_file=True)
+        logger.warning("Written to disk")
+        logger.shutdown_logger()
+
+        log_files = list((file_logging / "logs").glob("101kg_*.log"))
+        assert len(log_files) == 1
+        assert "Written to disk" in log_files[0].read_text()
+
+    def test_file_logging_disabled_by_env(self, cleanup_logger, monkeypatch):
+        """Test that KG_DISABLE_FILE_LOG=1 keeps logging on the console only."""
+        monkeypatch.setenv(logger.DISABLE_FILE_LOG_ENV, "1")
+        with patch('logger.BufferedFileHandler') as mock_file_handler:
+            logger.setup_logger()
+        mock_file_handler.assert_not_called()
+        assert len(logger._listener.handlers) == 1
+
+    def test_buffered_file_handler_flushes_on_warning(self, tmp_path):
+        """Test that records stay buffered until a warning is logged."""
+        log_file = tmp_path / "test.log"
+        handler = logger.BufferedFileHandler(str(log_file))
+        handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        try:
+            handler.emit(logging.makeLogRecord({'levelno': logging.INFO, 'levelname': 'INFO', 'msg': 'Buffered'}))
+            assert log_file.read_text() == ""
+
+            handler.emit(logging.makeLogRecord({'levelno': logging.WARNING, 'levelname': 'WARNING', 'msg': 'Flushed'}))
+            assert log_file.read_text() == "INFO Buffered\nWARNING Flushed\n"
+        finally:
+            handler.close()
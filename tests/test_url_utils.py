@@ -5,6 +5,7 @@ import pytest
 from url_utils import (
     extract_video_id_from_iframe,
     extract_jwt_token,
+    extract_param,
     extract_auth_token,
     construct_video_url,
     construct_embed_url,
@@ -58,6 +59,12 @@ class TestExtractJwtToken:
         jwt_token = extract_jwt_token(iframe_src)
         assert jwt_token == "test_token"
 
+    def test_jwtToken_param_preferred(self):
+        """Test that jwtToken wins when the URL carries both parameters."""
+        iframe_src = "https://cf-embed.play.hotmart.com/embed/12345?jwt=other_token&jwtToken=test_token"
+        jwt_token = extract_jwt_token(iframe_src)
+        assert jwt_token == "test_token"
+
     def test_no_jwt_token(self):
         """Test with no JWT token in the URL."""
         iframe_src = "https://cf-embed.play.hotmart.com/embed/12345?param=value"
@@ -70,6 +77,20 @@ class TestExtractJwtToken:
         assert jwt_token is None
 
 
+class TestExtractParam:
+    """Tests for extract_param function."""
+
+    def test_param_followed_by_others(self):
+        """Test extracting a parameter that is followed by more parameters."""
+        url = "https://example.com/video.m3u8?hdntl=exp=1~hmac=abc&app=xyz"
+        assert extract_param(url, 'hdntl=') == "exp=1~hmac=abc"
+        assert extract_param(url, '&app=') == "xyz"
+
+    def test_missing_param(self):
+        """Test with a parameter that is not in the URL."""
+        assert extract_param("https://example.com/video.m3u8?app=xyz", 'hdntl=') is None
+
+
 class TestExtractAuthToken:
     """Tests for extract_auth_token function."""
 
@@ -1,15 +1,18 @@
 """
 Tests for the VideoDownloader class.
 """
+import io
 import os
+import threading
 import pytest
 import requests
 import m3u8
-from unittest.mock import MagicMock, patch, mock_open, call
+from unittest.mock import ANY, MagicMock, patch, mock_open, call
+from urllib3.exceptions import ProtocolError
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from video_downloader import VideoDownloader
+from video_downloader import VideoDownloader, LESSON_CONTENT_SELECTOR, HLS_SEGMENT_BACKOFF, TOKEN_REQUEST_SCRIPT
 
 
 @pytest.fixture
@@ -21,6 +24,7 @@ def video_downloader():
         # Configure browser manager mock
         mock_browser_manager_instance = mock_browser_manager.return_value
         mock_browser_manager_instance.initialize.return_value = MagicMock()
+        mock_browser_manager_instance.has_saved_session.return_value = False
         
         # Configure session mock
         mock_session = mock_session_class.return_value
@@ -30,6 +34,11 @@ def video_downloader():
         # Create downloader
         downloader = VideoDownloader("test@example.com", "password", headless=True)
         
+        # Explicit waits poll the mocked driver like the real browser manager's do
+        mock_browser_manager_instance._wait.side_effect = (
+            lambda timeout: WebDriverWait(downloader.driver, timeout, poll_frequency=0.1)
+        )
+        
         # Access to mocks for assertions
         downloader._mock_browser_manager = mock_browser_manager_instance
         downloader._mock_session = mock_session
@@ -54,6 +63,16 @@ class TestVideoDownloaderInit:
             # We just need to make sure the videos directory is created
             mock_makedirs.assert_any_call("videos")
     
+    def test_init_mounts_pooled_adapter(self, video_downloader):
+        """Test that one pooled HTTPAdapter is mounted for both schemes at init."""
+        mount_calls = video_downloader._mock_session.mount.call_args_list
+        assert [c[0][0] for c in mount_calls] == ['https://', 'http://']
+        adapter = mount_calls[0][0][1]
+        assert adapter is mount_calls[1][0][1]
+        assert adapter._pool_maxsize == 64
+        assert adapter.max_retries.total == 3
+        assert 503 in adapter.max_retries.status_forcelist
+
     def test_init_fails_when_browser_init_fails(self):
         """Test that init raises an exception when browser initialization fails."""
         with patch('video_downloader.BrowserManager') as mock_browser_manager, \
@@ -92,8 +111,8 @@ class TestVideoDownloaderLogin:
             {'name': 'test_cookie', 'value': 'test_value', 'domain': 'example.com', 'path': '/'}
         ]
         
-        # Mock WebDriverWait to avoid TypeError
-        with patch('video_downloader.WebDriverWait') as mock_wait:
+        # Mock the explicit waits
+        with patch.object(video_downloader.browser_manager, '_wait') as mock_wait:
             # Call login method
             result = video_downloader.login()
             
@@ -103,8 +122,53 @@ class TestVideoDownloaderLogin:
             mock_email_field.send_keys.assert_called_once_with(video_downloader.email)
             mock_password_field.send_keys.assert_called_once_with(video_downloader.password)
             mock_driver.execute_script.assert_called_once_with("arguments[0].click();", mock_button)
-            video_downloader._mock_session.cookies.set.assert_called_once()
+            video_downloader._mock_session.cookies.update.assert_called_once()
     
+    def test_login_reuses_saved_session(self, video_downloader):
+        """Test that a still-valid session from an earlier run skips the login form."""
+        mock_driver = video_downloader.driver
+        video_downloader._mock_browser_manager.has_saved_session.return_value = True
+        mock_driver.current_url = video_downloader.base_url + "/"
+        mock_driver.get_cookies.return_value = [
+            {'name': 'session', 'value': 'abc', 'domain': '.hotmart.com', 'path': '/'}
+        ]
+        
+        with patch.object(video_downloader.browser_manager, '_wait'):
+            result = video_downloader.login()
+        
+        assert result is True
+        mock_driver.get.assert_called_once_with(video_downloader.base_url)
+        video_downloader._mock_browser_manager.wait_for_element.assert_not_called()
+        jar = video_downloader._mock_session.cookies.update.call_args[0][0]
+        assert jar.get('session', domain='.hotmart.com', path='/') == 'abc'
+
+    def test_login_expired_session_falls_back_to_form(self, video_downloader):
+        """Test that an expired saved session goes through the login form."""
+        mock_driver = video_downloader.driver
+        video_downloader._mock_browser_manager.has_saved_session.return_value = True
+        mock_driver.current_url = video_downloader.login_url
+        video_downloader._mock_browser_manager.wait_for_element.return_value = None
+        
+        result = video_downloader.login()
+        
+        assert result is False
+        assert mock_driver.get.call_args_list == [call(video_downloader.base_url), call(video_downloader.login_url)]
+
+    def test_login_with_cookies(self, video_downloader):
+        """Test that cookies from another browser log in without the form."""
+        mock_driver = video_downloader.driver
+        mock_driver.current_url = video_downloader.base_url + "/"
+        cookies = [{'name': 'session', 'value': 'abc', 'domain': '.hotmart.com', 'path': '/'}]
+        mock_driver.get_cookies.return_value = cookies
+        
+        with patch.object(video_downloader.browser_manager, '_wait'):
+            result = video_downloader.login_with_cookies(cookies)
+        
+        assert result is True
+        video_downloader._mock_browser_manager.add_cookies.assert_called_once_with(cookies)
+        mock_driver.get.assert_called_once_with(video_downloader.base_url)
+        video_downloader._mock_browser_manager.wait_for_element.assert_not_called()
+
     def test_login_failure_email_field_not_found(self, video_downloader):
         """Test login failure when email field not found."""
         # Set up browser manager to return None for email field
@@ -170,16 +234,16 @@ class TestVideoDownloaderLogin:
             mock_button           # Login button
         ]
         
-        # Mock WebDriverWait to avoid TypeError
-        with patch('video_downloader.WebDriverWait') as mock_wait_class:
+        # Mock the explicit waits
+        with patch.object(video_downloader.browser_manager, '_wait') as mock_wait_factory:
             mock_wait = MagicMock()
-            mock_wait_class.return_value = mock_wait
+            mock_wait_factory.return_value = mock_wait
             
             # Setup error message to be found
             mock_error = MagicMock()
-            mock_error.is_displayed.return_value = True
             mock_error.text = "Invalid username or password"
             video_downloader._mock_driver.find_elements.return_value = [mock_error]
+            video_downloader._mock_browser_manager.visible_elements.return_value = [mock_error]
             
             # Set current URL to still be on login page
             video_downloader._mock_driver.current_url = "https://example.com/login"
@@ -217,11 +281,11 @@ class TestVideoDownloaderLogin:
         # Set current URL to still be on login page
         video_downloader._mock_driver.current_url = "https://example.com/login"
         
-        # Make the WebDriverWait.until raise an exception (no post-login elements)
+        # Make the wait's until raise an exception (no post-login elements)
         mock_wait = MagicMock()
         mock_wait.until.side_effect = Exception("No post-login elements found")
         
-        with patch('video_downloader.WebDriverWait', return_value=mock_wait):
+        with patch.object(video_downloader.browser_manager, '_wait', return_value=mock_wait):
             # Call login method
             result = video_downloader.login()
             
@@ -245,19 +309,35 @@ class TestVideoDownloaderTransferCookies:
         # Call the method
         video_downloader._transfer_cookies_to_session()
         
-        # Assertions
-        assert video_downloader._mock_session.cookies.set.call_count == 2
-        video_downloader._mock_session.cookies.set.assert_any_call(
-            name='cookie1', value='value1', domain='domain1.com', path='/path1'
-        )
-        video_downloader._mock_session.cookies.set.assert_any_call(
-            name='cookie2', value='value2', domain='', path='/'
-        )
+        # Assertions - all cookies are merged into the session at once
+        video_downloader._mock_session.cookies.update.assert_called_once()
+        jar = video_downloader._mock_session.cookies.update.call_args[0][0]
+        assert len(jar) == 2
+        assert jar.get('cookie1', domain='domain1.com', path='/path1') == 'value1'
+        assert jar.get('cookie2', domain='', path='/') == 'value2'
+    
+    def test_transfer_cookies_keeps_secure_flag_and_expiry(self, video_downloader):
+        """Test that secure cookies stay secure and expiring ones keep their expiry."""
+        video_downloader.driver.get_cookies.return_value = [
+            {'name': 'session', 'value': 'abc', 'domain': '.hotmart.com', 'path': '/',
+             'secure': True, 'expiry': 2000000000}
+        ]
+        
+        video_downloader._transfer_cookies_to_session()
+        
+        cookie = next(iter(video_downloader._mock_session.cookies.update.call_args[0][0]))
+        assert cookie.secure is True
+        assert cookie.expires == 2000000000
 
 
 class TestVideoDownloaderExtractVideoUrl:
     """Tests for extract_video_url method and its helper methods."""
     
+    @pytest.fixture(autouse=True)
+    def js_rendered_lesson(self, video_downloader):
+        """Lesson pages inject the player with JavaScript unless a test says otherwise."""
+        video_downloader._mock_session.get.return_value = MagicMock(ok=True, text="<div id='app'></div>")
+    
     def test_extract_video_url_success_jwt_approach(self, video_downloader):
         """Test successful video URL extraction using JWT token approach."""
         # Mock iframe
@@ -268,7 +348,7 @@ class TestVideoDownloaderExtractVideoUrl:
         mock_wait = MagicMock()
         mock_wait.until.return_value = mock_iframe
         
-        with patch('video_downloader.WebDriverWait', return_value=mock_wait), \
+        with patch.object(video_downloader.browser_manager, '_wait', return_value=mock_wait), \
              patch('video_downloader.URLExtractor.extract_video_id_from_iframe', return_value="12345"), \
              patch.object(video_downloader, '_extract_jwt_token', return_value="test_jwt"), \
              patch.object(video_downloader, '_try_jwt_token_approach') as mock_jwt_approach:
@@ -282,7 +362,7 @@ class TestVideoDownloaderExtractVideoUrl:
             # Assertions
             assert result == [("", "https://example.com/video.m3u8")]
             video_downloader.driver.get.assert_called_once_with("https://example.com/lesson")
-            mock_jwt_approach.assert_called_once_with("12345", "test_jwt")
+            mock_jwt_approach.assert_called_once_with("12345", "test_jwt", load_embed=True)
     
     def test_extract_video_url_fallback_to_api(self, video_downloader):
         """Test fallback to API approach when JWT approach fails."""
@@ -294,7 +374,7 @@ class TestVideoDownloaderExtractVideoUrl:
         mock_wait = MagicMock()
         mock_wait.until.return_value = mock_iframe
         
-        with patch('video_downloader.WebDriverWait', return_value=mock_wait), \
+        with patch.object(video_downloader.browser_manager, '_wait', return_value=mock_wait), \
              patch('video_downloader.URLExtractor.extract_video_id_from_iframe', return_value="12345"), \
              patch.object(video_downloader, '_extract_jwt_token', return_value="test_jwt"), \
              patch.object(video_downloader, '_try_jwt_token_approach', return_value=[]), \
@@ -320,7 +400,7 @@ class TestVideoDownloaderExtractVideoUrl:
         mock_wait = MagicMock()
         mock_wait.until.return_value = mock_iframe
         
-        with patch('video_downloader.WebDriverWait', return_value=mock_wait), \
+        with patch.object(video_downloader.browser_manager, '_wait', return_value=mock_wait), \
              patch.object(video_downloader, '_try_jwt_token_approach', return_value=[]), \
              patch.object(video_downloader, '_try_api_approach', return_value=[]), \
              patch.object(video_downloader, '_try_javascript_extraction', return_value=[]), \
@@ -340,7 +420,7 @@ class TestVideoDownloaderExtractVideoUrl:
         mock_wait = MagicMock()
         mock_wait.until.side_effect = Exception("Iframe not found")
         
-        with patch('video_downloader.WebDriverWait', return_value=mock_wait):
+        with patch.object(video_downloader.browser_manager, '_wait', return_value=mock_wait):
             # Call the method
             result = video_downloader.extract_video_url("https://example.com/lesson")
             
@@ -349,6 +429,115 @@ class TestVideoDownloaderExtractVideoUrl:
             # This is the expected behavior in the updated implementation
             assert result == [("", "direct-recording://https://example.com/lesson")]
 
+    def test_extract_video_url_waits_for_lesson_content(self, video_downloader):
+        """Test that the lesson page is awaited by readiness and content instead of a fixed sleep."""
+        with patch('time.sleep') as mock_sleep, \
+             patch.object(video_downloader, '_extract_single_video_url', return_value=None):
+            video_downloader.extract_video_url("https://example.com/lesson")
+        
+        mock_sleep.assert_not_called()
+        video_downloader._mock_browser_manager.wait_for_ready.assert_called_once()
+        video_downloader._mock_browser_manager.wait_for_element.assert_any_call(
+            By.CSS_SELECTOR, LESSON_CONTENT_SELECTOR, timeout=8
+        )
+
+    def test_extract_video_url_from_server_rendered_lesson(self, video_downloader):
+        """Test that a lesson with the player in its HTML is handled without the browser."""
+        lesson_page = MagicMock(ok=True, text=(
+            '<iframe class="player" src="https://cf-embed.play.hotmart.com/embed/12345?jwtToken=abc&amp;x=1"></iframe>'
+        ))
+        jwt_response = MagicMock(status_code=200)
+        jwt_response.json.return_value = {'url': "https://example.com/video.m3u8"}
+        video_downloader._mock_session.get.side_effect = [lesson_page, jwt_response]
+        
+        result = video_downloader.extract_video_url("https://example.com/lesson")
+        
+        assert result == [("", "https://example.com/video.m3u8")]
+        assert "/video/12345/play?jwt=abc" in video_downloader._mock_session.get.call_args[0][0]
+        video_downloader.driver.get.assert_not_called()
+        assert video_downloader.current_lesson_url == "https://example.com/lesson"
+    
+    def test_server_rendered_lesson_falls_back_to_lesson_in_browser(self, video_downloader):
+        """Test that when the HTTP APIs fail only the lesson itself is loaded in the browser."""
+        lesson_page = MagicMock(ok=True, text=(
+            '<iframe src="https://cf-embed.play.hotmart.com/embed/12345?jwtToken=abc"></iframe>'
+        ))
+        video_downloader._mock_session.get.side_effect = [lesson_page, MagicMock(status_code=403)]
+        
+        with patch('video_downloader.URLExtractor.get_url_from_api', return_value=None), \
+             patch.object(video_downloader, '_extract_single_video_url',
+                          return_value="https://example.com/video.m3u8"):
+            result = video_downloader.extract_video_url("https://example.com/lesson")
+        
+        assert result == [("", "https://example.com/video.m3u8")]
+        video_downloader.driver.get.assert_called_once_with("https://example.com/lesson")
+    
+    def test_lesson_html_not_fetched_once_player_is_client_rendered(self, video_downloader):
+        """Test that lesson HTML is only requested until a page turns out to inject its player."""
+        with patch.object(video_downloader, '_extract_single_video_url',
+                          return_value="https://example.com/video.m3u8"):
+            video_downloader.extract_video_url("https://example.com/lesson-1")
+            video_downloader.extract_video_url("https://example.com/lesson-2")
+        
+        video_downloader._mock_session.get.assert_called_once_with("https://example.com/lesson-1", timeout=15)
+        assert video_downloader.driver.get.call_count == 2
+    
+    def test_javascript_extraction_stays_on_loaded_lesson(self, video_downloader):
+        """Test that the lesson page is not reloaded when the browser is still on it."""
+        video_downloader.driver.current_url = "https://example.com/lesson"
+        mock_wait = MagicMock()
+        
+        with patch.object(video_downloader.browser_manager, '_wait', return_value=mock_wait), \
+             patch('video_downloader.URLExtractor.process_extraction_result',
+                   return_value=[("", "https://example.com/video.m3u8")]):
+            result = video_downloader._try_javascript_extraction("https://example.com/lesson", "12345", "test_jwt")
+        
+        assert result == [("", "https://example.com/video.m3u8")]
+        video_downloader.driver.get.assert_not_called()
+        video_downloader.driver.switch_to.frame.assert_called_once_with(mock_wait.until.return_value)
+    
+    def test_fetch_iframe_src_leaves_multi_part_lessons_to_browser(self, video_downloader):
+        """Test that lessons listing several parts are not taken from the HTML."""
+        video_downloader._mock_session.get.return_value = MagicMock(ok=True, text=(
+            '<iframe src="https://cf-embed.play.hotmart.com/embed/12345"></iframe>'
+            '<li class="playlist-media active">Part 1</li>'
+        ))
+        
+        assert video_downloader._fetch_iframe_src_via_requests("https://example.com/lesson") is None
+    
+    def test_wait_for_part_change(self, video_downloader):
+        """Test that clicking a part waits for the player iframe src to change."""
+        video_downloader.driver.execute_script.side_effect = ["https://embed/part-1", "https://embed/part-2"]
+        mock_wait = MagicMock()
+        checks = []
+        mock_wait.until.side_effect = lambda condition: checks.extend(
+            [condition(video_downloader.driver), condition(video_downloader.driver)]
+        )
+        
+        with patch.object(video_downloader.browser_manager, '_wait', return_value=mock_wait):
+            video_downloader._wait_for_part_change("https://embed/part-1")
+        
+        assert checks == [False, True]
+
+    def test_wait_uses_browser_manager_waits(self, video_downloader):
+        """Test that explicit waits come from the browser manager's cache."""
+        with patch.object(video_downloader.browser_manager, '_wait') as mock_wait_factory:
+            assert video_downloader._wait(15) is mock_wait_factory.return_value
+        mock_wait_factory.assert_called_once_with(15)
+
+    def test_wait_for_token_request(self, video_downloader):
+        """Test polling network entries until one carries an hdntl token, instead of sleeping."""
+        token_url = "https://vod-akm.play.hotmart.com/video/abc/hls/master.m3u8?hdntl=exp=1"
+        video_downloader.driver.execute_script.side_effect = [None, None, token_url]
+        
+        assert video_downloader._wait_for_token_request("vod-akm.play.hotmart.com") == token_url
+        assert video_downloader.driver.execute_script.call_count == 3
+        video_downloader.driver.execute_script.assert_called_with(TOKEN_REQUEST_SCRIPT, "vod-akm.play.hotmart.com")
+        
+        video_downloader.driver.execute_script.side_effect = None
+        video_downloader.driver.execute_script.return_value = None
+        assert video_downloader._wait_for_token_request(timeout=0) is None
+
 
 class TestVideoDownloaderJwtTokenApproach:
     """Tests for _try_jwt_token_approach method."""
@@ -467,12 +656,8 @@ class TestVideoDownloaderHelperApproaches:
     
     def test_try_network_requests_approach_success(self, video_downloader):
         """Test network requests approach with success."""
-        # Mock network requests with hdntl token
-        mock_requests = [
-            "https://example.com/video.m3u8?hdntl=test_token",  # Has token
-            "https://example.com/other.js"  # No token
-        ]
-        video_downloader.driver.execute_script.return_value = mock_requests
+        # The page script returns the one request carrying an hdntl token
+        video_downloader.driver.execute_script.return_value = "https://example.com/video.m3u8?hdntl=test_token"
         
         # Call the method
         result = video_downloader._try_network_requests_approach("12345", "test_jwt")
@@ -482,6 +667,7 @@ class TestVideoDownloaderHelperApproaches:
         assert video_downloader.driver.execute_script.call_count > 0
 
 
+@pytest.mark.usefixtures("no_sleep")
 class TestVideoDownloaderDownload:
     """Tests for download_video method and its helper methods."""
     
@@ -492,7 +678,7 @@ class TestVideoDownloaderDownload:
             result = video_downloader.download_video("https://example.com/video.m3u8", "test_video")
             
             assert result is True
-            mock_browser_download.assert_called_once_with("https://example.com/video.m3u8", "test_video")
+            mock_browser_download.assert_called_once_with("https://example.com/video.m3u8", "test_video.recording")
             mock_download_hls.assert_called_once_with("https://example.com/video.m3u8", "test_video")
     
     def test_download_video_mp4(self, video_downloader):
@@ -502,7 +688,7 @@ class TestVideoDownloaderDownload:
             result = video_downloader.download_video("https://example.com/video.mp4", "test_video")
             
             assert result is True
-            mock_browser_download.assert_called_once_with("https://example.com/video.mp4", "test_video")
+            mock_browser_download.assert_called_once_with("https://example.com/video.mp4", "test_video.recording")
             mock_download_mp4.assert_called_once_with("https://example.com/video.mp4", "test_video")
             
     def test_download_video_browser_success(self, video_downloader):
@@ -513,7 +699,7 @@ class TestVideoDownloaderDownload:
             result = video_downloader.download_video("https://example.com/video.m3u8", "test_video")
             
             assert result is True
-            mock_browser_download.assert_called_once_with("https://example.com/video.m3u8", "test_video")
+            mock_browser_download.assert_called_once_with("https://example.com/video.m3u8", "test_video.recording")
             mock_download_hls.assert_not_called()
             mock_download_mp4.assert_not_called()
     
@@ -523,7 +709,7 @@ class TestVideoDownloaderDownload:
             result = video_downloader.download_video("direct-recording://https://example.com/lesson", "test_video")
             
             assert result is True
-            mock_direct_recording.assert_called_once_with("test_video")
+            mock_direct_recording.assert_called_once_with("test_video.recording")
     
     def test_download_video_direct_recording_fallback(self, video_downloader):
         """Test fallback to optimized browser recording."""
@@ -532,8 +718,8 @@ class TestVideoDownloaderDownload:
             result = video_downloader.download_video("direct-recording://https://example.com/lesson", "test_video")
             
             assert result is True
-            mock_simple_recording.assert_called_once_with("test_video")
-            mock_optimized_recording.assert_called_once_with("direct-recording://https://example.com/lesson", "test_video")
+            mock_simple_recording.assert_called_once_with("test_video.recording")
+            mock_optimized_recording.assert_called_once_with("direct-recording://https://example.com/lesson", "test_video.recording")
             
     def test_download_video_with_video_downloader_helper(self, video_downloader):
         """Test download using Video Downloader Helper extension."""
@@ -547,7 +733,7 @@ class TestVideoDownloaderDownload:
             result = video_downloader.download_video("https://example.com/video.mp4", "test_video")
             
             assert result is True
-            mock_vdh.assert_called_once_with("https://example.com/video.mp4", "test_video")
+            mock_vdh.assert_called_once_with("https://example.com/video.mp4", "test_video.recording")
             mock_browser_download.assert_not_called()
             mock_download_mp4.assert_not_called()
     
@@ -560,19 +746,172 @@ class TestVideoDownloaderDownload:
             result = video_downloader.download_video("https://example.com/video.m3u8", "test_video")
             
             assert result is False
-            mock_browser_download.assert_called_once_with("https://example.com/video.m3u8", "test_video")
+            mock_browser_download.assert_called_once_with("https://example.com/video.m3u8", "test_video.recording")
     
+    def test_download_video_ranged_success(self, video_downloader, tmp_path):
+        """Test that a ranged download writes every part at its offset."""
+        payload = b"0123456789abcdef"
+        video_downloader.download_dir = str(tmp_path)
+        head_response = MagicMock(status_code=200)
+        head_response.headers = {'Content-Length': str(len(payload)), 'Accept-Ranges': 'bytes'}
+        video_downloader.session.head.return_value = head_response
+
+        def range_get(url, headers=None, stream=False):
+            start, end = headers['Range'][len('bytes='):].split('-')
+            response = MagicMock(status_code=206)
+            response.__enter__.return_value = response
+            response.iter_content.return_value = [payload[int(start):int(end) + 1]]
+            return response
+
+        video_downloader.session.get.side_effect = range_get
+
+        with patch.object(video_downloader, '_download_mp4') as mock_download_mp4:
+            video_downloader.download_video_ranged("https://example.com/video.mp4", "test_video", parts=4)
+
+        mock_download_mp4.assert_not_called()
+        assert video_downloader.session.get.call_count == 4
+        assert (tmp_path / "test_video.mp4").read_bytes() == payload
+
+    def test_interrupted_ranged_download_is_not_skipped(self, video_downloader, tmp_path):
+        """Test that a ranged download cut short leaves nothing a later run would take as finished."""
+        payload = b"0123456789abcdef"
+        video_downloader.download_dir = str(tmp_path)
+        head_response = MagicMock(status_code=200)
+        head_response.headers = {'Content-Length': str(len(payload)), 'Accept-Ranges': 'bytes'}
+        video_downloader.session.head.return_value = head_response
+
+        def range_get(url, headers=None, stream=False):
+            start, end = headers['Range'][len('bytes='):].split('-')
+            if start != '0':
+                raise KeyboardInterrupt
+            response = MagicMock(status_code=206)
+            response.__enter__.return_value = response
+            response.iter_content.return_value = [payload[int(start):int(end) + 1]]
+            return response
+
+        video_downloader.session.get.side_effect = range_get
+
+        with pytest.raises(KeyboardInterrupt):
+            video_downloader.download_video_ranged("https://example.com/video.mp4", "test_video", parts=4)
+
+        assert not (tmp_path / "test_video.mp4").exists()
+        assert (tmp_path / "test_video.part.mp4").stat().st_size == len(payload)
+
+        video_downloader.session.get.side_effect = None
+        with patch.object(video_downloader, '_try_browser_strategies', return_value=True) as mock_strategies:
+            assert video_downloader.download_video("https://example.com/video.mp4", "test_video") is True
+        mock_strategies.assert_called_once_with("https://example.com/video.mp4", "test_video.recording")
+
+    def test_download_video_ranged_falls_back_without_range_support(self, video_downloader):
+        """Test fallback to a single stream when the server doesn't accept ranges."""
+        head_response = MagicMock(status_code=200)
+        head_response.headers = {'Content-Length': '1000'}
+        video_downloader.session.head.return_value = head_response
+
+        with patch.object(video_downloader, '_download_mp4') as mock_download_mp4:
+            video_downloader.download_video_ranged("https://example.com/video.mp4", "test_video", parts=4)
+
+        mock_download_mp4.assert_called_once_with("https://example.com/video.mp4", "test_video")
+
+    def test_download_video_skips_complete_mp4(self, video_downloader, tmp_path):
+        """Test that an MP4 already on disk with the server's size is not downloaded again."""
+        video_downloader.download_dir = str(tmp_path)
+        (tmp_path / "test_video.mp4").write_bytes(b"0123456789")
+        head_response = MagicMock(status_code=200)
+        head_response.headers = {'Content-Length': '10', 'Accept-Ranges': 'bytes'}
+        video_downloader.session.head.return_value = head_response
+
+        with patch.object(video_downloader, '_try_browser_strategies') as mock_strategies:
+            assert video_downloader.download_video("https://example.com/video.mp4", "test_video") is True
+
+        mock_strategies.assert_not_called()
+        video_downloader.session.get.assert_not_called()
+
+    def test_download_video_skips_finished_stream(self, video_downloader, tmp_path):
+        """Test that a stream saved by an earlier run is not downloaded again, unlike a partial one."""
+        video_downloader.download_dir = str(tmp_path)
+        (tmp_path / "test_video.mp4").write_bytes(b"video")
+        (tmp_path / "other_video.part.mp4").write_bytes(b"vid")
+
+        with patch.object(video_downloader, '_try_browser_strategies', return_value=False) as mock_strategies, \
+             patch.object(video_downloader, '_download_hls') as mock_download_hls:
+            assert video_downloader.download_video("https://example.com/video.m3u8", "test_video") is True
+            mock_strategies.assert_not_called()
+
+            assert video_downloader.download_video("https://example.com/video.m3u8", "other_video") is True
+            mock_download_hls.assert_called_once_with("https://example.com/video.m3u8", "other_video")
+
+    def test_interrupted_browser_recording_is_not_skipped(self, video_downloader, tmp_path):
+        """Test that a recording cut short never lands under the final name, so the next run retries it."""
+        video_downloader.download_dir = str(tmp_path)
+
+        def interrupted_recording(url, filename):
+            (tmp_path / f"{filename}.mp4").write_bytes(b"trunc")
+            raise KeyboardInterrupt
+
+        with patch.object(video_downloader, '_try_browser_strategies', side_effect=interrupted_recording):
+            with pytest.raises(KeyboardInterrupt):
+                video_downloader.download_video("https://example.com/video.m3u8", "test_video")
+
+        assert list(tmp_path.iterdir()) == []
+
+        def finished_recording(url, filename):
+            (tmp_path / f"{filename}.mp4").write_bytes(b"video")
+            return True
+
+        with patch.object(video_downloader, '_try_browser_strategies', side_effect=finished_recording) as mock_strategies:
+            assert video_downloader.download_video("https://example.com/video.m3u8", "test_video") is True
+
+        mock_strategies.assert_called_once()
+        assert [path.name for path in tmp_path.iterdir()] == ["test_video.mp4"]
+        assert (tmp_path / "test_video.mp4").read_bytes() == b"video"
+
+    def test_webm_only_browser_recording_is_moved_into_place(self, video_downloader, tmp_path):
+        """Test that a recording kept as WebM loses its temporary name and counts as complete."""
+        video_downloader.download_dir = str(tmp_path)
+
+        def webm_recording(url, filename):
+            (tmp_path / f"{filename}.webm").write_bytes(b"webm")
+            return True
+
+        with patch.object(video_downloader, '_try_browser_strategies', side_effect=webm_recording):
+            assert video_downloader.download_video("https://example.com/video.m3u8", "test_video") is True
+
+        assert [path.name for path in tmp_path.iterdir()] == ["test_video.webm"]
+
+        with patch.object(video_downloader, '_try_browser_strategies') as mock_strategies:
+            assert video_downloader.download_video("https://example.com/video.m3u8", "test_video") is True
+        mock_strategies.assert_not_called()
+
+    def test_complete_existing_mp4_resumes_partial_file(self, video_downloader, tmp_path):
+        """Test that a partial MP4 is completed with a Range request."""
+        video_downloader.download_dir = str(tmp_path)
+        (tmp_path / "test_video.mp4").write_bytes(b"01234")
+        head_response = MagicMock(status_code=200)
+        head_response.headers = {'Content-Length': '10', 'Accept-Ranges': 'bytes'}
+        video_downloader.session.head.return_value = head_response
+        get_response = MagicMock(status_code=206)
+        get_response.__enter__.return_value = get_response
+        get_response.raw.read.side_effect = [b"56789", b""]
+        video_downloader.session.get.return_value = get_response
+
+        assert video_downloader._complete_existing_mp4("https://example.com/video.mp4", "test_video") is True
+
+        assert video_downloader.session.get.call_args[1]['headers']['Range'] == 'bytes=5-'
+        assert (tmp_path / "test_video.mp4").read_bytes() == b"0123456789"
+
     def test_download_mp4_success(self, video_downloader):
         """Test successful MP4 download."""
         # Mock session response
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.headers.get.return_value = "1000"
-        mock_response.iter_content.return_value = [b"test data"]
+        mock_response.raw.read.side_effect = [b"test data", b""]
         video_downloader._mock_session.get.return_value = mock_response
         
         # Mock file operations
-        with patch('builtins.open', mock_open()) as mock_file:
+        with patch('builtins.open', mock_open()) as mock_file, \
+             patch('os.fsync') as mock_fsync:
             video_downloader._download_mp4("https://example.com/video.mp4", "test_video")
             
             # Assertions - We only check that get was called once with the right URL
@@ -592,8 +931,11 @@ class TestVideoDownloaderDownload:
             assert headers['Accept-Language'] == 'en-US,en;q=0.5'
             
             # Validate file operations
-            mock_file.assert_called_once_with(os.path.join("videos", "test_video.mp4"), 'wb')
+            mock_file.assert_called_once_with(os.path.join("videos", "test_video.mp4"), 'wb', buffering=1 << 20)
             mock_file().write.assert_called_once_with(b"test data")
+            mock_response.raw.read.assert_called_with(1 << 20)
+            assert mock_response.raw.decode_content is True
+            mock_fsync.assert_called_once()
     
     def test_download_mp4_failure(self, video_downloader):
         """Test MP4 download failure handling."""
@@ -608,6 +950,8 @@ class TestVideoDownloaderDownload:
             video_downloader._download_mp4("https://example.com/video.mp4", "test_video")
         
         assert "MP4 download failed: HTTP 401" in str(excinfo.value)
+        # The connection goes back to the pool even though the download failed
+        mock_response.__exit__.assert_called_once()
         
     def test_browser_download_success(self, video_downloader):
         """Test successful browser-based download."""
@@ -652,6 +996,7 @@ class TestVideoDownloaderDownload:
             mock_hls_download.assert_called_once_with("https://example.com/video.m3u8", "test_video")
 
 
+@pytest.mark.usefixtures("no_sleep")
 class TestVideoDownloaderRecordingMethods:
     """Tests for direct recording methods."""
     
@@ -925,7 +1270,7 @@ class TestVideoDownloaderHlsDownload:
     def test_download_hls_success_primary_method(self, video_downloader):
         """Test successful HLS download using primary method."""
         # Mock m3u8 playlist
-        mock_playlist = MagicMock()
+        mock_playlist = MagicMock(is_variant=False, segments=[])
         
         with patch('m3u8.loads', return_value=mock_playlist), \
              patch.object(video_downloader, '_prepare_ffmpeg_headers', return_value="headers"), \
@@ -943,14 +1288,14 @@ class TestVideoDownloaderHlsDownload:
             video_downloader._mock_session.get.assert_called_once()
             mock_primary_method.assert_called_once_with(
                 "https://example.com/video.m3u8", 
-                os.path.join("videos", "test_video.mp4"), 
+                os.path.join("videos", "test_video.part.mp4"), 
                 "headers"
             )
     
     def test_download_hls_fallback_method(self, video_downloader):
         """Test HLS download falling back to secondary method when primary fails."""
         # Mock m3u8 playlist
-        mock_playlist = MagicMock()
+        mock_playlist = MagicMock(is_variant=False, segments=[])
         
         with patch('m3u8.loads', return_value=mock_playlist), \
              patch.object(video_downloader, '_prepare_ffmpeg_headers', return_value="headers"), \
@@ -968,9 +1313,137 @@ class TestVideoDownloaderHlsDownload:
             # Assertions
             mock_fallback_method.assert_called_once_with(
                 "https://example.com/video.m3u8", 
-                os.path.join("videos", "test_video.mp4")
+                os.path.join("videos", "test_video.part.mp4")
             )
     
+    def test_download_with_ffmpeg_python_copies_streams(self, video_downloader):
+        """Test that the ffmpeg fallback remuxes without re-encoding."""
+        with patch('video_downloader.ffmpeg.run') as mock_run:
+            video_downloader._download_with_ffmpeg_python("https://example.com/video.m3u8", "out.mp4", "headers")
+        
+        args = mock_run.call_args[0][0].get_args()
+        assert args[args.index('-c') + 1] == 'copy'
+        assert args[args.index('-bsf:a') + 1] == 'aac_adtstoasc'
+        assert args[args.index('-movflags') + 1] == '+faststart'
+        assert args[args.index('-loglevel') + 1] == 'error'
+        assert "out.mp4" in args
+    
+    def test_download_hls_fetches_segments_in_parallel(self, video_downloader, tmp_path):
+        """Test that plain TS segments are fetched with the session and only remuxed by ffmpeg."""
+        video_downloader.download_dir = str(tmp_path)
+        playlist_response = MagicMock(ok=True, text=(
+            "#EXTM3U\n#EXT-X-TARGETDURATION:10\n"
+            "#EXTINF:10,\nseg0.ts\n#EXTINF:10,\nseg1.ts\n#EXTINF:10,\nseg2.ts\n#EXT-X-ENDLIST"
+        ))
+        
+        def fake_get(url, headers=None, **kwargs):
+            if url.endswith(".m3u8"):
+                return playlist_response
+            response = MagicMock()
+            response.raw = io.BytesIO(url.rsplit('/', 1)[1].encode())
+            return response
+        video_downloader._mock_session.get.side_effect = fake_get
+        
+        joined = {}
+        def fake_run(stream, **kwargs):
+            joined_path = stream.node.incoming_edges[0].upstream_node.kwargs['filename']
+            with open(joined_path, 'rb') as f:
+                joined['data'] = f.read()
+            joined['output'] = stream.node.kwargs['filename']
+            with open(joined['output'], 'wb') as f:
+                f.write(joined['data'])
+        
+        with patch('video_downloader.ffmpeg.run', side_effect=fake_run), \
+             patch.object(video_downloader, '_download_with_ffmpeg_python') as mock_primary_method:
+            video_downloader._download_hls("https://example.com/hls/video.m3u8", "test_video")
+        
+        assert joined['data'] == b"seg0.tsseg1.tsseg2.ts"
+        assert joined['output'] == str(tmp_path / "test_video.part.mp4")
+        mock_primary_method.assert_not_called()
+        video_downloader._mock_session.get.assert_any_call(
+            "https://example.com/hls/seg1.ts", headers=ANY, stream=True, timeout=60
+        )
+        # Segment files are cleaned up and the finished video gets its final name
+        assert os.listdir(tmp_path) == ["test_video.mp4"]
+    
+    def test_download_hls_retries_failed_segment(self, video_downloader, tmp_path):
+        """Test that a segment is fetched again after its body was cut off."""
+        video_downloader.download_dir = str(tmp_path)
+        playlist = m3u8.loads(
+            "#EXTM3U\n#EXT-X-TARGETDURATION:10\n#EXTINF:10,\nseg0.ts\n#EXT-X-ENDLIST",
+            uri="https://example.com/hls/video.m3u8"
+        )
+        failed = MagicMock()
+        failed.raw.read.side_effect = ProtocolError("Connection broken")
+        segment = MagicMock()
+        segment.raw = io.BytesIO(b"seg0")
+        video_downloader._mock_session.get.side_effect = [failed, segment]
+        
+        with patch('video_downloader.ffmpeg.run') as mock_run, \
+             patch('video_downloader.time.sleep') as mock_sleep:
+            assert video_downloader._download_hls_segments(playlist, {}, str(tmp_path / "test_video.mp4"))
+        
+        mock_sleep.assert_called_once_with(HLS_SEGMENT_BACKOFF)
+        mock_run.assert_called_once()
+    
+    def test_download_hls_does_not_retry_server_error_again(self, video_downloader, tmp_path):
+        """Test that a 5xx left over from the adapter's retries fails the segment straight away."""
+        video_downloader.download_dir = str(tmp_path)
+        playlist = m3u8.loads(
+            "#EXTM3U\n#EXT-X-TARGETDURATION:10\n#EXTINF:10,\nseg0.ts\n#EXT-X-ENDLIST",
+            uri="https://example.com/hls/video.m3u8"
+        )
+        failed = MagicMock(status_code=503)
+        failed.raise_for_status.side_effect = requests.HTTPError("503", response=failed)
+        video_downloader._mock_session.get.return_value = failed
+        
+        with patch('video_downloader.ffmpeg.run') as mock_run, \
+             patch('video_downloader.time.sleep') as mock_sleep:
+            with pytest.raises(requests.HTTPError):
+                video_downloader._download_hls_segments(playlist, {}, str(tmp_path / "test_video.mp4"))
+        
+        video_downloader._mock_session.get.assert_called_once()
+        mock_sleep.assert_not_called()
+        mock_run.assert_not_called()
+    
+    def test_select_variant_by_quality(self):
+        """Test picking the best, worst or nearest-height rendition of a master playlist."""
+        playlist = m3u8.loads(
+            "#EXTM3U\n"
+            "#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\nlow.m3u8\n"
+            "#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080\nhigh.m3u8\n"
+            "#EXT-X-STREAM-INF:BANDWIDTH=2500000,RESOLUTION=1280x720\nmid.m3u8\n"
+        )
+        variants = playlist.playlists
+        
+        assert VideoDownloader._select_variant(variants).uri == "high.m3u8"
+        assert VideoDownloader._select_variant(variants, "worst").uri == "low.m3u8"
+        assert VideoDownloader._select_variant(variants, "720p").uri == "mid.m3u8"
+        assert VideoDownloader._select_variant(variants, "480p").uri == "low.m3u8"
+    
+    def test_download_hls_gives_ffmpeg_the_selected_rendition(self, video_downloader):
+        """Test that ffmpeg gets the chosen media playlist rather than the master playlist."""
+        master = MagicMock(ok=True, text=(
+            "#EXTM3U\n"
+            "#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\nlow.m3u8\n"
+            "#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080\nhigh.m3u8\n"
+        ))
+        # An encrypted rendition is left to ffmpeg
+        media = MagicMock(ok=True, text=(
+            "#EXTM3U\n#EXT-X-KEY:METHOD=AES-128,URI=\"key.bin\"\n#EXTINF:10,\nseg0.ts\n#EXT-X-ENDLIST"
+        ))
+        video_downloader._mock_session.get.side_effect = [master, media]
+        video_downloader.hls_quality = "360p"
+        
+        with patch.object(video_downloader, '_prepare_ffmpeg_headers', return_value="headers"), \
+             patch.object(video_downloader, '_download_with_ffmpeg_python') as mock_primary_method:
+            video_downloader._download_hls("https://example.com/hls/master.m3u8", "test_video")
+        
+        assert video_downloader._mock_session.get.call_count == 2
+        mock_primary_method.assert_called_once_with(
+            "https://example.com/hls/low.m3u8", os.path.join("videos", "test_video.part.mp4"), "headers"
+        )
+    
     def test_download_hls_playlist_fetch_failure(self, video_downloader):
         """Test exception handling when playlist fetch fails."""
         # Mock session response
@@ -994,25 +1467,28 @@ class TestVideoDownloaderLessonDownload:
         # Mock driver and wait
         mock_title_element = MagicMock()
         mock_title_element.text = "Test Lesson Title!"
+        video_downloader.driver.find_element.return_value = mock_title_element
         
-        mock_wait = MagicMock()
-        mock_wait.until.return_value = mock_title_element
+        title = video_downloader.get_lesson_title()
         
-        with patch('video_downloader.WebDriverWait', return_value=mock_wait):
-            title = video_downloader.get_lesson_title()
-            
-            assert title == "Test Lesson Title"
+        assert title == "Test Lesson Title"
+        video_downloader._mock_browser_manager.implicit_wait.assert_called_once_with(10)
+        video_downloader.driver.find_element.assert_called_once_with(By.CSS_SELECTOR, "h1, .lesson-title")
+    
+    def test_get_lesson_title_keeps_accented_letters(self, video_downloader):
+        """Test that only punctuation is stripped from non-ASCII titles."""
+        video_downloader.driver.find_element.return_value = MagicMock(text="Aula 1: Introdução / Golpe_2")
+        
+        assert video_downloader.get_lesson_title() == "Aula 1 Introdução  Golpe_2"
     
     def test_get_lesson_title_exception(self, video_downloader):
         """Test exception handling in lesson title extraction."""
-        # Mock wait to raise exception
-        mock_wait = MagicMock()
-        mock_wait.until.side_effect = Exception("Title not found")
+        # Mock the lookup to raise exception
+        video_downloader.driver.find_element.side_effect = Exception("Title not found")
         
-        with patch('video_downloader.WebDriverWait', return_value=mock_wait):
-            title = video_downloader.get_lesson_title()
-            
-            assert title == "lesson"
+        title = video_downloader.get_lesson_title()
+        
+        assert title == "lesson"
     
     def test_get_all_lessons(self, video_downloader):
         """Test extraction of all lessons."""
@@ -1029,16 +1505,14 @@ class TestVideoDownloaderLessonDownload:
         mock_title2.text = "Lesson 2"
         mock_lesson2.find_element.return_value = mock_title2
         
-        # Mock wait
-        mock_wait = MagicMock()
-        mock_wait.until.return_value = [mock_lesson1, mock_lesson2]
+        video_downloader.driver.find_elements.return_value = [mock_lesson1, mock_lesson2]
         
-        with patch('video_downloader.WebDriverWait', return_value=mock_wait):
-            lessons = video_downloader.get_all_lessons()
-            
-            assert len(lessons) == 2
-            assert lessons[0] == {'hash': 'hash1', 'title': 'Lesson 1'}
-            assert lessons[1] == {'hash': 'hash2', 'title': 'Lesson 2'}
+        lessons = video_downloader.get_all_lessons()
+        
+        assert len(lessons) == 2
+        assert lessons[0] == {'hash': 'hash1', 'title': 'Lesson 1'}
+        assert lessons[1] == {'hash': 'hash2', 'title': 'Lesson 2'}
+        video_downloader._mock_browser_manager.implicit_wait.assert_called_once_with(10)
     
     def test_download_all_lessons(self, video_downloader):
         """Test downloading all lessons."""
@@ -1070,4 +1544,29 @@ class TestVideoDownloaderLessonDownload:
             assert mock_download.call_count == 3
             mock_download.assert_any_call("https://example.com/video1.m3u8", "001_Lesson 1")
             mock_download.assert_any_call("https://example.com/video2_part1.m3u8", "002_Lesson 2_part1")
-            mock_download.assert_any_call("https://example.com/video2_part2.m3u8", "002_Lesson 2_part2")
\ No newline at end of file
+            mock_download.assert_any_call("https://example.com/video2_part2.m3u8", "002_Lesson 2_part2")
+    
+    def test_download_all_lessons_extracts_while_downloading(self, video_downloader):
+        """Test that the next lesson is extracted while the previous one is still downloading."""
+        lessons = [{'hash': 'hash1', 'title': 'Lesson 1'}, {'hash': 'hash2', 'title': 'Lesson 2'}]
+        second_extracted = threading.Event()
+        
+        def extract(lesson_url):
+            if lesson_url.endswith("hash2"):
+                second_extracted.set()
+            return [("", f"https://example.com/{lesson_url[-5:]}.m3u8")]
+        
+        overlapped = []
+        def download(video_url, filename):
+            # The first download only finishes once the browser has moved on
+            if video_url.endswith("hash1.m3u8"):
+                overlapped.append(second_extracted.wait(5))
+            return True
+        
+        with patch.object(video_downloader, 'extract_video_url', side_effect=extract), \
+             patch.object(video_downloader, 'extract_lesson_description', return_value=None), \
+             patch.object(video_downloader, 'download_video', side_effect=download) as mock_download:
+            video_downloader.download_all_lessons(lessons)
+        
+        assert overlapped == [True]
+        assert mock_download.call_count == 2
\ No newline at end of file
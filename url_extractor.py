@@ -434,9 +434,10 @@ class URLExtractor:
             return video_urls
 
         # Log all URLs for debugging
-        log.debug(f"Found {len(result.get('allUrls', []))} URLs in network requests")
-        for url in result.get('allUrls', []):
-            log.debug(f"  {url}")
+        if log.is_enabled_for(logger.DEBUG):
+            log.debug(f"Found {len(result.get('allUrls', []))} URLs in network requests")
+            for url in result.get('allUrls', []):
+                log.debug(f"  {url}")
 
         # Try different approaches in order of preference
         if URLExtractor._try_found_url(result, video_urls):
@@ -25,8 +25,11 @@ DEFAULT_HEADERS = {
     'Referer': 'https://cf-embed.play.hotmart.com/'
 }
 
-# Regular expression patterns
+# Regular expression patterns, compiled once since they run against every network entry
 HDNTL_PATTERN = r'hdntl=exp=[0-9]+~acl=[/][*]~data=hdntl~hmac=[a-f0-9]+'
+HDNTL_RE = re.compile(HDNTL_PATTERN)
+JWT_TOKEN_RE = re.compile(r'jwtToken=([^&]*)')
+JWT_PARAM_RE = re.compile(r'jwt=([^&]*)')
 
 
 def extract_video_id_from_iframe(iframe_src):
@@ -55,12 +58,23 @@ def extract_jwt_token(iframe_src):
     Returns:
         str: The JWT token if found, None otherwise
     """
-    jwt_token = None
-    if 'jwtToken=' in iframe_src:
-        jwt_token = iframe_src.split('jwtToken=')[1].split('&')[0]
-    elif 'jwt=' in iframe_src:
-        jwt_token = iframe_src.split('jwt=')[1].split('&')[0]
-    return jwt_token
+    match = JWT_TOKEN_RE.search(iframe_src) or JWT_PARAM_RE.search(iframe_src)
+    return match.group(1) if match else None
+
+
+def extract_param(url, marker):
+    """
+    Extract the value following the first occurrence of a query parameter.
+
+    Args:
+        url (str): The URL to search
+        marker (str): Text preceding the value, e.g. 'hdntl=' or '&app='
+
+    Returns:
+        str: The value up to the next '&', or None if the marker is absent
+    """
+    _, found, rest = url.partition(marker)
+    return rest.partition('&')[0] if found else None
 
 
 def extract_auth_token(content):
@@ -74,9 +88,9 @@ def extract_auth_token(content):
         str: The auth token if found, None otherwise
     """
     # Try to match specific regex pattern first
-    matches = re.findall(HDNTL_PATTERN, content)
-    if matches:
-        return matches[0]
+    match = HDNTL_RE.search(content)
+    if match:
+        return match.group(0)
 
     # Fallback to simpler extraction
     if 'hdntl=' in content:
@@ -4,14 +4,18 @@ Video Downloader Module for Hotmart Platform
 This module provides the VideoDownloader class which handles authentication,
 navigation, URL extraction, and video downloading from Hotmart platform.
 """
+import html
 import os
+import shutil
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import m3u8
-import ffmpeg
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3Error
+from urllib3.util.retry import Retry
 import re
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from url_extractor import URLExtractor
 from url_utils import (
@@ -20,16 +24,83 @@ from url_utils import (
     HDNTL_PATTERN,
     extract_video_id_from_iframe,
     extract_jwt_token,
+    extract_param,
     extract_auth_token,
     construct_video_url,
     construct_embed_url
 )
-from browser_manager import BrowserManager
+from browser_manager import BrowserManager, _LazyModule
 
 # Import the logger module
 import logger
 log = logger
 
+# Only HLS downloads need these, and both are slow to import
+m3u8 = _LazyModule("m3u8")
+ffmpeg = _LazyModule("ffmpeg")
+
+# Headers for plain HTTP requests against the Hotmart video CDN
+MP4_HEADERS = {
+    'Origin': 'https://cf-embed.play.hotmart.com',
+    'Referer': 'https://cf-embed.play.hotmart.com/',
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:134.0) Gecko/20100101 Firefox/134.0',
+    'Accept': '*/*',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# ffmpeg output options that remux HLS (H.264/AAC in MPEG-TS) into MP4 without re-encoding;
+# ADTS AAC has to be converted for the MP4 container, and the index goes at the front
+# so players can start before reading the whole file
+HLS_REMUX_OPTIONS = {'c': 'copy', 'bsf:a': 'aac_adtstoasc', 'movflags': '+faststart'}
+
+# Attempts per HLS segment and the base of the exponential backoff between them, in seconds;
+# covers bodies cut off mid-transfer, which the adapter can't retry. Gateway errors are
+# already retried by the session's adapter, so a response with a status is final
+HLS_SEGMENT_ATTEMPTS = 4
+HLS_SEGMENT_BACKOFF = 0.5
+
+# Browser strategies save to "<name><suffix>.mp4" (or ".webm" when a recording
+# can't be converted) and the file only gets its final name once the strategy
+# reports success
+RECORDING_SUFFIX = ".recording"
+RECORDING_EXTENSIONS = (".mp4", ".webm")
+
+# The Hotmart player iframe, and anything that shows a lesson page has rendered its content
+EMBED_IFRAME_SELECTOR = "iframe[src*='cf-embed.play.hotmart.com']"
+LESSON_CONTENT_SELECTOR = f"{EMBED_IFRAME_SELECTOR}, li.playlist-media, .video-part, .chapter-item"
+# src of the player iframe, used to tell when clicking a playlist part has loaded a new video
+EMBED_SRC_SCRIPT = f"var f = document.querySelector(\"{EMBED_IFRAME_SELECTOR}\"); return f ? f.src : null;"
+# The same iframe, and the playlist that marks a multi-part lesson, in server-rendered lesson HTML
+IFRAME_SRC_RE = re.compile(r'<iframe[^>]+src="([^"]*cf-embed\.play\.hotmart\.com[^"]*)"')
+LESSON_PARTS_RE = re.compile(r'class="[^"]*\b(?:playlist-media|video-part|chapter-item)\b')
+# Name of the page's first request carrying an hdntl token, preferring the HLS playlist itself;
+# arguments[0] optionally limits it to requests for one host. Filtering in the page returns one
+# URL rather than every performance entry
+TOKEN_REQUEST_SCRIPT = """
+var host = arguments[0] || '';
+var performance = window.performance || window.mozPerformance || window.msPerformance || window.webkitPerformance || {};
+var names = (performance.getEntries ? performance.getEntries() : []).map(function(entry) {
+    return entry.name;
+}).filter(function(name) {
+    return name.indexOf('hdntl=') !== -1 && name.indexOf(host) !== -1;
+});
+return names.find(function(name) { return name.indexOf('.m3u8') !== -1; }) || names[0] || null;
+"""
+# Characters dropped from lesson titles to make them filesystem-friendly; \w is Unicode-aware
+# like str.isalnum, so accented titles keep their letters
+TITLE_UNSAFE_RE = re.compile(r'[^\w \-]')
+# Auth token and app id query parameters of a CDN URL
+AUTH_TOKEN_PARAM_RE = re.compile(r'hdntl=([^&]+)')
+APP_PARAM_RE = re.compile(r'app=([^&]+)')
+
+# Elements only shown to a logged-in member
+LOGGED_IN_LOCATORS = (
+    (By.CSS_SELECTOR, ".menu-items, .user-menu, .dashboard, .profile, .avatar, .user-profile"),
+    (By.CSS_SELECTOR, ".logout-button, .sidebar, .course-list, .header-user"),
+    (By.CSS_SELECTOR, "a[href*='logout'], button[data-test='logout'], .user-menu"),
+    (By.XPATH, "//*[contains(text(), 'Logout') or contains(text(), 'Sign out') or contains(text(), 'Sair')]")
+)
+
 
 class VideoDownloader:
     """
@@ -37,7 +108,7 @@ class VideoDownloader:
     Handles authentication, navigation, URL extraction, and video downloading.
     """
 
-    def __init__(self, email, password, headless=False, browser_type="chrome", browser_profile=None):
+    def __init__(self, email, password, headless=True, browser_type="chrome", browser_profile=None):
         """
         Initialize the downloader with user credentials.
 
@@ -61,8 +132,36 @@ class VideoDownloader:
         if not os.path.exists(self.download_dir):
             os.makedirs(self.download_dir)
 
-        # Initialize HTTP session
+        # Initialize HTTP session with a single pooled adapter so keep-alive
+        # connections are reused across lessons, parts and worker threads.
+        # Gateway errors from the CDN are retried; once retries run out the last
+        # response is returned so callers still see its status code
         self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=64,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                              raise_on_status=False)
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Number of parallel HTTP Range requests used for direct MP4 downloads
+        self.range_parts = 4
+
+        # Number of HLS segments fetched in parallel before remuxing with ffmpeg
+        self.hls_workers = 8
+
+        # HLS rendition to download: "best", "worst" or a height such as "720p"
+        self.hls_quality = "best"
+
+        # Number of lesson parts download_all_lessons downloads while the browser
+        # moves on to extracting the next lesson
+        self.download_workers = 4
+
+        # Serializes access to the single Selenium driver when lessons are
+        # downloaded from several threads; HTTP downloads run outside it
+        self.browser_lock = threading.RLock()
 
         # Initialize browser manager with specified browser type
         self.browser_manager = BrowserManager(
@@ -81,6 +180,10 @@ class VideoDownloader:
         self.current_lesson_parts = 1
         self.current_video_id = None
         self.current_jwt_token = None
+
+        # Cleared once a lesson page turns out to inject its player with JavaScript,
+        # after which extract_video_url stops fetching lesson HTML over HTTP
+        self.lesson_html_has_player = True
         
         # Video Downloader Helper extension info (for Firefox)
         self.vdh_extension_installed = False
@@ -130,13 +233,15 @@ class VideoDownloader:
         Returns:
             bool: True if login successful, False otherwise
         """
+        if self._resume_session():
+            return True
+
         try:
             log.info("Navigating to login page")
             self.driver.get(self.login_url)
-            wait = WebDriverWait(self.driver, 30)  # Increased timeout
 
-            # Wait for page to load completely
-            time.sleep(8)  # Increased wait time
+            # Wait for page to load completely; the form fields below have their own waits
+            self.browser_manager.wait_for_ready()
 
             # Handle cookie policy popup if it exists
             self.browser_manager.handle_cookie_policy_popup()
@@ -208,18 +313,20 @@ class VideoDownloader:
 
             # Wait for login to complete
             log.info("Waiting for login to complete")
-            time.sleep(10)  # Increased wait time
+            try:
+                self._wait(10).until(lambda d: "login" not in d.current_url.lower())
+            except Exception:
+                pass  # Still on the login page; the checks below report why
             
             # Check for login errors or invalid credentials
             error_elements = self.driver.find_elements(By.XPATH, 
                 "//*[contains(text(), 'Invalid') or contains(text(), 'incorrect') or contains(text(), 'failed')]")
             
-            for error in error_elements:
-                if error.is_displayed():
-                    error_text = error.text.strip()
-                    if error_text and ("invalid" in error_text.lower() or "incorrect" in error_text.lower()):
-                        log.error(f"Login failed: {error_text}")
-                        return False
+            for error in self.browser_manager.visible_elements(error_elements):
+                error_text = error.text.strip()
+                if error_text and ("invalid" in error_text.lower() or "incorrect" in error_text.lower()):
+                    log.error(f"Login failed: {error_text}")
+                    return False
             
             # Check if we're still on the login page
             if "login" in self.driver.current_url.lower():
@@ -229,24 +336,20 @@ class VideoDownloader:
             # Check if we can find elements that should be present after login
             try:
                 # Look for a wider range of elements that would typically be present after successful login
-                WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_any_element_located([
-                        (By.CSS_SELECTOR, ".menu-items, .user-menu, .dashboard, .profile, .avatar, .user-profile"),
-                        (By.CSS_SELECTOR, ".logout-button, .sidebar, .course-list, .header-user"),
-                        (By.CSS_SELECTOR, "a[href*='logout'], button[data-test='logout'], .user-menu"),
-                        (By.XPATH, "//*[contains(text(), 'Logout') or contains(text(), 'Sign out') or contains(text(), 'Sair')]")
-                    ])
-                )
+                self._wait(5).until(self._logged_in_condition())
             except Exception as e:
                 # Don't fail immediately - check if we're NOT on the login page anymore
                 if "login" not in self.driver.current_url.lower():
                     log.info("Login appears successful (redirected from login page)")
+                    self._transfer_cookies_to_session()
+                    self.browser_manager.save_session()
                     return True
                 log.error(f"Login likely failed: Could not find post-login elements: {e}")
                 return False
                 
             # Transfer cookies from Selenium to requests session
             self._transfer_cookies_to_session()
+            self.browser_manager.save_session()
             log.info("Login successful")
 
             return True
@@ -255,15 +358,89 @@ class VideoDownloader:
             log.error(f"Login failed: {str(e)}", exc_info=True)
             return False
 
+    def _wait(self, timeout):
+        """
+        Get the browser manager's WebDriverWait for the current driver.
+
+        Args:
+            timeout (int): Maximum time to wait (seconds)
+
+        Returns:
+            WebDriverWait: Wait bound to the browser's driver
+        """
+        return self.browser_manager._wait(timeout)
+
+    @staticmethod
+    def _logged_in_condition():
+        """Wait condition that holds once any logged-in-only element is present."""
+        return EC.any_of(*(EC.presence_of_element_located(locator) for locator in LOGGED_IN_LOCATORS))
+
+    def _resume_session(self):
+        """
+        Reuse a session from an earlier run instead of filling in the login form.
+
+        The browser restores cookies saved when the last run closed, or keeps them
+        in its profile; if the site still treats them as logged in, login is skipped.
+
+        Returns:
+            bool: True if the restored session is logged in, False otherwise
+        """
+        if not self.browser_manager.has_saved_session():
+            return False
+        return self._check_session()
+
+    def login_with_cookies(self, cookies):
+        """
+        Log in with cookies from another logged-in browser, e.g. to run several in parallel.
+
+        Falls back to the login form if the site doesn't accept the cookies.
+
+        Args:
+            cookies (list): WebDriver cookies from the logged-in browser
+
+        Returns:
+            bool: True if login successful, False otherwise
+        """
+        self.browser_manager.add_cookies(cookies)
+        return self._check_session() or self.login()
+
+    def _check_session(self):
+        """
+        Check whether the browser's current cookies are logged in to the site.
+
+        Returns:
+            bool: True if logged in, in which case the cookies are copied to the HTTP session
+        """
+        try:
+            self.driver.get(self.base_url)
+            self.browser_manager.wait_for_ready()
+            if "login" in self.driver.current_url.lower():
+                log.debug("Session cookies are no longer logged in")
+                return False
+            self._wait(5).until(self._logged_in_condition())
+        except Exception as e:
+            log.debug(f"Could not reuse session: {e}")
+            return False
+
+        self._transfer_cookies_to_session()
+        log.info("Reusing existing login session")
+        return True
+
     def _transfer_cookies_to_session(self):
         """Transfer cookies from Selenium to requests session."""
+        # Build the cookies up front and merge them in one update, keeping their
+        # secure flag and expiry so the session drops them when the browser would
+        jar = requests.cookies.RequestsCookieJar()
         for cookie in self.driver.get_cookies():
-            self.session.cookies.set(
+            jar.set_cookie(requests.cookies.create_cookie(
                 name=cookie['name'],
                 value=cookie['value'],
                 domain=cookie.get('domain', ''),
-                path=cookie.get('path', '/')
-            )
+                path=cookie.get('path', '/'),
+                secure=cookie.get('secure', False),
+                expires=cookie.get('expiry')
+            ))
+        self.session.cookies.update(jar)
 
     def get_video_parts(self):
         """
@@ -273,11 +450,8 @@ class VideoDownloader:
             list: List of video part elements, or empty list if none found
         """
         try:
-            wait = WebDriverWait(self.driver, 10)
-            parts = wait.until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "li.playlist-media"))
-            )
-            return parts
+            with self.browser_manager.implicit_wait(10):
+                return self.driver.find_elements(By.CSS_SELECTOR, "li.playlist-media")
         except Exception:
             # Return empty list if no parts found (single video lesson)
             return []
@@ -319,16 +493,32 @@ class VideoDownloader:
         1. It navigates to the lesson page, which is critical for the direct recording method
         2. It attempts to extract URLs as a fallback, but our primary approach will be direct recording
 
+        Before that, a single-video lesson whose HTML already holds the player
+        iframe is tried with the HTTP-only approaches. If they find no URL, the
+        lesson is loaded in the browser and every approach runs as usual.
+
         Args:
             lesson_url (str): URL of the lesson page
 
         Returns:
             list: List of tuples (part_suffix, video_url)
         """
+        # Single-video lessons rendered server-side skip the browser when the video URL
+        # can be had over HTTP; anything else loads the lesson in the browser as usual
+        iframe_src = self._fetch_iframe_src_via_requests(lesson_url)
+        if iframe_src:
+            self.current_lesson_url = lesson_url
+            self.current_lesson_title = None
+            self.current_lesson_parts = 1
+            video_url = self._extract_url_from_iframe_src(iframe_src, use_browser=False)
+            if video_url:
+                return [("", video_url)]
+            log.debug("No URL found from the fetched lesson page, loading it in the browser")
+
         try:
             log.info(f"Navigating to lesson page: {lesson_url}")
             self.driver.get(lesson_url)
-            time.sleep(8)  # Increased wait time for page to fully load
+            self._wait_for_lesson_page()
 
             # DIRECT RECORDING PREPARATION
             # Since we're going to try direct recording first as our main strategy,
@@ -405,8 +595,9 @@ class VideoDownloader:
                         log.debug(f"Clicking on part element to navigate to part {part_idx}")
                         try:
                             # Use JavaScript click for better reliability
+                            previous_src = self.driver.execute_script(EMBED_SRC_SCRIPT)
                             self.driver.execute_script("arguments[0].click();", part_element)
-                            time.sleep(4)  # Wait for the part to load
+                            self._wait_for_part_change(previous_src)
                         except Exception as e:
                             log.warning(f"Error clicking on part {part_idx}: {str(e)}")
                             continue
@@ -449,6 +640,68 @@ class VideoDownloader:
             # Even on error, return a placeholder to try direct recording
             return [("", f"direct-recording://{lesson_url}")]
             
+    def _fetch_iframe_src_via_requests(self, lesson_url):
+        """
+        Read the player iframe src from the lesson HTML over the logged-in HTTP session.
+
+        The first page without the iframe in its HTML shows the course renders its
+        player client-side, so later lessons aren't fetched at all.
+
+        Args:
+            lesson_url (str): URL of the lesson page
+
+        Returns:
+            str: The iframe src, or None if the page injects the player with JavaScript,
+                lists several parts, or could not be fetched
+        """
+        if not self.lesson_html_has_player:
+            return None
+        try:
+            response = self.session.get(lesson_url, timeout=15)
+        except requests.RequestException as e:
+            log.debug(f"Could not fetch lesson page over HTTP: {e}")
+            return None
+        if not response.ok:
+            return None
+
+        match = IFRAME_SRC_RE.search(response.text)
+        if not match:
+            log.debug("Lesson HTML has no player iframe, leaving lessons to the browser")
+            self.lesson_html_has_player = False
+            return None
+        # Each part of a multi-part lesson has to be clicked in the browser
+        if LESSON_PARTS_RE.search(response.text):
+            return None
+        log.debug("Found player iframe in the lesson HTML")
+        return html.unescape(match.group(1))
+
+    def _wait_for_lesson_page(self, timeout=8):
+        """
+        Wait until a freshly loaded lesson page has rendered its player or playlist.
+
+        Args:
+            timeout (int): Maximum time to wait for the lesson content (seconds)
+        """
+        self.browser_manager.wait_for_ready()
+        self.browser_manager.wait_for_element(By.CSS_SELECTOR, LESSON_CONTENT_SELECTOR, timeout=timeout)
+
+    def _wait_for_part_change(self, previous_src, timeout=4):
+        """
+        Wait for the player iframe to switch videos after clicking a playlist part.
+
+        The first part is usually already loaded, so a timeout is not an error.
+
+        Args:
+            previous_src (str): Player iframe src before the click
+            timeout (int): Maximum time to wait (seconds)
+        """
+        try:
+            self._wait(timeout).until(
+                lambda d: d.execute_script(EMBED_SRC_SCRIPT) not in (None, previous_src)
+            )
+        except Exception:
+            log.debug("Player iframe src unchanged after clicking part")
+
     def _extract_single_video_url(self):
         """
         Extract video URL from the currently loaded page.
@@ -458,7 +711,7 @@ class VideoDownloader:
             str: Video URL if found, None otherwise
         """
         try:
-            wait = WebDriverWait(self.driver, 15)
+            wait = self._wait(15)
             
             # Find the iframe
             log.info("Looking for video iframe in page")
@@ -470,50 +723,70 @@ class VideoDownloader:
                 # Extract video ID and JWT token from iframe src
                 iframe_src = iframe.get_attribute('src')
                 log.info(f"Found iframe with src")
-                log.debug(f"Iframe src: {iframe_src[:100]}...")
+                return self._extract_url_from_iframe_src(iframe_src)
+            except Exception as e:
+                log.warning(f"Could not find or process iframe: {str(e)}")
+                
+            return None
+            
+        except Exception as e:
+            log.error(f"Error extracting video URL: {str(e)}", exc_info=True)
+            return None
 
-                video_id = URLExtractor.extract_video_id_from_iframe(iframe_src)
-                log.debug(f"Found video ID: {video_id}")
+    def _extract_url_from_iframe_src(self, iframe_src, use_browser=True):
+        """
+        Find the video URL for a player iframe, trying each extraction approach in turn.
 
-                if video_id:
-                    # Extract JWT token if present
-                    jwt_token = self._extract_jwt_token(iframe_src)
+        Args:
+            iframe_src (str): src of the Hotmart player iframe
+            use_browser (bool): Whether approaches that navigate the browser may run;
+                without it only the HTTP API calls are tried
 
-                    # Store for our direct recording method
-                    self.current_video_id = video_id
-                    self.current_jwt_token = jwt_token
+        Returns:
+            str: Video URL if found, None otherwise
+        """
+        log.debug(f"Iframe src: {iframe_src[:100]}...")
 
-                    # Try different methods to get the video URL
-                    video_urls = self._try_jwt_token_approach(video_id, jwt_token)
-                    if video_urls:
-                        return video_urls[0][1]  # Return the URL from the first tuple
+        video_id = URLExtractor.extract_video_id_from_iframe(iframe_src)
+        log.debug(f"Found video ID: {video_id}")
 
-                    video_urls = self._try_api_approach(video_id, jwt_token)
-                    if video_urls:
-                        return video_urls[0][1]
+        if not video_id:
+            log.warning("Could not extract video ID from iframe src")
+            return None
 
-                    video_urls = self._try_javascript_extraction(self.current_lesson_url, video_id, jwt_token)
-                    if video_urls:
-                        return video_urls[0][1]
+        # Extract JWT token if present
+        jwt_token = self._extract_jwt_token(iframe_src)
 
-                    video_urls = self._try_direct_embed_approach(video_id, jwt_token, self.current_lesson_url)
-                    if video_urls:
-                        return video_urls[0][1]
+        # Store for our direct recording method
+        self.current_video_id = video_id
+        self.current_jwt_token = jwt_token
 
-                    video_urls = self._try_network_requests_approach(video_id, jwt_token)
-                    if video_urls:
-                        return video_urls[0][1]
-                else:
-                    log.warning("Could not extract video ID from iframe src")
-            except Exception as e:
-                log.warning(f"Could not find or process iframe: {str(e)}")
-                
-            return None
-            
-        except Exception as e:
-            log.error(f"Error extracting video URL: {str(e)}", exc_info=True)
+        # Try different methods to get the video URL
+        video_urls = self._try_jwt_token_approach(video_id, jwt_token, load_embed=use_browser)
+        if video_urls:
+            return video_urls[0][1]  # Return the URL from the first tuple
+
+        video_urls = self._try_api_approach(video_id, jwt_token)
+        if video_urls:
+            return video_urls[0][1]
+
+        if not use_browser:
             return None
 
+        video_urls = self._try_javascript_extraction(self.current_lesson_url, video_id, jwt_token)
+        if video_urls:
+            return video_urls[0][1]
+
+        video_urls = self._try_direct_embed_approach(video_id, jwt_token, self.current_lesson_url)
+        if video_urls:
+            return video_urls[0][1]
+
+        video_urls = self._try_network_requests_approach(video_id, jwt_token)
+        if video_urls:
+            return video_urls[0][1]
+
+        return None
+
     def extract_lesson_description(self, lesson_url=None):
         """
         Extract the text description of a video lesson.
@@ -537,7 +810,7 @@ class VideoDownloader:
             if url_to_use != current_url:
                 log.info(f"Navigating to lesson page: {url_to_use}")
                 self.driver.get(url_to_use)
-                time.sleep(5)  # Wait for page to load
+                self._wait_for_lesson_page()
                 
             # Try multiple selectors that might contain the description content
             description_selectors = [
@@ -671,8 +944,8 @@ class VideoDownloader:
             log.debug(f"JWT token: {jwt_token[:15]}...")
         return jwt_token
 
-    def _try_jwt_token_approach(self, video_id, jwt_token):
-        """Try to get video URL using JWT token."""
+    def _try_jwt_token_approach(self, video_id, jwt_token, load_embed=True):
+        """Try to get video URL using JWT token, loading the embed page in the browser if load_embed is set."""
         if not jwt_token:
             return []
 
@@ -700,6 +973,9 @@ class VideoDownloader:
             except:
                 pass
 
+        if not load_embed:
+            return []
+
         # If direct API call fails, try to load the embed page with the JWT token
         log.info("Direct API call failed. Trying to load embed page with JWT token")
         embed_url = construct_embed_url(video_id, jwt_token)
@@ -707,47 +983,49 @@ class VideoDownloader:
         # Load the embed page in the browser to capture network requests
         log.debug(f"Loading embed page in browser for network request capture")
         self.driver.get(embed_url)
-        time.sleep(5)  # Wait for page to load
 
-        # Execute JavaScript to get all network requests
-        script = """
-        var performance = window.performance || window.mozPerformance || window.msPerformance || window.webkitPerformance || {};
-        var network = performance.getEntries() || [];
-        return network.filter(function(entry) {
-            return entry.name.indexOf('vod-akm.play.hotmart.com') !== -1;
-        }).map(function(entry) {
-            return entry.name;
-        });
-        """
+        request = self._wait_for_token_request("vod-akm.play.hotmart.com")
+        if not request:
+            log.debug("No tokenized request to the Hotmart CDN found")
+            return []
 
-        network_requests = self.driver.execute_script(script)
-        log.debug(f"Found {len(network_requests)} network requests to Hotmart CDN")
-
-        # Look for m3u8 URLs with hdntl token
-        for request in network_requests:
-            log.debug(f"Network request found: {request[:100]}...")
-            if 'hdntl=' in request and '.m3u8' in request:
-                log.info("Found m3u8 URL with hdntl token")
-                video_urls.append(("", request))
-                return video_urls
-
-        # If we didn't find a direct m3u8 URL, look for any URL with hdntl token
-        for request in network_requests:
-            if 'hdntl=' in request:
-                log.debug("Found URL with hdntl token")
-                log.debug(f"Token URL: {request[:100]}...")
-                # Extract the hdntl token
-                token = extract_auth_token(request)
-
-                if token:
-                    direct_url = construct_video_url(video_id, token)
-                    log.info("Successfully constructed URL with token from network request")
-                    log.debug(f"URL: {direct_url[:100]}...")
-                    video_urls.append(("", direct_url))
-                    return video_urls
+        # An m3u8 URL with the hdntl token can be used as is
+        if '.m3u8' in request:
+            log.info("Found m3u8 URL with hdntl token")
+            video_urls.append(("", request))
+            return video_urls
+
+        # Otherwise build the URL from the token
+        log.debug("Found URL with hdntl token")
+        log.debug(f"Token URL: {request[:100]}...")
+        token = extract_auth_token(request)
+
+        if token:
+            direct_url = construct_video_url(video_id, token)
+            log.info("Successfully constructed URL with token from network request")
+            log.debug(f"URL: {direct_url[:100]}...")
+            video_urls.append(("", direct_url))
+            return video_urls
 
         return []
 
+    def _wait_for_token_request(self, host='', timeout=8):
+        """
+        Poll the page's network entries until the player has requested a tokenized URL.
+
+        Args:
+            host (str): Only consider requests whose URL contains this, e.g. a CDN host
+            timeout (int): Maximum time to wait for an hdntl= request (seconds)
+
+        Returns:
+            str: URL of the request, preferring an m3u8 playlist, or None on timeout
+        """
+        try:
+            return self._wait(timeout).until(lambda d: d.execute_script(TOKEN_REQUEST_SCRIPT, host))
+        except Exception:
+            log.debug("No tokenized network request seen before the timeout")
+            return None
+
     def _try_api_approach(self, video_id, jwt_token):
         """Try to get video URL using API methods."""
         log.info("Trying API method to get video URL")
@@ -762,15 +1040,15 @@ class VideoDownloader:
         """Try to extract video URL using JavaScript injection."""
         log.info("API method failed. Switching to iframe for JavaScript extraction")
 
-        # Navigate back to the lesson page
-        self.driver.get(lesson_url)
-        time.sleep(5)
+        # Only navigate back if an earlier approach left the lesson page, e.g. for the embed page
+        if self.driver.current_url != lesson_url:
+            self.driver.get(lesson_url)
 
         # Handle any cookie policy popups before interacting with the page
         self.browser_manager.handle_cookie_policy_popup()
 
         # Find the iframe again
-        wait = WebDriverWait(self.driver, 15)
+        wait = self._wait(15)
         iframe = wait.until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "iframe[src*='cf-embed.play.hotmart.com']"))
         )
@@ -790,9 +1068,6 @@ class VideoDownloader:
             }
         """, iframe)
 
-        # Wait a bit after removing overlays
-        time.sleep(1)
-
         # Now switch to the iframe
         self.driver.switch_to.frame(iframe)
 
@@ -862,36 +1137,22 @@ class VideoDownloader:
         log.debug(f"Embed URL: {embed_url}")
 
         self.driver.get(embed_url)
-        time.sleep(5)  # Wait for page to load
 
-        # Execute JavaScript to get network requests
-        script = """
-        var performance = window.performance || window.mozPerformance || window.msPerformance || window.webkitPerformance || {};
-        var network = performance.getEntries() || [];
-        return network.filter(function(entry) {
-            return entry.name.indexOf('hdntl=') !== -1;
-        }).map(function(entry) {
-            return entry.name;
-        });
-        """
+        request = self._wait_for_token_request()
+        if not request:
+            return []
 
-        network_requests = self.driver.execute_script(script)
-        video_urls = []
+        log.debug("Found network request with hdntl token")
+        log.debug(f"Request: {request[:100]}...")
+        # Extract the token
+        token = extract_auth_token(request)
 
-        for request in network_requests:
-            if 'hdntl=' in request:
-                log.debug("Found network request with hdntl token")
-                log.debug(f"Request: {request[:100]}...")
-                # Extract the token
-                token = extract_auth_token(request)
-
-                if token:
-                    log.debug(f"Extracted token: {token[:50] if len(token) > 50 else token}...")
-                    direct_url = construct_video_url(video_id, token)
-                    log.info("Successfully constructed URL with token from network request")
-                    log.debug(f"URL: {direct_url[:100]}...")
-                    video_urls.append(("", direct_url))
-                    return video_urls
+        if token:
+            log.debug(f"Extracted token: {token[:50] if len(token) > 50 else token}...")
+            direct_url = construct_video_url(video_id, token)
+            log.info("Successfully constructed URL with token from network request")
+            log.debug(f"URL: {direct_url[:100]}...")
+            return [("", direct_url)]
 
         return []
 
@@ -899,6 +1160,10 @@ class VideoDownloader:
         """
         Download video from URL.
 
+        Browser-based strategies are serialized through ``browser_lock`` so this
+        method can be called from several threads; the plain HTTP fallbacks run
+        without holding the lock.
+
         Args:
             video_url (str): URL of the video to download
             filename (str): Filename to save the video as
@@ -907,51 +1172,16 @@ class VideoDownloader:
             bool: True if download successful, False otherwise
         """
         try:
-            # Firefox JavaScript compatibility fix - we need to modify all scripts to avoid 'await'
-            # outside of async functions, which Firefox doesn't support in execute_script
-            if self.browser_type == "firefox":
-                log.debug("Applying Firefox JavaScript compatibility fixes")
-                self._apply_firefox_js_fixes()
-                
-            # If Video Downloader Helper extension is available (Firefox), use it first
-            if self.vdh_extension_installed:
-                log.info(f"Attempting to download {filename} using Video Downloader Helper extension")
-                if self._try_video_downloader_helper(video_url, filename):
-                    log.info(f"Successfully downloaded {filename} using Video Downloader Helper extension")
-                    return True
-            
-            # Check if this is a direct recording URL (our new special indicator)
-            if video_url.startswith('direct-recording://'):
-                log.info(f"Using pure direct recording approach for {filename}")
-                # We're already on the page we need to be on from the extract_video_url method
-                # So we'll just start the recording directly
-                if self._try_simple_direct_recording(filename):
-                    log.info(f"Successfully downloaded {filename} using simplified direct recording")
+            if '.mp4' in video_url:
+                if self._complete_existing_mp4(video_url, filename):
                     return True
-                
-                # If that fails, try other recording methods
-                log.debug("Simple direct recording failed, trying alternative recording methods")
-            
-            # IMPROVED APPROACH: Everything is done in a single browser tab
-            # to preserve the authentication context
-            if self._try_optimized_browser_recording(video_url, filename):
-                return True
-                
-            # If the optimized method fails, try our previous methods in sequence
-            # First try the helper approach - this most closely mimics Video Download Helper's method
-            if self._try_helper_approach(video_url, filename):
-                log.info(f"Successfully downloaded {filename} using Video Download Helper approach")
-                return True
-                
-            # Try direct page navigation approach - which works even with strict CDN protection
-            if self._try_direct_page_navigation_download(filename):
-                log.info(f"Successfully downloaded {filename} using direct page navigation")
-                return True
-            
-            # Try browser-based download with the provided URL
-            if self._try_browser_download(video_url, filename):
+            elif self._has_completed_download(filename):
                 return True
 
+            with self.browser_lock:
+                if self._save_from_browser(self._try_browser_strategies, video_url, filename):
+                    return True
+
             # Fallback to regular methods if browser download fails
             if '.m3u8' in video_url or '/hls/' in video_url:
                 log.info(f"Detected HLS stream format for {filename}")
@@ -960,13 +1190,14 @@ class VideoDownloader:
                 except Exception as e:
                     log.error(f"Standard HLS download failed: {str(e)}")
                     # If standard HLS fails, try direct recording as last resort
-                    if self._try_direct_browser_recording(filename):
-                        log.info(f"Successfully recorded {filename} directly from browser")
-                        return True
+                    with self.browser_lock:
+                        if self._save_from_browser(self._try_direct_browser_recording, filename):
+                            log.info(f"Successfully recorded {filename} directly from browser")
+                            return True
                     return False
             elif '.mp4' in video_url:
                 log.info(f"Detected MP4 format for {filename}")
-                self._download_mp4(video_url, filename)
+                self.download_video_ranged(video_url, filename, parts=self.range_parts)
             else:
                 log.info(f"Unknown format, defaulting to HLS for {filename}")
                 try:
@@ -974,9 +1205,10 @@ class VideoDownloader:
                 except Exception as e:
                     log.error(f"Standard HLS download failed: {str(e)}")
                     # If standard HLS fails, try direct recording as last resort
-                    if self._try_direct_browser_recording(filename):
-                        log.info(f"Successfully recorded {filename} directly from browser")
-                        return True
+                    with self.browser_lock:
+                        if self._save_from_browser(self._try_direct_browser_recording, filename):
+                            log.info(f"Successfully recorded {filename} directly from browser")
+                            return True
                     return False
             return True
 
@@ -985,14 +1217,126 @@ class VideoDownloader:
             
             # Last resort: try direct browser recording
             try:
-                if self._try_direct_browser_recording(filename):
-                    log.info(f"Successfully recorded {filename} directly from browser")
-                    return True
+                with self.browser_lock:
+                    if self._save_from_browser(self._try_direct_browser_recording, filename):
+                        log.info(f"Successfully recorded {filename} directly from browser")
+                        return True
             except Exception as record_err:
                 log.error(f"Direct recording also failed: {str(record_err)}")
                 
             return False
+
+    def _save_from_browser(self, strategy, *args):
+        """
+        Run a browser strategy that saves under a temporary name, then move its file into place.
+
+        Browser recordings and ffmpeg conversions write their output directly,
+        so a crash part way through would otherwise leave a truncated file under
+        the final name that _has_completed_download takes as finished.
+
+        Args:
+            strategy (callable): Strategy taking ``*args`` followed by the filename
+            *args: Leading arguments for the strategy, the filename last
+
+        Returns:
+            bool: The strategy's result
+        """
+        *leading, filename = args
+        paths = [
+            (os.path.join(self.download_dir, f"{filename}{RECORDING_SUFFIX}{ext}"),
+             os.path.join(self.download_dir, f"{filename}{ext}"))
+            for ext in RECORDING_EXTENSIONS
+        ]
+
+        succeeded = False
+        try:
+            succeeded = strategy(*leading, f"{filename}{RECORDING_SUFFIX}")
+        finally:
+            if not succeeded:
+                for partial_path, _ in paths:
+                    if os.path.exists(partial_path):
+                        os.remove(partial_path)
+
+        if succeeded:
+            for partial_path, final_path in paths:
+                if os.path.exists(partial_path):
+                    os.replace(partial_path, final_path)
+        return succeeded
+
+    def _try_browser_strategies(self, video_url, filename):
+        """
+        Try the download strategies that drive the shared browser.
+        Callers must hold ``browser_lock``.
+
+        Args:
+            video_url (str): URL of the video to download
+            filename (str): Filename to save the video as
+
+        Returns:
+            bool: True if one of the browser strategies succeeded, False otherwise
+        """
+        # Firefox JavaScript compatibility fix - we need to modify all scripts to avoid 'await'
+        # outside of async functions, which Firefox doesn't support in execute_script
+        if self.browser_type == "firefox":
+            log.debug("Applying Firefox JavaScript compatibility fixes")
+            self._apply_firefox_js_fixes()
+            
+        # If Video Downloader Helper extension is available (Firefox), use it first
+        if self.vdh_extension_installed:
+            log.info(f"Attempting to download {filename} using Video Downloader Helper extension")
+            if self._try_video_downloader_helper(video_url, filename):
+                log.info(f"Successfully downloaded {filename} using Video Downloader Helper extension")
+                return True
+        
+        # Check if this is a direct recording URL (our new special indicator)
+        if video_url.startswith('direct-recording://'):
+            log.info(f"Using pure direct recording approach for {filename}")
+            # Another thread may have moved the browser to a different lesson
+            # since this URL was extracted, so make sure we're on the right page
+            self._restore_lesson_context(video_url)
+            if self._try_simple_direct_recording(filename):
+                log.info(f"Successfully downloaded {filename} using simplified direct recording")
+                return True
+            
+            # If that fails, try other recording methods
+            log.debug("Simple direct recording failed, trying alternative recording methods")
+        
+        # IMPROVED APPROACH: Everything is done in a single browser tab
+        # to preserve the authentication context
+        if self._try_optimized_browser_recording(video_url, filename):
+            return True
+            
+        # If the optimized method fails, try our previous methods in sequence
+        # First try the helper approach - this most closely mimics Video Download Helper's method
+        if self._try_helper_approach(video_url, filename):
+            log.info(f"Successfully downloaded {filename} using Video Download Helper approach")
+            return True
             
+        # Try direct page navigation approach - which works even with strict CDN protection
+        if self._try_direct_page_navigation_download(filename):
+            log.info(f"Successfully downloaded {filename} using direct page navigation")
+            return True
+        
+        # Try browser-based download with the provided URL
+        return self._try_browser_download(video_url, filename)
+
+    def _restore_lesson_context(self, video_url):
+        """
+        Navigate back to the lesson encoded in a direct-recording placeholder URL
+        if the browser is currently on a different lesson.
+
+        Args:
+            video_url (str): A ``direct-recording://`` placeholder URL
+        """
+        lesson_url = video_url[len('direct-recording://'):].split('?part=')[0]
+        if self.current_lesson_url is None or lesson_url == self.current_lesson_url:
+            return
+
+        log.debug(f"Restoring lesson context: {lesson_url}")
+        self.driver.get(lesson_url)
+        self._wait_for_lesson_page()
+        self.current_lesson_url = lesson_url
+
     def _try_browser_download(self, video_url, filename):
         """
         Try to download the video using the browser's network capabilities.
@@ -1552,13 +1896,13 @@ class VideoDownloader:
             auth_token = None
             
             if 'app=' in video_url:
-                app_param_match = re.search(r'app=([^&]+)', video_url)
+                app_param_match = APP_PARAM_RE.search(video_url)
                 if app_param_match:
                     app_param = app_param_match.group(1)
                     log.debug(f"Found app parameter: {app_param}")
                     
             if 'hdntl=' in video_url:
-                auth_token_match = re.search(r'hdntl=([^&]+)', video_url)
+                auth_token_match = AUTH_TOKEN_PARAM_RE.search(video_url)
                 if auth_token_match:
                     auth_token = auth_token_match.group(1)
                     log.debug(f"Found hdntl token: {auth_token[:30]}...")
@@ -3945,12 +4289,12 @@ class VideoDownloader:
                 app_param = None
                 
                 if 'hdntl=' in video_url:
-                    auth_token_match = re.search(r'hdntl=([^&]+)', video_url)
+                    auth_token_match = AUTH_TOKEN_PARAM_RE.search(video_url)
                     if auth_token_match:
                         auth_token = auth_token_match.group(1)
                 
                 if 'app=' in video_url:
-                    app_param_match = re.search(r'app=([^&]+)', video_url)
+                    app_param_match = APP_PARAM_RE.search(video_url)
                     if app_param_match:
                         app_param = app_param_match.group(1)
                 
@@ -4777,12 +5121,12 @@ class VideoDownloader:
                     app_param = None
                     
                     if 'hdntl=' in video_url:
-                        auth_token_match = re.search(r'hdntl=([^&]+)', video_url)
+                        auth_token_match = AUTH_TOKEN_PARAM_RE.search(video_url)
                         if auth_token_match:
                             auth_token = auth_token_match.group(1)
                     
                     if 'app=' in video_url:
-                        app_param_match = re.search(r'app=([^&]+)', video_url)
+                        app_param_match = APP_PARAM_RE.search(video_url)
                         if app_param_match:
                             app_param = app_param_match.group(1)
                     
@@ -5201,14 +5545,8 @@ class VideoDownloader:
             video_url (str): URL of the MP4 video
             filename (str): Filename to save the video as
         """
-        # Use authenticated session instead of direct requests
-        headers = {
-            'Origin': 'https://cf-embed.play.hotmart.com',
-            'Referer': 'https://cf-embed.play.hotmart.com/',
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:134.0) Gecko/20100101 Firefox/134.0',
-            'Accept': '*/*',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
+        # Use the pooled, authenticated session instead of direct requests
+        headers = dict(MP4_HEADERS)
         
         # Check if this URL contains an authorization token
         log.debug(f"Downloading MP4 using authenticated session: {video_url[:100]}...")
@@ -5308,22 +5646,176 @@ class VideoDownloader:
         
         # Use the clean URL without the token in the query string
         response = self.session.get(clean_url, stream=True, headers=headers)
-        
-        if response.status_code != 200:
-            log.error(f"MP4 download failed with status code: {response.status_code}")
-            log.error(f"Response headers: {dict(response.headers)}")
-            raise Exception(f"MP4 download failed: HTTP {response.status_code}")
-            
-        total_size = int(response.headers.get('content-length', 0))
-        log.debug(f"Content length: {total_size} bytes")
 
+        # Closing the response hands its keep-alive connection back to the pool,
+        # including when the status check or the copy fails
+        with response:
+            if response.status_code != 200:
+                log.error(f"MP4 download failed with status code: {response.status_code}")
+                log.error(f"Response headers: {dict(response.headers)}")
+                raise Exception(f"MP4 download failed: HTTP {response.status_code}")
+
+            filepath = os.path.join(self.download_dir, f"{filename}.mp4")
+            block_size = 1 << 20  # 1 Mebibyte, matched by the file buffer to keep write syscalls large
+
+            # Let urllib3 undo any Content-Encoding, as iter_content would have
+            response.raw.decode_content = True
+            with open(filepath, 'wb', buffering=block_size) as file:
+                shutil.copyfileobj(response.raw, file, block_size)
+                # Sync once at the end rather than per chunk
+                file.flush()
+                os.fsync(file.fileno())
+                
+        log.info(f"MP4 download completed: {filepath}")
+
+    def _has_completed_download(self, filename):
+        """
+        Check whether a stream was already saved by an earlier run.
+
+        Nothing writes a stream to its final name directly: _download_hls and
+        download_video_ranged use ``.part.mp4`` and the browser strategies go
+        through _save_from_browser, and each renames the file only once it is
+        complete. So any non-empty file with the final name is finished, whether
+        it is an MP4 or a browser recording that could only be kept as WebM.
+
+        Args:
+            filename (str): Filename the video is saved as
+
+        Returns:
+            bool: True if the video is already on disk
+        """
+        for ext in RECORDING_EXTENSIONS:
+            filepath = os.path.join(self.download_dir, f"{filename}{ext}")
+            if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
+                log.info(f"Skipping already complete download: {filepath}")
+                return True
+        return False
+
+    def _complete_existing_mp4(self, video_url, filename):
+        """
+        Skip or resume a direct MP4 download that is already on disk.
+
+        The local file size is compared with the server's Content-Length. A
+        partial file is completed with a Range request when the server supports
+        it; anything else is left for a fresh download.
+
+        Args:
+            video_url (str): URL of the MP4 video
+            filename (str): Filename the video is saved as
+
+        Returns:
+            bool: True if the file on disk is now complete, False otherwise
+        """
         filepath = os.path.join(self.download_dir, f"{filename}.mp4")
-        block_size = 1024  # 1 Kibibyte
+        if not os.path.exists(filepath):
+            return False
+
+        have = os.path.getsize(filepath)
+        try:
+            head = self.session.head(video_url, headers=MP4_HEADERS, allow_redirects=True)
+            want = int(head.headers.get('Content-Length', -1)) if head.status_code == 200 else -1
+            accepts_ranges = 'bytes' in str(head.headers.get('Accept-Ranges', ''))
+        except Exception as e:
+            log.debug(f"HEAD request failed, not checking existing file: {str(e)}")
+            return False
+
+        if have == want:
+            log.info(f"Skipping already complete download: {filepath}")
+            return True
+
+        if not (0 < have < want and accepts_ranges):
+            return False
+
+        log.info(f"Resuming {filepath} from byte {have} of {want}")
+        try:
+            resume_headers = dict(MP4_HEADERS, Range=f"bytes={have}-")
+            with self.session.get(video_url, headers=resume_headers, stream=True) as response:
+                if response.status_code != 206:
+                    log.debug(f"Resume request returned HTTP {response.status_code}")
+                    return False
+                response.raw.decode_content = True
+                with open(filepath, 'ab', buffering=1 << 20) as file:
+                    shutil.copyfileobj(response.raw, file, 1 << 20)
+        except Exception as e:
+            log.warning(f"Failed to resume {filepath}: {str(e)}")
+            return False
+
+        return os.path.getsize(filepath) == want
+
+    def download_video_ranged(self, video_url, filename, parts=4):
+        """
+        Download an MP4 using several parallel HTTP Range requests.
+
+        Servers often cap per-connection throughput, so fetching ``parts`` byte
+        ranges at once and writing each one at its offset in a pre-sized file
+        can use much more of the available bandwidth. The pre-sized file is a
+        ``.part.mp4`` that is only renamed once every range has arrived, so an
+        interrupted run never leaves a full-size file with gaps under the final
+        name. Falls back to the single stream download in _download_mp4 when the
+        server doesn't advertise range support or any range request fails.
+
+        Args:
+            video_url (str): URL of the MP4 video
+            filename (str): Filename to save the video as
+            parts (int): Number of concurrent range requests
+
+        Raises:
+            Exception: If the fallback download fails
+        """
+        headers = MP4_HEADERS
+
+        if parts < 2 or not hasattr(os, 'pwrite'):
+            return self._download_mp4(video_url, filename)
+
+        try:
+            head = self.session.head(video_url, headers=headers, allow_redirects=True)
+            total_size = int(head.headers.get('Content-Length', 0)) if head.status_code == 200 else 0
+            accepts_ranges = 'bytes' in str(head.headers.get('Accept-Ranges', ''))
+        except Exception as e:
+            log.debug(f"HEAD request failed, skipping ranged download: {str(e)}")
+            total_size, accepts_ranges = 0, False
+
+        if not accepts_ranges or total_size < parts:
+            log.debug("Server does not support range requests, using single stream download")
+            return self._download_mp4(video_url, filename)
+
+        filepath = os.path.join(self.download_dir, f"{filename}.mp4")
+        part_path = os.path.join(self.download_dir, f"{filename}.part.mp4")
+        chunk_size = total_size // parts
+        ranges = [
+            (i * chunk_size, total_size if i == parts - 1 else (i + 1) * chunk_size)
+            for i in range(parts)
+        ]
+        log.info(f"Downloading {total_size} bytes in {parts} parallel ranges: {filepath}")
+
+        def fetch_range(start, end):
+            range_headers = dict(headers, Range=f"bytes={start}-{end - 1}")
+            with self.session.get(video_url, headers=range_headers, stream=True) as response:
+                if response.status_code != 206:
+                    raise Exception(f"Range request returned HTTP {response.status_code}")
+                offset = start
+                for data in response.iter_content(1 << 20):
+                    os.pwrite(fd, data, offset)
+                    offset += len(data)
+            if offset != end:
+                raise Exception(f"Range {start}-{end - 1} ended early at byte {offset}")
+
+        try:
+            fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.ftruncate(fd, total_size)
+                with ThreadPoolExecutor(max_workers=parts) as executor:
+                    for future in [executor.submit(fetch_range, start, end) for start, end in ranges]:
+                        future.result()
+            finally:
+                os.close(fd)
+            os.replace(part_path, filepath)
+        except Exception as e:
+            log.warning(f"Ranged download failed, retrying as single stream: {str(e)}")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return self._download_mp4(video_url, filename)
 
-        with open(filepath, 'wb') as file:
-            for data in response.iter_content(block_size):
-                file.write(data)
-                
         log.info(f"MP4 download completed: {filepath}")
 
     def _download_hls(self, video_url, filename):
@@ -5452,26 +5944,161 @@ class VideoDownloader:
                 raise Exception(f"Failed to load playlist: {playlist_response.status_code}")
 
             log.debug("Parsing M3U8 playlist")
-            playlist = m3u8.loads(playlist_response.text)
-            output_path = os.path.join(self.download_dir, f"{filename}.mp4")
-            log.debug(f"Output path: {output_path}")
+            playlist = m3u8.loads(playlist_response.text, uri=clean_url)
+            final_path = os.path.join(self.download_dir, f"{filename}.mp4")
+            # Written under a temporary name so an interrupted run never leaves a
+            # truncated file that a later run would take as finished
+            output_path = os.path.join(self.download_dir, f"{filename}.part.mp4")
+            log.debug(f"Output path: {final_path}")
+
+            # Fetch the segments in parallel and only use ffmpeg to remux them
+            media_url = video_url
+            try:
+                playlist, media_url = self._media_playlist(playlist, video_url, headers)
+                if self._download_hls_segments(playlist, headers, output_path):
+                    os.replace(output_path, final_path)
+                    return
+            except Exception as e:
+                log.warning(f"Parallel segment download failed: {str(e)}")
 
             # Extract auth token and cookies for ffmpeg
             headers_arg = self._prepare_ffmpeg_headers(video_url)
 
-            # Try primary ffmpeg method
+            # Try primary ffmpeg method, on the rendition already picked so ffmpeg
+            # doesn't fetch the master playlist again
             try:
                 log.debug("Using primary ffmpeg-python method for download")
-                self._download_with_ffmpeg_python(video_url, output_path, headers_arg)
+                self._download_with_ffmpeg_python(media_url, output_path, headers_arg)
             except Exception as e:
                 log.warning(f"Primary ffmpeg method failed: {str(e)}")
                 log.debug("Falling back to ffmpeg subprocess method")
                 self._download_with_ffmpeg_subprocess(video_url, output_path)
 
+            if os.path.exists(output_path):
+                os.replace(output_path, final_path)
+
         except Exception as e:
             log.error(f"HLS download failed for {filename}: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    def _select_variant(variants, quality="best"):
+        """
+        Pick the rendition of a master playlist matching the requested quality.
+
+        Args:
+            variants (list): Variant playlists from m3u8.M3U8.playlists
+            quality (str): "best" for the highest bandwidth, "worst" for the lowest,
+                or a height such as "720p" for the nearest resolution
+
+        Returns:
+            m3u8.Playlist: Selected variant
+        """
+        def bandwidth(variant):
+            return variant.stream_info.bandwidth or 0
+
+        if quality == "worst":
+            return min(variants, key=bandwidth)
+
+        match = re.fullmatch(r"(\d+)p", quality or "")
+        sized = [variant for variant in variants if variant.stream_info.resolution]
+        if match and sized:
+            height = int(match.group(1))
+            # Nearest height wins; among equals prefer the higher bitrate
+            return min(sized, key=lambda v: (abs(v.stream_info.resolution[1] - height), -bandwidth(v)))
+
+        return max(variants, key=bandwidth)
+
+    def _media_playlist(self, playlist, playlist_url, headers):
+        """
+        Resolve a master playlist to the media playlist of the rendition matching hls_quality.
+
+        Args:
+            playlist (m3u8.M3U8): Parsed playlist, loaded with its URL so variant URIs resolve
+            playlist_url (str): URL the playlist was loaded from
+            headers (dict): Headers used for the playlist request
+
+        Returns:
+            tuple: (m3u8.M3U8, str) media playlist and its URL; the input itself if it has no variants
+        """
+        if not playlist.is_variant:
+            return playlist, playlist_url
+
+        variant = self._select_variant(playlist.playlists, self.hls_quality)
+        log.debug(f"Using variant playlist with bandwidth {variant.stream_info.bandwidth} "
+                  f"for quality {self.hls_quality}")
+        variant_response = self.session.get(variant.absolute_uri, headers=headers)
+        variant_response.raise_for_status()
+        return m3u8.loads(variant_response.text, uri=variant.absolute_uri), variant.absolute_uri
+
+    def _download_hls_segments(self, playlist, headers, output_path):
+        """
+        Download the segments of an HLS stream in parallel and remux them to MP4.
+
+        Encrypted and fragmented-MP4 streams are left to ffmpeg, which handles
+        keys and init segments itself.
+
+        Args:
+            playlist (m3u8.M3U8): Media playlist from _media_playlist(), loaded with its
+                URL so segment URIs resolve
+            headers (dict): Headers used for the playlist request
+            output_path (str): Path of the MP4 file to write
+
+        Returns:
+            bool: True if the video was written, False if ffmpeg should download the stream
+        """
+        segments = list(playlist.segments)
+        if not segments:
+            return False
+        if any(key and key.method != 'NONE' for key in playlist.keys) or playlist.segment_map:
+            log.debug("Stream is encrypted or uses fMP4 segments, leaving it to ffmpeg")
+            return False
+
+        # Segments are plain GETs; the playlist-only Range and CORS headers don't apply
+        segment_headers = {name: value for name, value in headers.items()
+                           if name not in ('Range', 'Access-Control-Request-Headers')}
+        segment_dir = f"{output_path}.segments"
+        os.makedirs(segment_dir, exist_ok=True)
+
+        def fetch_segment(index, uri):
+            path = os.path.join(segment_dir, f"seg_{index:05d}.ts")
+            for attempt in range(HLS_SEGMENT_ATTEMPTS):
+                try:
+                    response = self.session.get(uri, headers=segment_headers, stream=True, timeout=60)
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+                    with open(path, 'wb') as file:
+                        shutil.copyfileobj(response.raw, file, 1 << 20)
+                    return path
+                except (requests.RequestException, Urllib3Error) as e:
+                    # Reading response.raw directly surfaces urllib3's own errors, which carry
+                    # no response; an HTTP error status has already been through the adapter's retries
+                    if attempt == HLS_SEGMENT_ATTEMPTS - 1 or getattr(e, 'response', None) is not None:
+                        raise
+                    log.debug(f"Retrying segment {index} after error: {e}")
+                    time.sleep(HLS_SEGMENT_BACKOFF * 2 ** attempt)
+
+        try:
+            log.info(f"Downloading {len(segments)} HLS segments with {self.hls_workers} workers")
+            with ThreadPoolExecutor(max_workers=self.hls_workers) as executor:
+                paths = list(executor.map(fetch_segment, range(len(segments)),
+                                          [segment.absolute_uri for segment in segments]))
+
+            # MPEG-TS segments can simply be appended; ffmpeg then only changes the container
+            joined_path = os.path.join(segment_dir, "joined.ts")
+            with open(joined_path, 'wb') as joined:
+                for path in paths:
+                    with open(path, 'rb') as segment_file:
+                        shutil.copyfileobj(segment_file, joined, 1 << 20)
+                    os.remove(path)
+
+            stream = ffmpeg.output(ffmpeg.input(joined_path), output_path, **HLS_REMUX_OPTIONS)
+            ffmpeg.run(stream, overwrite_output=True, quiet=True)
+            log.info(f"Download completed: {output_path}")
+            return True
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
     def _prepare_ffmpeg_headers(self, video_url):
         """Prepare headers for ffmpeg including cookies and auth token."""
         # Get cookies from session as string
@@ -5479,13 +6106,10 @@ class VideoDownloader:
 
         # Extract auth token and app parameter from URL if present
         auth_headers = []
-        app_param = None
         
         # Extract app param if present
-        if '&app=' in video_url:
-            app_param = video_url.split('&app=')[1]
-            if '&' in app_param:
-                app_param = app_param.split('&')[0]
+        app_param = extract_param(video_url, '&app=')
+        if app_param is not None:
             log.debug(f"Found app parameter for ffmpeg: {app_param}")
         
         # Add standard headers
@@ -5502,19 +6126,12 @@ class VideoDownloader:
             auth_headers.append(f"'app: {app_param}'")  # Try both variations
         
         # Add Akamai-specific auth tokens if present in URL
-        if 'hdntl=' in video_url:
-            auth_token = video_url.split('hdntl=')[1]
-            if '&' in auth_token:
-                auth_token = auth_token.split('&')[0]
-            auth_headers.append(f"'hdntl: {auth_token}'")
-            log.debug(f"Added hdntl token to ffmpeg headers: {auth_token[:30]}...")
-            
-        elif 'hdnts=' in video_url:
-            auth_token = video_url.split('hdnts=')[1]
-            if '&' in auth_token:
-                auth_token = auth_token.split('&')[0]
-            auth_headers.append(f"'hdnts: {auth_token}'")
-            log.debug(f"Added hdnts token to ffmpeg headers: {auth_token[:30]}...")
+        for token_name in ('hdntl', 'hdnts'):
+            auth_token = extract_param(video_url, f"{token_name}=")
+            if auth_token is not None:
+                auth_headers.append(f"'{token_name}: {auth_token}'")
+                log.debug(f"Added {token_name} token to ffmpeg headers: {auth_token[:30]}...")
+                break
             
         # Pass the URL as-is rather than cleaning it
         auth_headers.append(f"'Range: bytes=0-'")
@@ -5538,7 +6155,8 @@ class VideoDownloader:
             video_url,
             headers=headers_arg
         )
-        stream = ffmpeg.output(stream, output_path)
+        # Only errors; the per-frame progress output is of no use here
+        stream = ffmpeg.output(stream, output_path, **HLS_REMUX_OPTIONS).global_args('-loglevel', 'error')
         log.debug("Running ffmpeg with parameters")
         ffmpeg.run(stream, overwrite_output=True)
         log.info(f"Download completed: {output_path}")
@@ -5550,27 +6168,17 @@ class VideoDownloader:
         
         # Extract auth token and app parameter if present
         headers = []
-        app_param = None
-        auth_token = None
         
         # Extract app param if present
-        if '&app=' in video_url:
-            app_param = video_url.split('&app=')[1]
-            if '&' in app_param:
-                app_param = app_param.split('&')[0]
+        app_param = extract_param(video_url, '&app=')
+        if app_param is not None:
             log.debug(f"Found app parameter for ffmpeg subprocess: {app_param}")
             
         # Extract token if present
-        if 'hdntl=' in video_url:
-            auth_token = video_url.split('hdntl=')[1]
-            if '&' in auth_token:
-                auth_token = auth_token.split('&')[0]
-            log.debug(f"Extracted hdntl token for ffmpeg subprocess: {auth_token[:30]}...")
-        elif 'hdnts=' in video_url:
-            auth_token = video_url.split('hdnts=')[1]
-            if '&' in auth_token:
-                auth_token = auth_token.split('&')[0]
-            log.debug(f"Extracted hdnts token for ffmpeg subprocess: {auth_token[:30]}...")
+        token_name = 'hdntl' if 'hdntl=' in video_url else 'hdnts'
+        auth_token = extract_param(video_url, f"{token_name}=")
+        if auth_token is not None:
+            log.debug(f"Extracted {token_name} token for ffmpeg subprocess: {auth_token[:30]}...")
         
         # Build headers
         headers.append(f"Origin: https://cf-embed.play.hotmart.com")
@@ -5588,10 +6196,7 @@ class VideoDownloader:
         
         # Add token if present
         if auth_token:
-            if 'hdntl=' in video_url:
-                headers.append(f"hdntl: {auth_token}")
-            else:
-                headers.append(f"hdnts: {auth_token}")
+            headers.append(f"{token_name}: {auth_token}")
 
         # Join headers
         headers_str = "\r\n".join(headers)
@@ -5601,10 +6206,13 @@ class VideoDownloader:
             '-headers', headers_str,
             '-i', video_url,  # Use the original URL with all parameters
             '-c', 'copy',
+            '-bsf:a', 'aac_adtstoasc',
+            '-movflags', '+faststart',
+            '-loglevel', 'error',
             output_path
         ]
 
-        log.debug(f"FFmpeg command: {' '.join(cmd[:3])} [...headers omitted...] {' '.join(cmd[-4:])}")
+        log.debug(f"FFmpeg command: {' '.join(cmd[:3])} [...headers omitted...] {' '.join(cmd[4:])}")
 
         import subprocess
         result = subprocess.run(cmd, capture_output=True, text=True)
@@ -5651,12 +6259,11 @@ class VideoDownloader:
             str: Cleaned lesson title, or "lesson" if not found
         """
         try:
-            title_element = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "h1, .lesson-title"))
-            )
+            with self.browser_manager.implicit_wait(10):
+                title_element = self.driver.find_element(By.CSS_SELECTOR, "h1, .lesson-title")
             title = title_element.text.strip()
             # Clean the title to make it filesystem-friendly
-            title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
+            title = TITLE_UNSAFE_RE.sub('', title).strip()
             return title or "lesson"
         except Exception as e:
             log.warning(f"Failed to get lesson title: {str(e)}")
@@ -5673,10 +6280,11 @@ class VideoDownloader:
             log.info("Finding all lessons from navigation menu")
 
             # Wait for the lesson navigation to load
-            wait = WebDriverWait(self.driver, 10)
-            lessons = wait.until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "li[data-page-hash]"))
-            )
+            with self.browser_manager.implicit_wait(10):
+                lessons = self.driver.find_elements(By.CSS_SELECTOR, "li[data-page-hash]")
+            if not lessons:
+                log.error("No lessons found in navigation menu")
+                return []
 
             lesson_data = []
             log.debug(f"Found {len(lessons)} lesson elements in navigation")
@@ -5701,56 +6309,92 @@ class VideoDownloader:
             log.error("Failed to get lessons", exc_info=True)
             return []
 
-    def download_all_lessons(self):
-        """Download videos from all lessons."""
-        lessons = self.get_all_lessons()
+    def download_all_lessons(self, lessons=None):
+        """
+        Download videos from all lessons.
+
+        The browser extracts one lesson at a time while the parts already found
+        download on ``download_workers`` threads, so a slow download no longer
+        holds up the next lesson's extraction.
+
+        Args:
+            lessons (list, optional): Lessons from get_all_lessons(); scraped when not given
+        """
+        if lessons is None:
+            lessons = self.get_all_lessons()
         log.info(f"Found {len(lessons)} lessons to download")
 
-        for i, lesson in enumerate(lessons, 1):
-            try:
-                lesson_title = lesson['title']
-                log.info(f"Processing lesson {i}/{len(lessons)}: {lesson_title}")
+        with ThreadPoolExecutor(max_workers=max(1, self.download_workers)) as executor:
+            for i, lesson in enumerate(lessons, 1):
+                try:
+                    lesson_title = lesson['title']
+                    log.info(f"Processing lesson {i}/{len(lessons)}: {lesson_title}")
 
-                # Navigate to lesson using hash
-                lesson_url = f"{self.base_url}/lesson/{lesson['hash']}"
-                log.debug(f"Lesson URL: {lesson_url}")
+                    # Navigate to lesson using hash
+                    lesson_url = f"{self.base_url}/lesson/{lesson['hash']}"
+                    log.debug(f"Lesson URL: {lesson_url}")
 
-                video_urls = self.extract_video_url(lesson_url)
+                    with self.browser_lock:
+                        video_urls = self.extract_video_url(lesson_url)
 
-                if not video_urls:
-                    log.warning(f"No videos found for lesson: {lesson_title}")
-                    continue
+                        if not video_urls:
+                            log.warning(f"No videos found for lesson: {lesson_title}")
+                            continue
 
-                # Extract lesson description text first
-                description_text = self.extract_lesson_description(lesson_url)
+                        # Extract lesson description text first
+                        description_text = self.extract_lesson_description(lesson_url)
 
-                log.info(f"Found {len(video_urls)} video parts for lesson: {lesson_title}")
+                    log.info(f"Found {len(video_urls)} video parts for lesson: {lesson_title}")
 
-                for part_idx, (part_suffix, video_url) in enumerate(video_urls, 1):
-                    # Create filename from lesson number, title and part
-                    filename = f"{i:03d}_{lesson_title}"
-                    if part_suffix:
-                        filename = f"{filename}_{part_suffix}"
+                    for part_idx, (part_suffix, video_url) in enumerate(video_urls, 1):
+                        # Create filename from lesson number, title and part
+                        filename = f"{i:03d}_{lesson_title}"
+                        if part_suffix:
+                            filename = f"{filename}_{part_suffix}"
 
-                    log.info(f"Downloading part {part_idx}/{len(video_urls)}: {filename}")
-                    log.debug(f"Video URL: {video_url[:100]}...")
+                        log.info(f"Downloading part {part_idx}/{len(video_urls)}: {filename}")
+                        log.debug(f"Video URL: {video_url[:100]}...")
 
-                    if self.download_video(video_url, filename):
-                        log.info(f"Successfully downloaded: {filename}")
-                        
                         # Save description text (only for the first part to avoid duplication)
+                        description_path = None
                         if part_idx == 1 and description_text:
                             base_filename = filename.rsplit('_', 1)[0] if part_suffix else filename
                             description_path = os.path.join(self.download_dir, f"{base_filename}.txt")
-                            try:
-                                with open(description_path, "w", encoding="utf-8") as desc_file:
-                                    desc_file.write(description_text)
-                                log.info(f"Saved lesson description to: {description_path}")
-                            except Exception as e:
-                                log.error(f"Failed to save description text: {str(e)}")
-                    else:
-                        log.error(f"Failed to download: {filename}")
 
+                        # Recording needs the browser on this lesson, before the next one is extracted
+                        if video_url.startswith('direct-recording://'):
+                            self._download_lesson_part(video_url, filename, description_text, description_path)
+                        else:
+                            executor.submit(self._download_lesson_part, video_url, filename,
+                                            description_text, description_path)
+
+                except Exception as e:
+                    log.error(f"Error processing lesson {lesson['title']}", exc_info=True)
+                    continue
+
+    def _download_lesson_part(self, video_url, filename, description_text=None, description_path=None):
+        """
+        Download one part of a lesson, saving the lesson description next to it.
+
+        Args:
+            video_url (str): URL of the video to download
+            filename (str): Filename to save the video as
+            description_text (str, optional): Lesson description text
+            description_path (str, optional): Where to save the description; None to skip it
+        """
+        try:
+            if not self.download_video(video_url, filename):
+                log.error(f"Failed to download: {filename}")
+                return
+        except Exception as e:
+            log.error(f"Error downloading {filename}: {str(e)}", exc_info=True)
+            return
+
+        log.info(f"Successfully downloaded: {filename}")
+        if description_path:
+            try:
+                with open(description_path, "w", encoding="utf-8") as desc_file:
+                    desc_file.write(description_text)
+                log.info(f"Saved lesson description to: {description_path}")
             except Exception as e:
-                log.error(f"Error processing lesson {lesson['title']}", exc_info=True)
-                continue
\ No newline at end of file
+                log.error(f"Failed to save description text: {str(e)}")